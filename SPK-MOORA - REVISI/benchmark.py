@@ -0,0 +1,270 @@
+"""Benchmark konversi, perhitungan MOORA dan I/O database dengan data sintetis.
+
+Contoh:
+    python benchmark.py                                  # ukuran bawaan, bandingkan dengan baseline
+    python benchmark.py --ukuran 1000 100000 10000000 --tanpa-db
+    python benchmark.py --simpan-baseline                # tulis hasil sebagai baseline baru
+
+Waktu adalah waktu terbaik dari beberapa pengulangan; memori puncak diukur terpisah dengan tracemalloc
+(alokasi Python dan NumPy, tidak termasuk memori internal SQLite). Keluar dengan kode 1 bila ada
+benchmark yang lebih lambat atau lebih boros dari baseline melebihi ambang.
+
+Waktu absolut hanya sebanding pada lingkungan yang sama, jadi baseline menyimpan versi Python, NumPy,
+pandas, SQLite, arsitektur dan jumlah CPU (serta host sebagai keterangan). Baseline bawaan direkam dengan
+versi yang dipin di requirement.txt. Bila versi atau CPU berbeda, regresi hanya dilaporkan sebagai peringatan
+(kode keluar 0) kecuali dengan --paksa; buat baseline baru di lingkungan tersebut dengan --simpan-baseline.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from db import (DB_FILE, get_user_alternatives, insert_alternative, insert_alternatives_bulk, save_laporan,
+                tutup_koneksi)
+from konversi import ATURAN, KODE_KRITERIA, konversi_data, konversi_nilai
+from migrasi import MIGRASI_ALTERNATIF, jalankan_migrasi
+from moora import KOLOM_KRITERIA, moora_calculation
+
+UKURAN_BAWAAN = [1_000, 10_000, 100_000]
+FILE_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+AMBANG = 0.25
+# Selisih waktu di bawah ini dianggap derau pengukuran
+SELISIH_MINIMUM = 0.005
+PENGULANGAN = 3
+# Jumlah pemanggilan satu per satu (seperti form input): insert_alternative dan konversi_nilai per kriteria
+MAKS_INSERT_TUNGGAL = 1_000
+MAKS_NILAI_TUNGGAL = 100
+# Jumlah thread yang menulis bersamaan (seperti beberapa sesi Streamlit)
+THREAD_PARALEL = 8
+
+# Rentang nilai mentah sintetis per kriteria numerik; cukup lebar untuk mengenai semua kelas
+RENTANG_MENTAH = {"C1": 2_000, "C2": 50_000, "C3": 80, "C4": 50, "C6": 10, "C8": 200, "C9": 2_000}
+
+
+def buat_data_mentah(n, seed=0):
+    """Data pengukuran mentah (kolom seperti file impor) untuk n alternatif."""
+    rng = np.random.default_rng(seed)
+    data = {"Alternatif": [f"A{i}" for i in range(1, n + 1)]}
+    for kode in KODE_KRITERIA:
+        aturan = ATURAN[kode]
+        if "kategori" in aturan:
+            data[aturan["kolom"]] = rng.choice(list(aturan["kategori"]), size=n)
+        else:
+            data[aturan["kolom"]] = rng.uniform(0, RENTANG_MENTAH[kode], size=n).round(1)
+    return pd.DataFrame(data)
+
+
+def buat_matriks(n, seed=0):
+    """Matriks skor kriteria (Alternatif, c1..c9) untuk n alternatif."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.integers(1, 5, size=(n, len(KOLOM_KRITERIA))), columns=KOLOM_KRITERIA)
+    df.insert(0, "Alternatif", [f"A{i}" for i in range(1, n + 1)])
+    return df
+
+
+def buat_bobot():
+    return pd.DataFrame({
+        "Kriteria": KODE_KRITERIA,
+        "Bobot": np.full(len(KODE_KRITERIA), 1 / len(KODE_KRITERIA)),
+        "Jenis": [ATURAN[kode]["jenis"] for kode in KODE_KRITERIA],
+    })
+
+
+def ukur(fungsi, pengulangan=PENGULANGAN):
+    """Waktu terbaik (detik) dari beberapa pengulangan dan memori puncak (MB) satu pemanggilan."""
+    waktu = []
+    for _ in range(pengulangan):
+        mulai = time.perf_counter()
+        fungsi()
+        waktu.append(time.perf_counter() - mulai)
+    # tracemalloc memperlambat eksekusi, jadi memori diukur pada pemanggilan tersendiri
+    tracemalloc.start()
+    try:
+        fungsi()
+        _, puncak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"detik": min(waktu), "puncak_mb": puncak / 2**20}
+
+
+_nomor_user = itertools.count()
+
+
+def _username_baru():
+    # Tiap pemanggilan memakai user baru agar ukuran data tidak bertambah antar pengulangan
+    return f"bench{next(_nomor_user)}"
+
+
+def bench_konversi(n):
+    df = buat_data_mentah(n)
+    hasil = {f"konversi_data/{n}": ukur(lambda: konversi_data(df))}
+    sampel = df.head(MAKS_NILAI_TUNGGAL)
+    pasangan = [(kode, nilai) for kode in KODE_KRITERIA for nilai in sampel[ATURAN[kode]["kolom"]]]
+    hasil[f"konversi_nilai/{len(sampel)}"] = ukur(lambda: [konversi_nilai(k, v) for k, v in pasangan])
+    return hasil
+
+
+def bench_moora(n):
+    df_alt, df_bobot = buat_matriks(n), buat_bobot()
+    return {
+        f"moora_calculation/{n}": ukur(lambda: moora_calculation(df_alt, df_bobot)),
+        f"moora_calculation_top100/{n}": ukur(lambda: moora_calculation(df_alt, df_bobot, top_k=100)),
+    }
+
+
+def bench_db(n):
+    df = buat_matriks(n)
+    nilai = df[KOLOM_KRITERIA].to_numpy().tolist()
+    nama = df["Alternatif"].tolist()
+
+    def bulk():
+        username = _username_baru()
+        insert_alternatives_bulk([(username, a, *v) for a, v in zip(nama, nilai)], DB_FILE)
+        return username
+
+    def round_trip():
+        get_user_alternatives(bulk())
+
+    tunggal = [
+        {"Alternatif": a, **{f"C{j} (Bobot)": x for j, x in enumerate(v, 1)}}
+        for a, v in zip(nama[:MAKS_INSERT_TUNGGAL], nilai[:MAKS_INSERT_TUNGGAL])
+    ]
+
+    def insert_tunggal():
+        username = _username_baru()
+        for data in tunggal:
+            insert_alternative(username, data)
+
+    def insert_paralel():
+        with ThreadPoolExecutor(THREAD_PARALEL) as pool:
+            list(pool.map(lambda _: insert_tunggal(), range(THREAD_PARALEL)))
+
+    username = bulk()
+    df_hasil = moora_calculation(df, buat_bobot())
+    return {
+        f"insert_alternatives_bulk/{n}": ukur(bulk),
+        f"insert_get_user_alternatives/{n}": ukur(round_trip),
+        f"insert_alternative/{len(tunggal)}": ukur(insert_tunggal),
+        f"insert_alternative_paralel/{THREAD_PARALEL}x{len(tunggal)}": ukur(insert_paralel),
+        f"save_laporan/{n}": ukur(lambda: save_laporan(username, df_hasil, keterangan="Benchmark")),
+    }
+
+
+def jalankan(ukuran, dengan_db=True):
+    hasil = {}
+    kelompok = [bench_konversi, bench_moora] + ([bench_db] if dengan_db else [])
+    for n in ukuran:
+        for bench in kelompok:
+            for nama, ukuran_hasil in bench(n).items():
+                hasil[nama] = ukuran_hasil
+                print(f"{nama:40} {ukuran_hasil['detik']:10.4f} s {ukuran_hasil['puncak_mb']:10.1f} MB",
+                      file=sys.stderr)
+    return hasil
+
+
+# Yang dibandingkan dengan baseline: versi pustaka dan CPU. Nama host hanya dicatat sebagai keterangan,
+# karena mesin CI atau laptop lain dengan pustaka dan CPU yang sama tetap harus bisa gagal pada regresi.
+KUNCI_LINGKUNGAN = ("python", "numpy", "pandas", "sqlite", "mesin", "cpu")
+
+
+def lingkungan():
+    """Versi pustaka dan mesin yang memengaruhi waktu benchmark."""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sqlite": sqlite3.sqlite_version,
+        "mesin": platform.machine(),
+        "host": platform.node(),
+        "cpu": os.cpu_count(),
+    }
+
+
+def beda_lingkungan(baseline, sekarang):
+    """Daftar perbedaan versi pustaka dan CPU baseline dengan lingkungan saat ini (kosong bila sama)."""
+    return [f"{k}: {baseline.get(k)} -> {sekarang.get(k)}" for k in KUNCI_LINGKUNGAN
+            if baseline.get(k) != sekarang.get(k)]
+
+
+def bandingkan(hasil, baseline, ambang=AMBANG):
+    """Daftar regresi: benchmark yang waktu atau memori puncaknya melebihi baseline x (1 + ambang)."""
+    regresi = []
+    for nama, sekarang in hasil.items():
+        lama = baseline.get(nama)
+        if lama is None:
+            continue
+        if (sekarang["detik"] > lama["detik"] * (1 + ambang)
+                and sekarang["detik"] - lama["detik"] > SELISIH_MINIMUM):
+            regresi.append(f"{nama}: waktu {lama['detik']:.4f} s -> {sekarang['detik']:.4f} s")
+        if sekarang["puncak_mb"] > lama["puncak_mb"] * (1 + ambang) and sekarang["puncak_mb"] - lama["puncak_mb"] > 1:
+            regresi.append(f"{nama}: memori {lama['puncak_mb']:.1f} MB -> {sekarang['puncak_mb']:.1f} MB")
+    return regresi
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SPK MOORA dengan data sintetis")
+    parser.add_argument("--ukuran", type=int, nargs="+", default=UKURAN_BAWAAN, help="Jumlah alternatif")
+    parser.add_argument("--baseline", default=FILE_BASELINE, help="File JSON baseline")
+    parser.add_argument("--simpan-baseline", action="store_true", help="Tulis hasil sebagai baseline")
+    parser.add_argument("--ambang", type=float, default=AMBANG, help="Batas regresi relatif (0.25 = 25%%)")
+    parser.add_argument("--tanpa-db", action="store_true", help="Lewati benchmark database")
+    parser.add_argument("--paksa", action="store_true",
+                        help="Gagal pada regresi walaupun lingkungan berbeda dengan baseline")
+    args = parser.parse_args(argv)
+    path_baseline = os.path.abspath(args.baseline)
+
+    # Benchmark database memakai file sementara, bukan alternatif.db milik aplikasi
+    asal = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        try:
+            if not args.tanpa_db:
+                jalankan_migrasi(DB_FILE, MIGRASI_ALTERNATIF)
+            hasil = jalankan(args.ukuran, dengan_db=not args.tanpa_db)
+        finally:
+            tutup_koneksi()
+            os.chdir(asal)
+
+    if args.simpan_baseline:
+        data = {**lingkungan(), "hasil": hasil}
+        if os.path.exists(path_baseline):
+            # Benchmark yang tidak dijalankan kali ini tetap dipertahankan bila baseline dari lingkungan yang sama
+            with open(path_baseline, encoding="utf-8") as f:
+                lama = json.load(f)
+            if not beda_lingkungan(lama, lingkungan()):
+                data["hasil"] = {**lama["hasil"], **hasil}
+        with open(path_baseline, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        print(f"Baseline disimpan di {path_baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(path_baseline):
+        print("Baseline belum ada; jalankan dengan --simpan-baseline.", file=sys.stderr)
+        return 0
+    with open(path_baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regresi = bandingkan(hasil, baseline["hasil"], args.ambang)
+    beda = beda_lingkungan(baseline, lingkungan())
+    if beda and not args.paksa:
+        print("Lingkungan berbeda dengan baseline (" + "; ".join(beda) + "); perbandingan hanya sebagai informasi.",
+              file=sys.stderr)
+        for baris in regresi:
+            print(f"PERINGATAN {baris}", file=sys.stderr)
+        return 0
+    for baris in regresi:
+        print(f"REGRESI {baris}", file=sys.stderr)
+    return 1 if regresi else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import collections
+import glob
+import hashlib
+import os
+import pickle
+import threading
+
+import metrik
+from db import get_alternatif_user, get_halaman_alternatif, get_user_bobot, get_versi_data, hitung_alternatif
+
+MAKS_ENTRI = 256
+
+# Tier disk opsional: aktif bila SPK_CACHE_DIR diisi (misalnya "cache/")
+DIR_CACHE = os.environ.get("SPK_CACHE_DIR")
+
+
+class CacheLRU:
+    """Cache di memori dengan batas jumlah entri; entri yang paling lama tidak dipakai dibuang lebih dulu."""
+
+    def __init__(self, maks_entri=MAKS_ENTRI):
+        self.maks_entri = maks_entri
+        self.data = collections.OrderedDict()
+        self.kunci = threading.Lock()
+
+    def get(self, kunci, default=None):
+        with self.kunci:
+            if kunci not in self.data:
+                return default
+            self.data.move_to_end(kunci)
+            return self.data[kunci]
+
+    def set(self, kunci, nilai):
+        with self.kunci:
+            self.data[kunci] = nilai
+            self.data.move_to_end(kunci)
+            while len(self.data) > self.maks_entri:
+                self.data.popitem(last=False)
+
+
+_memori = CacheLRU()
+_KOSONG = object()
+
+
+def _path_disk(nama, username, versi, ekstra):
+    user = hashlib.sha1(username.encode()).hexdigest()[:16]
+    return os.path.join(DIR_CACHE, f"{nama}-{user}-{ekstra}-v{versi}.pkl")
+
+
+def _baca_disk(path):
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.PickleError, EOFError):
+        return _KOSONG
+
+
+def _tulis_disk(path, nilai):
+    os.makedirs(DIR_CACHE, exist_ok=True)
+    # Versi lama untuk kunci yang sama sudah tidak berlaku
+    for lama in glob.glob(path.rsplit("-v", 1)[0] + "-v*.pkl"):
+        os.remove(lama)
+    sementara = f"{path}.{os.getpid()}.tmp"
+    with open(sementara, "wb") as f:
+        pickle.dump(nilai, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(sementara, path)
+
+
+def _cari(kunci):
+    nilai = _memori.get(kunci, _KOSONG)
+    if nilai is _KOSONG and DIR_CACHE:
+        nilai = _baca_disk(_path_disk(*kunci))
+        if nilai is not _KOSONG:
+            _memori.set(kunci, nilai)
+    return nilai
+
+
+def _simpan(kunci, nilai):
+    _memori.set(kunci, nilai)
+    if DIR_CACHE:
+        _tulis_disk(_path_disk(*kunci), nilai)
+
+
+def ambil(nama, username, hitung, ekstra=""):
+    """Ambil nilai dari cache berkunci (nama, username, versi data, ekstra), atau hitung lalu simpan.
+
+    Versi data dinaikkan oleh setiap penulisan di db.py, sehingga entri lama otomatis tidak terpakai.
+    Nilai yang dikembalikan dipakai bersama antar sesi: jangan diubah in-place.
+    """
+    kunci = (nama, username, get_versi_data(username), ekstra)
+    nilai = _cari(kunci)
+    if nilai is _KOSONG:
+        metrik.tambah("cache_miss")
+        nilai = hitung()
+        _simpan(kunci, nilai)
+    else:
+        metrik.tambah("cache_hit")
+    return nilai
+
+
+def _kunci_filter(*nilai):
+    # Teks pencarian bebas dijadikan hash agar aman dipakai di nama file tier disk
+    return hashlib.sha1(repr(nilai).encode()).hexdigest()[:16]
+
+
+def halaman_alternatif(username, setelah_id=0, batas=100, cari=None, kriteria=None):
+    kriteria = dict(sorted((kriteria or {}).items()))
+    return ambil("halaman_alternatif", username,
+                 lambda: get_halaman_alternatif(username, setelah_id, batas, cari, kriteria),
+                 ekstra=_kunci_filter(setelah_id, batas, cari, kriteria))
+
+
+def jumlah_alternatif(username, cari=None, kriteria=None):
+    kriteria = dict(sorted((kriteria or {}).items()))
+    return ambil("jumlah_alternatif", username, lambda: hitung_alternatif(username, cari, kriteria),
+                 ekstra=_kunci_filter(cari, kriteria))
+
+
+def user_bobot(username):
+    return ambil("bobot", username, lambda: get_user_bobot(username))
+
+
+def alternatif_user(username):
+    return ambil("alternatif_user", username, lambda: get_alternatif_user(username))
+
+
+def hasil_moora(username, hitung, top_k=None, hanya_pareto=False):
+    return ambil("moora", username, hitung, ekstra=f"top{top_k}" + ("-pareto" if hanya_pareto else ""))
@@ -0,0 +1,351 @@
+"""Perhitungan MOORA tanpa Streamlit (untuk job terjadwal dan layanan lain).
+
+Contoh:
+    python cli.py hitung --matriks data.csv --bobot bobot.csv --keluaran hasil.csv
+    python cli.py hitung --matriks wilayah/*.parquet --bobot bobot.csv --keluaran hasil/
+    python cli.py hitung --db alternatif.db --username andin --top-k 100 --simpan-laporan
+    python cli.py hitung --matriks data.csv --bobot bobot.csv --semua-metode
+    python cli.py impor --db alternatif.db --username andin survei.parquet
+    python cli.py impor --db alternatif.db --username andin titik_survei.csv --lapisan lapisan/
+    python cli.py hitung-ulang --db alternatif.db --proses 8 --lanjutkan
+    python cli.py ekspor --db alternatif.db --username andin --keluaran alternatif.xlsx
+    python cli.py ekspor --db alternatif.db --username andin --run terakhir --keluaran peringkat.parquet
+    python cli.py pindai --bbox -7.40 110.25 -7.05 110.60 --ukuran-sel 10 --username andin \
+        --nilai C2=30000 C5=Aspal C6=4 "C7=Lahan Sendiri" --raster kesesuaian.asc --keluaran teratas.csv
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+from db import DB_FILE, get_connection, get_user_bobot, insert_alternatives_bulk, save_laporan
+from ekspor import FORMAT_EKSPOR, ekspor, ekspor_alternatif, ekspor_peringkat
+from hitung_ulang import hitung_ulang_semua, job_terakhir_belum_selesai
+from impor import impor_alternatif
+from konversi import ATURAN, KODE_KRITERIA, konversi_data
+from migrasi import MIGRASI_ALTERNATIF, jalankan_migrasi
+from moora import KOLOM_KRITERIA, moora_calculation, moora_multimetode
+from raster import TOP_N, UKURAN_SEL, pindai_wilayah, simpan_raster
+from snapshot import ambil_snapshot, moora_snapshot
+from spasial import DIR_LAPISAN, lengkapi_jarak, muat_lapisan, poligon_lapisan, titik_lapisan
+
+FORMAT_KELUARAN = tuple(FORMAT_EKSPOR)
+
+
+def baca_tabel(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".parquet", ".pq"):
+        return pd.read_parquet(path)
+    if ext in (".xlsx", ".xls"):
+        return pd.read_excel(path)
+    return pd.read_csv(path)
+
+
+def tulis_tabel(df, path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".json":
+        df.to_json(path, orient="records", force_ascii=False)
+    elif ext.lstrip(".") in FORMAT_KELUARAN:
+        # Format yang sama dengan ekspor web: csv, parquet, xlsx
+        ekspor([df], path)
+    else:
+        df.to_csv(path, index=False)
+
+
+def baca_bobot(path):
+    """File bobot berisi kolom Kriteria dan Bobot; Jenis opsional (bawaan dari tabel aturan kriteria)."""
+    df = baca_tabel(path)
+    kurang_kolom = [k for k in ("Kriteria", "Bobot") if k not in df.columns]
+    if kurang_kolom:
+        raise ValueError(f"{path}: kolom {', '.join(kurang_kolom)} tidak ditemukan")
+    df["Kriteria"] = df["Kriteria"].astype(str).str.strip().str.upper()
+    tidak_dikenal = sorted(set(df["Kriteria"]) - set(KODE_KRITERIA))
+    kurang = [k for k in KODE_KRITERIA if k not in set(df["Kriteria"])]
+    if tidak_dikenal or kurang or df["Kriteria"].duplicated().any():
+        raise ValueError(f"{path}: bobot harus berisi tepat satu baris untuk tiap kriteria {', '.join(KODE_KRITERIA)}"
+                         + (f"; belum ada: {', '.join(kurang)}" if kurang else "")
+                         + (f"; tidak dikenal: {', '.join(tidak_dikenal)}" if tidak_dikenal else ""))
+    if "Jenis" not in df.columns:
+        df["Jenis"] = [ATURAN[k]["jenis"] for k in df["Kriteria"]]
+    # Urutan bobot harus mengikuti kolom c1..c9
+    return df.set_index("Kriteria").loc[KODE_KRITERIA].reset_index()
+
+
+def siapkan_matriks(df, lapisan=None):
+    """Terima matriks skor (kolom c1..c9) atau data mentah (kolom pengukuran) yang dikonversi lebih dulu.
+
+    Dengan lapisan, jarak yang kosong pada data mentah dihitung dari kolom Latitude/Longitude.
+    """
+    df = df.rename(columns={"alternatif": "Alternatif"})
+    df = df.rename(columns={kode: kode.lower() for kode in KODE_KRITERIA})
+    if "Alternatif" not in df.columns:
+        raise ValueError("kolom Alternatif tidak ditemukan pada matriks")
+    if all(k in df.columns for k in KOLOM_KRITERIA):
+        return df
+    if lapisan:
+        df = lengkapi_jarak(df, lapisan)
+    skor = konversi_data(df)
+    if skor.isna().any(axis=None):
+        raise ValueError("Terdapat nilai kriteria kosong atau tidak valid pada data mentah")
+    return pd.concat([df[["Alternatif"]], skor], axis=1)
+
+
+def dengan_peringkat(hasil):
+    hasil.insert(0, "Peringkat", range(1, len(hasil) + 1))
+    return hasil
+
+
+def hitung_matriks(df_alt, df_bobot, args):
+    if args.semua_metode:
+        return moora_multimetode(df_alt, df_bobot, top_k=args.top_k)
+    return dengan_peringkat(moora_calculation(df_alt, df_bobot, top_k=args.top_k, hanya_pareto=args.pareto))
+
+
+def keluarkan(hasil, path):
+    if path:
+        tulis_tabel(hasil, path)
+    else:
+        hasil.to_csv(sys.stdout, index=False)
+
+
+def baca_lapisan_arg(args):
+    if not args.lapisan:
+        return None
+    lapisan = muat_lapisan(args.lapisan)
+    if not lapisan:
+        print(f"Tidak ada file lapisan di {args.lapisan}; jarak tidak dihitung dari koordinat.", file=sys.stderr)
+    return lapisan
+
+
+def cmd_hitung(args):
+    if args.semua_metode and args.simpan_laporan:
+        print("--simpan-laporan hanya untuk hasil ratio system (tanpa --semua-metode).", file=sys.stderr)
+        return 2
+    if args.semua_metode and args.pareto:
+        print("--pareto hanya untuk hasil ratio system (tanpa --semua-metode).", file=sys.stderr)
+        return 2
+
+    if args.username:
+        jalankan_migrasi(args.db, MIGRASI_ALTERNATIF)
+        df_bobot = baca_bobot(args.bobot) if args.bobot else get_user_bobot(args.username, args.db)
+        snap = ambil_snapshot(args.username, args.db)
+        if df_bobot.empty or len(snap) == 0:
+            print(f"Data alternatif atau bobot untuk '{args.username}' belum lengkap.", file=sys.stderr)
+            return 1
+        if snap.dilewati:
+            print(f"{snap.dilewati} alternatif dengan skor kosong atau tidak valid tidak ikut dihitung.", file=sys.stderr)
+        if args.semua_metode:
+            df_alt = pd.DataFrame(snap.matriks(), columns=KOLOM_KRITERIA)
+            df_alt.insert(0, "Alternatif", snap.nama())
+            keluarkan(moora_multimetode(df_alt, df_bobot, top_k=args.top_k), args.keluaran)
+            return 0
+        hasil = moora_snapshot(args.username, df_bobot, top_k=args.top_k, db_file=args.db, hanya_pareto=args.pareto)
+        if args.simpan_laporan:
+            run_id = save_laporan(args.username, hasil, keterangan="CLI", db_file=args.db)
+            print(f"Laporan disimpan sebagai run #{run_id}", file=sys.stderr)
+        keluarkan(dengan_peringkat(hasil), args.keluaran)
+        return 0
+
+    if not args.matriks or not args.bobot:
+        print("Gunakan --matriks dan --bobot, atau --username untuk membaca dari database.", file=sys.stderr)
+        return 2
+
+    df_bobot = baca_bobot(args.bobot)
+    lapisan = baca_lapisan_arg(args)
+    banyak = len(args.matriks) > 1
+    if banyak and not args.keluaran:
+        print("--keluaran (direktori) wajib diisi untuk beberapa matriks.", file=sys.stderr)
+        return 2
+    if banyak:
+        os.makedirs(args.keluaran, exist_ok=True)
+
+    mulai = time.perf_counter()
+    for path in args.matriks:
+        try:
+            df_alt = siapkan_matriks(baca_tabel(path), lapisan)
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}") from e
+        hasil = hitung_matriks(df_alt, df_bobot, args)
+        if banyak:
+            nama = os.path.splitext(os.path.basename(path))[0]
+            tulis_tabel(hasil, os.path.join(args.keluaran, f"{nama}_peringkat.{args.format}"))
+        else:
+            keluarkan(hasil, args.keluaran)
+    print(f"{len(args.matriks)} matriks dihitung dalam {time.perf_counter() - mulai:.2f} detik", file=sys.stderr)
+    return 0
+
+
+def cmd_impor(args):
+    jalankan_migrasi(args.db, MIGRASI_ALTERNATIF)
+    hasil = impor_alternatif(args.username, args.file, args.db, ukuran_chunk=args.ukuran_chunk,
+                             lapisan=baca_lapisan_arg(args))
+    print(f"{hasil['diimpor']} baris diimpor ({hasil['berubah']} baru atau berubah), {hasil['ditolak']} ditolak, "
+          f"{hasil['baris_per_detik']:.0f} baris/detik", file=sys.stderr)
+    return 0
+
+
+def cmd_hitung_ulang(args):
+    jalankan_migrasi(args.db, MIGRASI_ALTERNATIF)
+    job_id = args.job
+    if job_id is None and args.lanjutkan:
+        job_id = job_terakhir_belum_selesai(args.db)
+    mulai = time.perf_counter()
+    hasil = hitung_ulang_semua(
+        args.db, job_id=job_id, proses=args.proses,
+        progres=lambda n, total: print(f"\r{n}/{total} user", end="", file=sys.stderr),
+    )
+    print(file=sys.stderr)
+    print(f"Job #{hasil['job_id']}: {hasil.get('selesai', 0)} user selesai, {hasil.get('dilewati', 0)} dilewati, "
+          f"{hasil['skor_diperbarui']} skor alternatif dikonversi ulang "
+          f"dalam {time.perf_counter() - mulai:.1f} detik", file=sys.stderr)
+    return 0
+
+
+def cmd_ekspor(args):
+    jalankan_migrasi(args.db, MIGRASI_ALTERNATIF)
+    mulai = time.perf_counter()
+    if args.run is None:
+        n = ekspor_alternatif(args.username, args.keluaran, db_file=args.db, ukuran_chunk=args.ukuran_chunk)
+    else:
+        run_id = args.run
+        if run_id == "terakhir":
+            row = get_connection(args.db).execute(
+                "SELECT MAX(id) FROM laporan_run WHERE username = ?", (args.username,)).fetchone()
+            run_id = row[0]
+            if run_id is None:
+                print(f"Belum ada laporan untuk '{args.username}'.", file=sys.stderr)
+                return 1
+        n = ekspor_peringkat(int(run_id), args.keluaran, db_file=args.db, ukuran_chunk=args.ukuran_chunk)
+    print(f"{n} baris diekspor ke {args.keluaran} dalam {time.perf_counter() - mulai:.2f} detik", file=sys.stderr)
+    return 0
+
+
+def baca_nilai_tetap(daftar):
+    """Argumen KODE=NILAI (misalnya C2=30000, C5=Aspal) menjadi dict kode -> nilai mentah."""
+    nilai = {}
+    for item in daftar or []:
+        kode, _, isi = item.partition("=")
+        kode = kode.strip().upper()
+        if kode not in ATURAN or not isi:
+            raise ValueError(f"Format --nilai tidak valid: {item} (gunakan KODE=NILAI, misalnya C2=30000)")
+        nilai[kode] = isi if "kategori" in ATURAN[kode] else float(isi)
+    return nilai
+
+
+def cmd_pindai(args):
+    if args.simpan_alternatif and not args.username:
+        print("--simpan-alternatif membutuhkan --username.", file=sys.stderr)
+        return 2
+    if args.bobot:
+        df_bobot = baca_bobot(args.bobot)
+    elif args.username:
+        jalankan_migrasi(args.db, MIGRASI_ALTERNATIF)
+        df_bobot = get_user_bobot(args.username, args.db)
+    else:
+        print("Gunakan --bobot atau --username untuk bobot kriteria.", file=sys.stderr)
+        return 2
+    if df_bobot.empty:
+        print(f"Bobot kriteria untuk '{args.username}' belum diisi.", file=sys.stderr)
+        return 1
+
+    mulai = time.perf_counter()
+    hasil = pindai_wilayah(
+        args.bbox, args.ukuran_sel, df_bobot, titik_lapisan(args.lapisan), baca_nilai_tetap(args.nilai),
+        top_n=args.top_n, proses=args.proses,
+        progres=lambda n, total: print(f"\r{n}/{total} pita", end="", file=sys.stderr),
+        poligon=poligon_lapisan(args.lapisan),
+    )
+    print(file=sys.stderr)
+    if hasil["peringatan"]:
+        print(f"Peringatan: {hasil['peringatan']}", file=sys.stderr)
+    grid = hasil["grid"]
+    print(f"{grid['baris'] * grid['kolom']:,} sel ({grid['baris']} x {grid['kolom']}) dipindai dalam "
+          f"{time.perf_counter() - mulai:.1f} detik", file=sys.stderr)
+
+    if args.raster:
+        simpan_raster(hasil, args.raster)
+    teratas = hasil["teratas"]
+    if args.simpan_alternatif:
+        baris = [(args.username, r[0], *r[1:]) for r in teratas[["Alternatif"] + KOLOM_KRITERIA].itertuples(index=False)]
+        berubah = insert_alternatives_bulk(baris, args.db)
+        print(f"{len(baris)} sel teratas disimpan sebagai alternatif ({berubah} baru atau berubah)", file=sys.stderr)
+    keluarkan(dengan_peringkat(teratas), args.keluaran)
+    return 0
+
+
+def buat_parser():
+    parser = argparse.ArgumentParser(prog="spk-moora", description="SPK MOORA tanpa antarmuka Streamlit")
+    sub = parser.add_subparsers(dest="perintah", required=True)
+
+    hitung = sub.add_parser("hitung", help="Hitung peringkat MOORA")
+    hitung.add_argument("--matriks", nargs="+", help="File matriks keputusan (CSV/Parquet/Excel)")
+    hitung.add_argument("--bobot", help="File bobot kriteria (kolom Kriteria, Bobot, opsional Jenis)")
+    hitung.add_argument("--username", help="Baca alternatif (dan bobot bila --bobot kosong) dari database")
+    hitung.add_argument("--db", default=DB_FILE, help="File database SQLite")
+    hitung.add_argument("--top-k", type=int, help="Hanya k alternatif teratas")
+    hitung.add_argument("--keluaran", help="File hasil (atau direktori untuk beberapa matriks); kosong = stdout")
+    hitung.add_argument("--format", choices=FORMAT_KELUARAN, default="csv", help="Format file untuk beberapa matriks")
+    hitung.add_argument("--simpan-laporan", action="store_true", help="Simpan hasil sebagai run laporan (mode --username)")
+    hitung.add_argument("--semua-metode", action="store_true",
+                        help="Ratio system, reference point, full multiplicative dan peringkat konsensus")
+    hitung.add_argument("--lapisan", help="Folder lapisan fitur untuk menghitung jarak dari Latitude/Longitude")
+    hitung.add_argument("--pareto", action="store_true",
+                        help="Hanya peringkatkan alternatif yang tidak didominasi (front Pareto)")
+    hitung.set_defaults(fungsi=cmd_hitung)
+
+    impor = sub.add_parser("impor", help="Impor alternatif dari CSV/Parquet ke database")
+    impor.add_argument("file")
+    impor.add_argument("--username", required=True)
+    impor.add_argument("--db", default=DB_FILE)
+    impor.add_argument("--ukuran-chunk", type=int, default=50_000)
+    impor.add_argument("--lapisan", help="Folder lapisan fitur untuk menghitung jarak dari Latitude/Longitude")
+    impor.set_defaults(fungsi=cmd_impor)
+
+    ulang = sub.add_parser("hitung-ulang", help="Hitung ulang peringkat semua user secara paralel")
+    ulang.add_argument("--db", default=DB_FILE)
+    ulang.add_argument("--proses", type=int, help="Jumlah proses (bawaan: semua core)")
+    ulang.add_argument("--job", type=int, help="Lanjutkan job dengan id ini")
+    ulang.add_argument("--lanjutkan", action="store_true", help="Lanjutkan job terakhir yang belum selesai")
+    ulang.set_defaults(fungsi=cmd_hitung_ulang)
+
+    ekspor = sub.add_parser("ekspor", help="Ekspor alternatif atau peringkat ke CSV/Parquet/XLSX")
+    ekspor.add_argument("--username", required=True)
+    ekspor.add_argument("--db", default=DB_FILE)
+    ekspor.add_argument("--run", help="Id run laporan (atau 'terakhir'); kosong = ekspor data alternatif")
+    ekspor.add_argument("--keluaran", required=True, help="File tujuan (.csv, .parquet atau .xlsx)")
+    ekspor.add_argument("--ukuran-chunk", type=int, default=50_000)
+    ekspor.set_defaults(fungsi=cmd_ekspor)
+
+    pindai = sub.add_parser("pindai", help="Pindai kesesuaian seluruh wilayah per sel grid")
+    pindai.add_argument("--bbox", type=float, nargs=4, required=True,
+                        metavar=("LAT_MIN", "LON_MIN", "LAT_MAKS", "LON_MAKS"))
+    pindai.add_argument("--ukuran-sel", type=float, default=UKURAN_SEL, help="Ukuran sel (meter)")
+    pindai.add_argument("--lapisan", default=DIR_LAPISAN, help="Folder lapisan fitur")
+    pindai.add_argument("--nilai", nargs="+", help="Nilai mentah kriteria tanpa lapisan, KODE=NILAI")
+    pindai.add_argument("--bobot", help="File bobot kriteria (bawaan: bobot milik --username)")
+    pindai.add_argument("--username", help="User pemilik bobot dan tujuan --simpan-alternatif")
+    pindai.add_argument("--db", default=DB_FILE)
+    pindai.add_argument("--top-n", type=int, default=TOP_N, help="Jumlah sel terbaik yang dikeluarkan")
+    pindai.add_argument("--proses", type=int, help="Jumlah proses (bawaan: semua core)")
+    pindai.add_argument("--raster", help="File raster skor (.asc atau .npy)")
+    pindai.add_argument("--keluaran", help="File sel teratas; kosong = stdout")
+    pindai.add_argument("--simpan-alternatif", action="store_true", help="Simpan sel teratas sebagai alternatif user")
+    pindai.set_defaults(fungsi=cmd_pindai)
+    return parser
+
+
+def main(argv=None):
+    args = buat_parser().parse_args(argv)
+    try:
+        return args.fungsi(args)
+    except (ValueError, ImportError) as e:
+        # Kesalahan data masukan (file bobot/matriks) atau paket format keluaran yang belum terpasang
+        # ditampilkan sebagai pesan, bukan traceback
+        print(f"Galat: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
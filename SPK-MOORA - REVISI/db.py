@@ -0,0 +1,620 @@
+import contextlib
+import functools
+import hashlib
+import inspect
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+import pandas as pd
+
+import metrik
+from konversi import ATURAN, KODE_KRITERIA, mentah_ke_json, skor_kriteria
+from metrik import diukur
+
+USER_DB_FILE = "user.db"
+DB_FILE = "alternatif.db"
+
+BUSY_TIMEOUT_MS = 5000
+CACHE_STATEMENT = 256
+# Jumlah maksimum penulisan antrean yang digabung dalam satu transaksi
+MAKS_GRUP_TULIS = 64
+# BEGIN IMMEDIATE yang tetap terkunci setelah busy_timeout dicoba ulang sebanyak ini dengan jeda bertambah
+PERCOBAAN_BEGIN = 3
+JEDA_BEGIN = 0.1
+
+# Satu koneksi per thread per file database, dipakai ulang oleh semua operasi di thread tersebut tanpa
+# connect/close di setiap operasi. Streamlit menjalankan setiap rerun di thread script baru, jadi di halaman
+# koneksi hanya bertahan selama satu rerun; koneksi thread yang sudah selesai ikut ditutup saat data
+# thread-local-nya dibuang. Thread yang berumur panjang (penulis, pekerja latar, CLI) memakai koneksinya terus.
+_lokal = threading.local()
+
+
+class _Koneksi(sqlite3.Connection):
+    # Menghitung kueri yang dijalankan lewat koneksi (executemany dihitung satu kueri)
+    def execute(self, *args):
+        metrik.tambah("db_kueri")
+        return super().execute(*args)
+
+    def executemany(self, *args):
+        metrik.tambah("db_kueri")
+        return super().executemany(*args)
+
+
+def _buka_koneksi(db_file):
+    # isolation_level=None: pembacaan berjalan autocommit, penulisan dibungkus transaksi() secara eksplisit.
+    # cached_statements: statement yang sama (teks SQL sama) dipakai ulang tanpa di-prepare lagi.
+    conn = sqlite3.connect(db_file, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None,
+                           cached_statements=CACHE_STATEMENT, factory=_Koneksi)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")
+    return conn
+
+
+def get_connection(db_file=DB_FILE):
+    """Ambil koneksi milik thread ini untuk db_file (dibuat sekali lalu dipakai ulang).
+
+    Kunci pool adalah path absolut, jadi path relatif dan absolut ke file yang sama memakai koneksi yang sama.
+    """
+    pool = getattr(_lokal, "pool", None)
+    if pool is None:
+        pool = _lokal.pool = {}
+    kunci = os.path.abspath(db_file)
+    conn = pool.get(kunci)
+    if conn is None:
+        conn = pool[kunci] = _buka_koneksi(kunci)
+    return conn
+
+
+def tutup_koneksi():
+    """Tutup semua koneksi milik thread ini."""
+    pool = getattr(_lokal, "pool", {})
+    for conn in pool.values():
+        conn.close()
+    pool.clear()
+
+
+@contextlib.contextmanager
+def transaksi(db_file=DB_FILE):
+    """Jalankan beberapa penulisan dalam satu transaksi (BEGIN IMMEDIATE ... COMMIT).
+
+    Jika dipanggil di dalam transaksi yang sedang berjalan, penulisan ikut transaksi luar.
+    """
+    conn = get_connection(db_file)
+    if conn.in_transaction:
+        yield conn
+        return
+    awal = conn.total_changes
+    _begin(conn)
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    metrik.tambah("baris_ditulis", conn.total_changes - awal)
+
+
+def _begin(conn):
+    # Database yang dikunci proses lain (misalnya CLI impor) melewati busy_timeout: dicoba lagi, bukan langsung gagal
+    for percobaan in range(PERCOBAAN_BEGIN):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            return
+        except sqlite3.OperationalError:
+            if percobaan == PERCOBAAN_BEGIN - 1:
+                raise
+            metrik.tambah("db_begin_ulang")
+            time.sleep(JEDA_BEGIN * 2 ** percobaan)
+
+
+class _Penulis:
+    """Satu thread penulis per file database: penulisan dari semua sesi diantrekan dan dijalankan berurutan.
+
+    Penulisan yang menumpuk di antrean digabung dalam satu transaksi (satu kunci tulis dan satu commit).
+    Tiap penulisan berjalan di savepoint sendiri, jadi penulisan yang gagal hanya membatalkan dirinya;
+    Future tiap pemanggil baru diselesaikan setelah COMMIT. kunci dipegang selama satu grup berjalan dan
+    tertunda menghitung penulisan antrean yang belum selesai; lewat_penulis memakai keduanya untuk menulis
+    langsung di thread pemanggil saat penulis menganggur.
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.antrean = queue.SimpleQueue()
+        self.kunci = threading.Lock()
+        self.tertunda = 0
+        self._kunci_tertunda = threading.Lock()
+        self.thread = threading.Thread(target=self._jalankan, name=f"spk-penulis-{os.path.basename(db_file)}",
+                                       daemon=True)
+        self.thread.start()
+
+    def kirim(self, fungsi, args, kwargs):
+        future = Future()
+        with self._kunci_tertunda:
+            self.tertunda += 1
+        self.antrean.put((future, fungsi, args, kwargs))
+        return future
+
+    def _selesai(self, n):
+        with self._kunci_tertunda:
+            self.tertunda -= n
+
+    def _ambil_grup(self):
+        grup = [self.antrean.get()]
+        while len(grup) < MAKS_GRUP_TULIS:
+            try:
+                grup.append(self.antrean.get_nowait())
+            except queue.Empty:
+                break
+        return grup
+
+    def _jalankan(self):
+        _lokal.penulis = True
+        while True:
+            diambil = self._ambil_grup()
+            grup = [t for t in diambil if t[0].set_running_or_notify_cancel()]
+            try:
+                self._tulis_grup(grup)
+            finally:
+                self._selesai(len(diambil))
+
+    def _tulis_grup(self, grup):
+        if not grup:
+            return
+        metrik.tambah("tulis_antrean", len(grup))
+        metrik.tambah("tulis_grup")
+        hasil = []
+        try:
+            with self.kunci, metrik.ukur("db.penulis.grup"), transaksi(self.db_file) as conn:
+                for future, fungsi, args, kwargs in grup:
+                    if len(grup) == 1:
+                        # Penulisan tunggal tidak butuh savepoint: bila gagal, transaksinya sendiri dibatalkan
+                        hasil.append((future, True, fungsi(*args, **kwargs)))
+                        continue
+                    conn.execute("SAVEPOINT tulis")
+                    try:
+                        hasil.append((future, True, fungsi(*args, **kwargs)))
+                        conn.execute("RELEASE tulis")
+                    except BaseException as e:
+                        conn.execute("ROLLBACK TO tulis")
+                        conn.execute("RELEASE tulis")
+                        hasil.append((future, False, e))
+        except BaseException as e:
+            # BEGIN (setelah dicoba ulang) atau COMMIT gagal, atau penulisan tunggal gagal
+            for future, *_ in grup:
+                future.set_exception(e)
+            return
+        for future, berhasil, nilai in hasil:
+            if berhasil:
+                future.set_result(nilai)
+            else:
+                future.set_exception(nilai)
+
+
+_penulis = {}
+_kunci_penulis = threading.Lock()
+
+
+def penulis(db_file=DB_FILE):
+    """Penulis (thread + antrean) untuk db_file, dibuat sekali per proses."""
+    kunci = os.path.abspath(db_file)
+    with _kunci_penulis:
+        p = _penulis.get(kunci)
+        if p is None:
+            p = _penulis[kunci] = _Penulis(kunci)
+    return p
+
+
+def lewat_penulis(fungsi):
+    """Dekorator: fungsi penulisan dijalankan di thread penulis database-nya (parameter db_file, bawaan DB_FILE).
+
+    Pemanggilan biasa menunggu hasilnya; fungsi.kirim(...) mengembalikan Future tanpa menunggu.
+    Pemanggilan dari dalam transaksi yang sedang berjalan di thread ini (atau dari thread penulis sendiri)
+    langsung dijalankan agar ikut transaksi tersebut. Bila tidak ada penulisan antrean yang tertunda dan
+    penulis sedang tidak menulis, fungsi juga langsung dijalankan di thread pemanggil sambil memegang kunci
+    penulis, tanpa biaya serah-terima antar thread; penulisan tetap satu per satu dan urutannya terjaga.
+    """
+    signature = inspect.signature(fungsi)
+    bawaan = signature.parameters["db_file"].default if "db_file" in signature.parameters else DB_FILE
+
+    def _db_file(args, kwargs):
+        return signature.bind(*args, **kwargs).arguments.get("db_file", bawaan)
+
+    def kirim(*args, **kwargs):
+        return penulis(_db_file(args, kwargs)).kirim(fungsi, args, kwargs)
+
+    @functools.wraps(fungsi)
+    def pembungkus(*args, **kwargs):
+        db_file = _db_file(args, kwargs)
+        if getattr(_lokal, "penulis", False) or get_connection(db_file).in_transaction:
+            return fungsi(*args, **kwargs)
+        p = penulis(db_file)
+        if p.kunci.acquire(blocking=False):
+            try:
+                if p.tertunda == 0:
+                    metrik.tambah("tulis_langsung")
+                    # Selama kunci dipegang, thread ini berperan sebagai penulis (panggilan bersarang ikut langsung)
+                    _lokal.penulis = True
+                    try:
+                        return fungsi(*args, **kwargs)
+                    finally:
+                        _lokal.penulis = False
+            finally:
+                p.kunci.release()
+        return p.kirim(fungsi, args, kwargs).result()
+
+    pembungkus.kirim = kirim
+    return pembungkus
+
+
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+@diukur()
+def save_user_to_db(username, password):
+    with transaksi(USER_DB_FILE) as conn:
+        conn.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, hash_password(password)))
+
+@diukur()
+def check_user_credentials(username, password):
+    c = get_connection(USER_DB_FILE).execute("SELECT password FROM users WHERE username = ?", (username,))
+    row = c.fetchone()
+    return row and row[0] == hash_password(password)
+
+@diukur()
+def user_exists(username):
+    c = get_connection(USER_DB_FILE).execute("SELECT 1 FROM users WHERE username = ?", (username,))
+    return c.fetchone() is not None
+
+# Versi data per user dinaikkan di setiap jalur penulisan (dalam transaksi yang sama),
+# sehingga cache dapat memakai (username, versi) sebagai kunci.
+SQL_NAIKKAN_VERSI = """
+    INSERT INTO versi_data (username, versi) VALUES (?, 1)
+    ON CONFLICT(username) DO UPDATE SET versi = versi + 1
+"""
+
+def naikkan_versi(conn, *usernames):
+    conn.executemany(SQL_NAIKKAN_VERSI, [(u,) for u in usernames])
+
+def _naikkan_versi_pemilik(conn, row_id):
+    conn.execute("""
+        INSERT INTO versi_data (username, versi) SELECT username, 1 FROM alternatif WHERE id = ?
+        ON CONFLICT(username) DO UPDATE SET versi = versi + 1
+    """, (row_id,))
+
+@diukur()
+def get_versi_data(username):
+    row = get_connection(DB_FILE).execute("SELECT versi FROM versi_data WHERE username = ?", (username,)).fetchone()
+    return row[0] if row else 0
+
+SQL_UPSERT_BOBOT = """
+    INSERT INTO bobot_kriteria (username, kriteria, keterangan, bobot, jenis)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(username, kriteria) DO UPDATE SET bobot = excluded.bobot
+"""
+
+def insert_or_update_weights(username, bobot_data):
+    save_weights_to_db(username, bobot_data)
+
+@diukur()
+@lewat_penulis
+def save_weights_to_db(username, bobot_data):
+    with transaksi(DB_FILE) as conn:
+        conn.executemany(SQL_UPSERT_BOBOT, [(username, *row) for row in bobot_data])
+        naikkan_versi(conn, username)
+
+
+@diukur(baca=True)
+def get_user_bobot(username, db_file=DB_FILE):
+    c = get_connection(db_file).execute(
+        "SELECT kriteria, keterangan, bobot, jenis FROM bobot_kriteria WHERE username = ?", (username,))
+    return pd.DataFrame(c.fetchall(), columns=["Kriteria", "Keterangan", "Bobot", "Jenis"])
+
+
+# Alternatif unik per (username, nama): nama yang sudah ada diperbarui nilainya, bukan ditambah baris baru.
+# Baris yang nilainya sama persis tidak ditulis ulang, sehingga impor ulang data yang sama hampir tanpa biaya tulis.
+# mentah (JSON nilai ukur) kosong berarti nilai ukur tidak diketahui: mentah lama dipertahankan bila skornya
+# tidak berubah, dan dikosongkan bila skornya diganti (nilai mentah lama tidak lagi sesuai dengan skor).
+SQL_UPSERT_ALTERNATIF = """
+    INSERT INTO alternatif (username, alternatif, c1, c2, c3, c4, c5, c6, c7, c8, c9, mentah)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(username, alternatif) DO UPDATE SET
+        c1 = excluded.c1, c2 = excluded.c2, c3 = excluded.c3, c4 = excluded.c4, c5 = excluded.c5,
+        c6 = excluded.c6, c7 = excluded.c7, c8 = excluded.c8, c9 = excluded.c9,
+        mentah = COALESCE(excluded.mentah, IIF(
+            (c1, c2, c3, c4, c5, c6, c7, c8, c9) IS
+            (excluded.c1, excluded.c2, excluded.c3, excluded.c4, excluded.c5,
+             excluded.c6, excluded.c7, excluded.c8, excluded.c9), mentah, NULL))
+    WHERE (c1, c2, c3, c4, c5, c6, c7, c8, c9) IS NOT
+          (excluded.c1, excluded.c2, excluded.c3, excluded.c4, excluded.c5,
+           excluded.c6, excluded.c7, excluded.c8, excluded.c9)
+       OR (excluded.mentah IS NOT NULL AND mentah IS NOT excluded.mentah)
+"""
+
+# Ubah nama dan skor dari editor; mentah dikosongkan bila skornya diubah langsung (ekspresi SET membaca nilai lama)
+SQL_UBAH_ALTERNATIF = """
+    UPDATE alternatif SET
+        alternatif = ?, c1 = ?, c2 = ?, c3 = ?, c4 = ?, c5 = ?,
+        c6 = ?, c7 = ?, c8 = ?, c9 = ?,
+        mentah = IIF((c1, c2, c3, c4, c5, c6, c7, c8, c9) IS (?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9, ?10), mentah, NULL)
+"""
+
+def _baris_upsert(baris):
+    # Baris tanpa nilai mentah (username, alternatif, c1..c9) dilengkapi mentah kosong
+    return baris if len(baris) == 12 else (*baris, None)
+
+def _upsert_alternatif(conn, baris):
+    """Upsert satu baris (username, alternatif, c1..c9[, mentah]). Mengembalikan (id, berubah)."""
+    baris = _baris_upsert(baris)
+    # Tanpa RETURNING (butuh SQLite 3.35+): perubahan dilihat dari total_changes, id dibaca lewat kunci unik
+    awal = conn.total_changes
+    conn.execute(SQL_UPSERT_ALTERNATIF, baris)
+    berubah = conn.total_changes != awal
+    row = conn.execute("SELECT id FROM alternatif WHERE username = ? AND alternatif = ?", baris[:2]).fetchone()
+    return row[0], berubah
+
+@diukur()
+@lewat_penulis
+def insert_alternative(username, data):
+    """Tambah alternatif, atau perbarui nilainya bila nama tersebut sudah ada. Mengembalikan id baris."""
+    with transaksi(DB_FILE) as conn:
+        row_id, berubah = _upsert_alternatif(conn, (
+            username, data["Alternatif"],
+            data["C1 (Bobot)"], data["C2 (Bobot)"], data["C3 (Bobot)"], data["C4 (Bobot)"],
+            data["C5 (Bobot)"], data["C6 (Bobot)"], data["C7 (Bobot)"], data["C8 (Bobot)"], data["C9 (Bobot)"],
+            mentah_ke_json({kode: data.get(ATURAN[kode]["kolom"]) for kode in KODE_KRITERIA}),
+        ))
+        if berubah:
+            naikkan_versi(conn, username)
+    return row_id
+
+@diukur()
+@lewat_penulis
+def insert_alternatives_bulk(rows, db_file=DB_FILE):
+    """Upsert massal; rows: list tuple (username, alternatif, c1, ..., c9[, mentah]).
+
+    Mengembalikan jumlah baris yang berubah.
+    """
+    rows = [_baris_upsert(row) for row in rows]
+    with transaksi(db_file) as conn:
+        awal = conn.total_changes
+        conn.executemany(SQL_UPSERT_ALTERNATIF, rows)
+        berubah = conn.total_changes - awal
+        # Versi (dan cache/snapshot) hanya dinaikkan bila ada data yang benar-benar berubah
+        if berubah:
+            naikkan_versi(conn, *{row[0] for row in rows})
+    return berubah
+
+@diukur(baca=True)
+def get_user_alternatives(username):
+    return pd.read_sql_query("SELECT * FROM alternatif WHERE username = ? ORDER BY id", get_connection(DB_FILE),
+                             params=(username,))
+
+@diukur()
+@lewat_penulis
+def update_alternative(row_id, values):
+    with transaksi(DB_FILE) as conn:
+        conn.execute(SQL_UBAH_ALTERNATIF + " WHERE id = ?11", (*values, row_id))  # values = 10 elemen, row_id di akhir
+        _naikkan_versi_pemilik(conn, row_id)
+
+
+@diukur()
+@lewat_penulis
+def delete_alternative(row_id):
+    with transaksi(DB_FILE) as conn:
+        _naikkan_versi_pemilik(conn, row_id)
+        conn.execute("DELETE FROM alternatif WHERE id = ?", (row_id,))
+
+@diukur(baca=True)
+def get_alternatif_user(username, db_file=DB_FILE):
+    # Kolom mentah (JSON nilai ukur) tidak ikut dimuat untuk perhitungan dan tampilan
+    c = get_connection(db_file).execute(
+        "SELECT id, username, alternatif, c1, c2, c3, c4, c5, c6, c7, c8, c9 FROM alternatif WHERE username = ? ORDER BY id",
+        (username,))
+    rows = c.fetchall()
+    colnames = [desc[0] for desc in c.description]
+
+    if rows:
+        return pd.DataFrame(rows, columns=colnames)
+    return pd.DataFrame()
+
+SQL_INSERT_LAPORAN = """INSERT INTO laporan_moora (run_id, username, peringkat, nama_alternatif, skor)
+                        VALUES (?, ?, ?, ?, ?)"""
+UKURAN_BATCH_LAPORAN = 50_000
+# Jumlah run laporan yang disimpan per user; run yang lebih lama dihapus saat run baru dibuat
+MAKS_RUN_LAPORAN = 20
+
+def sidik_laporan(versi, df_bobot, *opsi):
+    """Sidik (hash) versi data, bobot dan opsi perhitungan; run dengan sidik yang sama berisi hasil yang sama."""
+    isi = repr((versi, df_bobot[["Kriteria", "Bobot", "Jenis"]].to_numpy().tolist(), opsi))
+    return hashlib.sha1(isi.encode()).hexdigest()
+
+def buat_run_laporan(conn, username, jumlah=0, keterangan=None, top_k=None, total=None, sidik=None):
+    """Buat run laporan baru. top_k diisi bila run hanya berisi k teratas dari total alternatif."""
+    run_id = conn.execute(
+        "INSERT INTO laporan_run (username, dibuat, jumlah, keterangan, top_k, total, sidik) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (username, datetime.now().isoformat(sep=" ", timespec="seconds"), jumlah, keterangan, top_k,
+         jumlah if total is None else total, sidik),
+    ).lastrowid
+    lama = [(r[0],) for r in conn.execute(
+        "SELECT id FROM laporan_run WHERE username = ? ORDER BY id DESC LIMIT -1 OFFSET ?", (username, MAKS_RUN_LAPORAN))]
+    if lama:
+        conn.executemany("DELETE FROM laporan_moora WHERE run_id = ?", lama)
+        conn.executemany("DELETE FROM laporan_run WHERE id = ?", lama)
+    return run_id
+
+@diukur()
+@lewat_penulis
+def save_laporan(username, df_hasil, keterangan=None, db_file=DB_FILE, progres=None, top_k=None, total=None,
+                 sidik=None):
+    """Simpan satu hasil peringkat (kolom "Alternatif", "Skor Akhir", sudah terurut) sebagai run baru.
+
+    Hanya MAKS_RUN_LAPORAN run terbaru per user yang disimpan. Mengembalikan id run. Bila sidik sama dengan
+    sidik run terakhir user (data dan bobot belum berubah), tidak ada yang ditulis dan id run itu dikembalikan.
+    top_k/total mencatat bahwa run hanya berisi k teratas dari total alternatif. Dengan progres(ditulis, total),
+    baris ditulis per batch dan progres dipanggil setelah tiap batch; exception dari progres membatalkan seluruh run.
+    """
+    n = len(df_hasil)
+    with transaksi(db_file) as conn:
+        if sidik is not None:
+            terakhir = conn.execute("SELECT id, sidik FROM laporan_run WHERE username = ? ORDER BY id DESC LIMIT 1",
+                                    (username,)).fetchone()
+            if terakhir is not None and terakhir[1] == sidik:
+                return terakhir[0]
+        run_id = buat_run_laporan(conn, username, n, keterangan, top_k, total, sidik)
+        baris = zip(
+            itertools.repeat(run_id, n), itertools.repeat(username, n), range(1, n + 1),
+            df_hasil["Alternatif"].tolist(), df_hasil["Skor Akhir"].astype(float).tolist(),
+        )
+        if progres is None:
+            conn.executemany(SQL_INSERT_LAPORAN, baris)
+        else:
+            for awal in range(0, n, UKURAN_BATCH_LAPORAN):
+                conn.executemany(SQL_INSERT_LAPORAN, itertools.islice(baris, UKURAN_BATCH_LAPORAN))
+                progres(min(awal + UKURAN_BATCH_LAPORAN, n), n)
+    return run_id
+
+@diukur(baca=True)
+def get_daftar_laporan(username):
+    c = get_connection(DB_FILE).execute(
+        "SELECT id, dibuat, jumlah, keterangan, top_k, total FROM laporan_run WHERE username = ? ORDER BY id DESC",
+        (username,))
+    return pd.DataFrame(c.fetchall(), columns=["id", "dibuat", "jumlah", "keterangan", "top_k", "total"])
+
+@diukur(baca=True)
+def get_laporan(run_id):
+    c = get_connection(DB_FILE).execute(
+        "SELECT peringkat, nama_alternatif, skor FROM laporan_moora WHERE run_id = ? ORDER BY peringkat", (run_id,))
+    return pd.DataFrame(c.fetchall(), columns=["Peringkat", "Alternatif", "Skor Akhir"])
+
+@diukur(baca=True)
+def bandingkan_laporan(run_lama, run_baru):
+    """Perubahan peringkat dan skor antar dua run, dicocokkan berdasarkan nama alternatif."""
+    c = get_connection(DB_FILE).execute("""
+        SELECT b.nama_alternatif, l.peringkat, b.peringkat, l.peringkat - b.peringkat, l.skor, b.skor
+        FROM laporan_moora b
+        LEFT JOIN laporan_moora l ON l.run_id = ? AND l.nama_alternatif = b.nama_alternatif
+        WHERE b.run_id = ?
+        ORDER BY b.peringkat
+    """, (run_lama, run_baru))
+    return pd.DataFrame(c.fetchall(), columns=["Alternatif", "Peringkat Lama", "Peringkat Baru", "Naik",
+                                               "Skor Lama", "Skor Baru"])
+
+KOLOM_ALTERNATIF = ["alternatif", "c1", "c2", "c3", "c4", "c5", "c6", "c7", "c8", "c9"]
+
+def _filter_alternatif(username, cari=None, kriteria=None):
+    # kriteria: dict kolom skor (c1..c9) -> nilai; nama kolom dicek agar aman disisipkan ke SQL
+    syarat, parameter = ["username = ?"], [username]
+    if cari:
+        pola = cari.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        syarat.append("alternatif LIKE ? ESCAPE '\\'")
+        parameter.append(f"%{pola}%")
+    for kolom, nilai in (kriteria or {}).items():
+        if kolom not in KOLOM_ALTERNATIF[1:]:
+            raise ValueError(f"Kolom filter tidak dikenal: {kolom}")
+        syarat.append(f"{kolom} = ?")
+        parameter.append(nilai)
+    return " AND ".join(syarat), parameter
+
+@diukur(baca=True)
+def get_halaman_alternatif(username, setelah_id=0, batas=100, cari=None, kriteria=None, db_file=DB_FILE):
+    """Satu halaman alternatif user: baris dengan id > setelah_id, urut id, paling banyak batas baris.
+
+    Paginasi keyset memakai indeks (username, id), jadi halaman berikutnya tidak perlu melewati baris
+    sebelumnya seperti OFFSET. cari menyaring nama (mengandung teks, tanpa membedakan huruf besar untuk ASCII)
+    dan kriteria menyaring skor (kelas 1–4), misalnya {"c3": 4}.
+    """
+    where, parameter = _filter_alternatif(username, cari, kriteria)
+    c = get_connection(db_file).execute(
+        f"SELECT id, {', '.join(KOLOM_ALTERNATIF)} FROM alternatif WHERE {where} AND id > ? ORDER BY id LIMIT ?",
+        (*parameter, setelah_id, batas))
+    return pd.DataFrame(c.fetchall(), columns=["id"] + KOLOM_ALTERNATIF)
+
+def hitung_alternatif(username, cari=None, kriteria=None, db_file=DB_FILE):
+    """Jumlah alternatif user yang cocok dengan filter get_halaman_alternatif()."""
+    where, parameter = _filter_alternatif(username, cari, kriteria)
+    return get_connection(db_file).execute(f"SELECT COUNT(*) FROM alternatif WHERE {where}", parameter).fetchone()[0]
+
+def hitung_perubahan(df_awal, df_edit):
+    """Bandingkan tabel editor dengan data yang dimuat (keduanya ber-index id alternatif).
+
+    Mengembalikan dict berisi baris baru (list nilai), baris yang berubah (list (id, nilai)),
+    id yang dihapus, dan jumlah baris (baru maupun yang diubah) yang belum lengkap sehingga dilewati.
+    Skor di luar kelas tabel konversi kriteria melempar ValueError.
+    """
+    df_awal = df_awal[KOLOM_ALTERNATIF]
+    df_edit = df_edit[KOLOM_ALTERNATIF]
+
+    id_ada = df_edit.index.notna() & df_edit.index.isin(df_awal.index)
+    baru = df_edit[~id_ada]
+    lama = df_edit[id_ada]
+
+    dihapus = df_awal.index.difference(lama.index)
+
+    awal = df_awal.loc[lama.index]
+    beda = (lama != awal) & ~(lama.isna() & awal.isna())
+    diubah = lama[beda.any(axis=1)]
+
+    def _lengkap(df):
+        return df.notna().all(axis=1) & (df["alternatif"].astype("string").str.strip() != "")
+
+    lengkap_baru, lengkap_ubah = _lengkap(baru), _lengkap(diubah)
+    baru, diubah = baru[lengkap_baru], diubah[lengkap_ubah]
+
+    # Skor hanya boleh salah satu kelas tabel konversi (misalnya c3=99 ditolak)
+    salah = []
+    for df in (baru, diubah):
+        for kode in KODE_KRITERIA:
+            kolom = kode.lower()
+            di_luar = ~df[kolom].isin(skor_kriteria(kode))
+            salah += [f"'{n}' ({kolom}={v})" for n, v in zip(df.loc[di_luar, "alternatif"], df.loc[di_luar, kolom])]
+    if salah:
+        raise ValueError("skor di luar kelas konversi: " + ", ".join(salah[:5])
+                         + (f" dan {len(salah) - 5} lainnya" if len(salah) > 5 else ""))
+
+    def _nilai(df):
+        df = df.astype({k: int for k in KOLOM_ALTERNATIF[1:]})
+        return df.to_numpy(dtype=object).tolist()
+
+    return {
+        "baru": _nilai(baru),
+        "diubah": list(zip(diubah.index.astype(int).tolist(), _nilai(diubah))),
+        "dihapus": dihapus.astype(int).tolist(),
+        "dilewati": int((~lengkap_baru).sum() + (~lengkap_ubah).sum()),
+    }
+
+@diukur()
+@lewat_penulis
+def terapkan_perubahan(username, perubahan):
+    """Simpan hasil hitung_perubahan() dalam satu transaksi. Mengembalikan id baris baru.
+
+    Baris baru dengan nama yang sudah ada memperbarui baris tersebut (id yang dikembalikan adalah id lama).
+    Mengganti nama menjadi nama alternatif lain yang sudah ada melempar ValueError dan tidak ada yang disimpan.
+    """
+    with transaksi(DB_FILE) as conn:
+        # Hapus lebih dulu agar nama dari baris yang dihapus bisa dipakai baris lain
+        conn.executemany("DELETE FROM alternatif WHERE id = ? AND username = ?",
+                         [(row_id, username) for row_id in perubahan["dihapus"]])
+        for row_id, nilai in perubahan["diubah"]:
+            try:
+                conn.execute(SQL_UBAH_ALTERNATIF + " WHERE id = ?11 AND username = ?12", (*nilai, row_id, username))
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Nama alternatif '{nilai[0]}' sudah dipakai alternatif lain") from None
+        ids_baru = [_upsert_alternatif(conn, (username, *nilai))[0] for nilai in perubahan["baru"]]
+        naikkan_versi(conn, username)
+    return ids_baru
+
+@diukur()
+@lewat_penulis
+def delete_user_alternatives(username):
+    with transaksi(DB_FILE) as conn:
+        conn.execute("DELETE FROM alternatif WHERE username = ?", (username,))
+        naikkan_versi(conn, username)
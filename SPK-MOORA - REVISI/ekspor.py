@@ -0,0 +1,172 @@
+"""Ekspor peringkat dan alternatif ke CSV, Parquet atau Excel (XLSX) langsung dari cursor SQLite.
+
+Data dibaca per chunk dengan fetchmany dan setiap chunk langsung ditulis ke file tujuan, sehingga memori
+yang dipakai sebanding dengan ukuran chunk, bukan jumlah baris. Parquet membutuhkan pyarrow dan XLSX
+membutuhkan openpyxl (mode write-only); keduanya opsional.
+"""
+import os
+
+import pandas as pd
+
+from db import DB_FILE, get_connection
+from konversi import ATURAN, KODE_KRITERIA, mentah_ke_df, tabel_konversi
+from metrik import diukur
+from moora import KOLOM_KRITERIA
+
+UKURAN_CHUNK = 50_000
+# Batas baris per sheet Excel (termasuk baris judul)
+MAKS_BARIS_XLSX = 1_048_576
+
+FORMAT_EKSPOR = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+SQL_ALTERNATIF = f"SELECT alternatif, {', '.join(KOLOM_KRITERIA)}, mentah FROM alternatif WHERE username = ? ORDER BY id"
+SQL_PERINGKAT = f"""
+    SELECT l.peringkat, l.nama_alternatif, l.skor, {', '.join('a.' + k for k in KOLOM_KRITERIA)}
+    FROM laporan_moora l
+    LEFT JOIN alternatif a ON a.username = l.username AND a.alternatif = l.nama_alternatif
+    WHERE l.run_id = ?
+    ORDER BY l.peringkat
+"""
+
+
+def format_dari_nama(nama):
+    ext = os.path.splitext(str(nama))[1].lower().lstrip(".")
+    if ext == "pq":
+        return "parquet"
+    if ext not in FORMAT_EKSPOR:
+        raise ValueError(f"Format ekspor tidak didukung: {nama} (gunakan .csv, .parquet atau .xlsx)")
+    return ext
+
+
+def _baca_cursor(conn, sql, parameter, kolom, ukuran_chunk):
+    c = conn.execute(sql, parameter)
+    try:
+        while True:
+            rows = c.fetchmany(ukuran_chunk)
+            if not rows:
+                return
+            yield pd.DataFrame.from_records(rows, columns=kolom)
+    finally:
+        c.close()
+
+
+def _label_skor(kode):
+    # Skor -> rentang nilai mentah (kriteria numerik) atau label kategori, dari tabel konversi yang sama
+    tabel = tabel_konversi(kode)
+    return dict(zip(tabel["Bobot"], tabel[ATURAN[kode]["nama"]]))
+
+
+def chunk_alternatif(username, db_file=DB_FILE, ukuran_chunk=UKURAN_CHUNK):
+    """Alternatif user per chunk: nama, lalu tiap kriteria berisi nilai ukur mentah, kelas konversi dan skornya.
+
+    Kolom nilai mentah memakai nama kolom impor, jadi file hasil ekspor dapat diimpor kembali. Alternatif yang
+    disimpan tanpa nilai mentah (misalnya diisi langsung sebagai skor) kolom mentahnya kosong.
+    """
+    label = {kode: _label_skor(kode) for kode in KODE_KRITERIA}
+    kolom = ["Alternatif"] + KOLOM_KRITERIA + ["mentah"]
+    for df in _baca_cursor(get_connection(db_file), SQL_ALTERNATIF, (username,), kolom, ukuran_chunk):
+        mentah = mentah_ke_df(df["mentah"].tolist())
+        hasil = {"Alternatif": df["Alternatif"]}
+        for kode, k in zip(KODE_KRITERIA, KOLOM_KRITERIA):
+            aturan = ATURAN[kode]
+            nilai = mentah[aturan["kolom"]]
+            # Tipe kolom mentah tetap sama di setiap chunk walaupun satu chunk seluruhnya kosong (skema Parquet)
+            hasil[aturan["kolom"]] = nilai.astype("string") if "kategori" in aturan else pd.to_numeric(nilai).astype(float)
+            hasil[f"{aturan['nama']} (Kelas)"] = df[k].map(label[kode])
+            hasil[f"{kode} (Bobot)"] = df[k]
+        yield pd.DataFrame(hasil)
+
+
+def chunk_peringkat(run_id, db_file=DB_FILE, ukuran_chunk=UKURAN_CHUNK):
+    """Hasil satu run laporan per chunk, urut peringkat, beserta skor kriteria alternatif saat ini."""
+    kolom = ["Peringkat", "Alternatif", "Skor Akhir"] + KOLOM_KRITERIA
+    for df in _baca_cursor(get_connection(db_file), SQL_PERINGKAT, (run_id,), kolom, ukuran_chunk):
+        # Alternatif yang sudah dihapus tidak punya skor kriteria; tipe tetap sama di setiap chunk
+        df[KOLOM_KRITERIA] = df[KOLOM_KRITERIA].astype("Int64")
+        yield df
+
+
+def tulis_csv(chunks, f):
+    n = 0
+    for df in chunks:
+        # Mode biner agar tujuan boleh berupa file maupun buffer BytesIO
+        f.write(df.to_csv(index=False, header=n == 0).encode("utf-8"))
+        n += len(df)
+    return n
+
+
+def tulis_parquet(chunks, f):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Ekspor Parquet membutuhkan paket 'pyarrow'.") from e
+
+    n = 0
+    penulis = None
+    try:
+        for df in chunks:
+            tabel = pa.Table.from_pandas(df, preserve_index=False)
+            if penulis is None:
+                penulis = pq.ParquetWriter(f, tabel.schema)
+            else:
+                tabel = tabel.cast(penulis.schema)
+            penulis.write_table(tabel)
+            n += len(df)
+    finally:
+        if penulis is not None:
+            penulis.close()
+    return n
+
+
+def tulis_xlsx(chunks, f, nama_sheet="Data"):
+    try:
+        from openpyxl import Workbook
+    except ImportError as e:
+        raise ImportError("Ekspor Excel membutuhkan paket 'openpyxl'.") from e
+
+    # Mode write-only menulis baris langsung ke file sementara tanpa menyimpan seluruh sheet di memori
+    wb = Workbook(write_only=True)
+    ws, baris_sheet, nomor_sheet, n = None, 0, 0, 0
+    for df in chunks:
+        judul = list(df.columns)
+        for row in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+            if ws is None or baris_sheet >= MAKS_BARIS_XLSX:
+                nomor_sheet += 1
+                ws = wb.create_sheet(nama_sheet if nomor_sheet == 1 else f"{nama_sheet} {nomor_sheet}")
+                ws.append(judul)
+                baris_sheet = 1
+            ws.append(row)
+            baris_sheet += 1
+            n += 1
+    if ws is None:
+        wb.create_sheet(nama_sheet)
+    wb.save(f)
+    return n
+
+
+_PENULIS = {"csv": tulis_csv, "parquet": tulis_parquet, "xlsx": tulis_xlsx}
+
+
+@diukur()
+def ekspor(chunks, tujuan, format=None):
+    """Tulis chunk DataFrame ke tujuan (path atau file biner). Mengembalikan jumlah baris yang ditulis."""
+    format = format or format_dari_nama(tujuan)
+    if format not in _PENULIS:
+        raise ValueError(f"Format ekspor tidak didukung: {format}")
+    if isinstance(tujuan, (str, os.PathLike)):
+        with open(tujuan, "wb") as f:
+            return _PENULIS[format](chunks, f)
+    return _PENULIS[format](chunks, tujuan)
+
+
+def ekspor_alternatif(username, tujuan, format=None, db_file=DB_FILE, ukuran_chunk=UKURAN_CHUNK):
+    return ekspor(chunk_alternatif(username, db_file, ukuran_chunk), tujuan, format)
+
+
+def ekspor_peringkat(run_id, tujuan, format=None, db_file=DB_FILE, ukuran_chunk=UKURAN_CHUNK):
+    return ekspor(chunk_peringkat(run_id, db_file, ukuran_chunk), tujuan, format)
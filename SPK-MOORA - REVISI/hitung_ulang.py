@@ -0,0 +1,138 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from db import DB_FILE, get_connection, get_user_bobot, naikkan_versi, save_laporan, transaksi
+from konversi import konversi_data, mentah_ke_df
+from metrik import diukur
+from moora import KOLOM_KRITERIA, moora_calculation
+from snapshot import ambil_snapshot, moora_snapshot
+
+USER_PER_TUGAS = 20
+
+SQL_MENTAH = f"SELECT id, mentah, {', '.join(KOLOM_KRITERIA)} FROM alternatif WHERE username = ? AND mentah IS NOT NULL"
+SQL_SKOR_BARU = f"""
+    UPDATE alternatif SET {', '.join(f'{k} = ?' for k in KOLOM_KRITERIA)}
+    WHERE id = ? AND mentah IS ?
+"""
+
+
+def konversi_ulang(conn, username):
+    """Konversi ulang nilai mentah tersimpan milik user dengan tabel aturan saat ini.
+
+    Mengembalikan list (c1..c9, id, mentah) untuk baris yang skornya berubah. Baris tanpa nilai mentah
+    (misalnya skor yang diisi langsung di editor) tetap memakai skor tersimpan.
+    """
+    rows = conn.execute(SQL_MENTAH, (username,)).fetchall()
+    if not rows:
+        return []
+    skor = konversi_data(mentah_ke_df([r[1] for r in rows])).to_numpy()
+    lama = np.array([r[2:] for r in rows], dtype=float)
+    berubah = ~np.isnan(skor).any(axis=1) & (skor != lama).any(axis=1)
+    baris_berubah = [r for r, b in zip(rows, berubah) if b]
+    return [(*s, r[0], r[1]) for s, r in zip(skor[berubah].astype(int).tolist(), baris_berubah)]
+
+
+def _hitung_kelompok(db_file, usernames):
+    # Dijalankan di proses pekerja: konversi ulang nilai mentah, lalu hitung peringkat tiap user dari skor baru.
+    # Penulisan dilakukan proses utama agar hanya ada satu penulis ke SQLite.
+    hasil = []
+    for username in usernames:
+        perubahan = konversi_ulang(get_connection(db_file), username)
+        df_bobot = get_user_bobot(username, db_file)
+        snap = ambil_snapshot(username, db_file)
+        if df_bobot.empty or len(snap) == 0:
+            hasil.append((username, None, perubahan))
+        elif not perubahan:
+            hasil.append((username, moora_snapshot(username, df_bobot, db_file=db_file), perubahan))
+        else:
+            # Skor baru diterapkan ke salinan matriks snapshot (id snapshot urut naik)
+            matriks = snap.matriks()
+            ids = np.asarray(snap.ids)
+            ubah = np.array([p[len(KOLOM_KRITERIA)] for p in perubahan])
+            posisi = np.searchsorted(ids, ubah)
+            ada = (posisi < len(ids)) & (ids[np.minimum(posisi, len(ids) - 1)] == ubah)
+            matriks[posisi[ada]] = np.array([p[:len(KOLOM_KRITERIA)] for p in perubahan], dtype=float)[ada]
+            df_alt = pd.DataFrame(matriks, columns=KOLOM_KRITERIA)
+            df_alt.insert(0, "Alternatif", snap.nama())
+            hasil.append((username, moora_calculation(df_alt, df_bobot), perubahan))
+    return hasil
+
+
+def buat_job(db_file=DB_FILE):
+    """Buat job hitung ulang baru berisi semua user yang memiliki alternatif."""
+    with transaksi(db_file) as conn:
+        job_id = conn.execute("INSERT INTO job_hitung_ulang (dibuat) VALUES (?)",
+                              (datetime.now().isoformat(sep=" ", timespec="seconds"),)).lastrowid
+        conn.execute("""
+            INSERT INTO job_hitung_ulang_user (job_id, username, status)
+            SELECT DISTINCT ?, username, 'menunggu' FROM alternatif
+        """, (job_id,))
+    return job_id
+
+
+def job_terakhir_belum_selesai(db_file=DB_FILE):
+    row = get_connection(db_file).execute(
+        "SELECT id FROM job_hitung_ulang WHERE selesai IS NULL ORDER BY id DESC LIMIT 1").fetchone()
+    return row[0] if row else None
+
+
+@diukur()
+def hitung_ulang_semua(db_file=DB_FILE, job_id=None, proses=None, user_per_tugas=USER_PER_TUGAS, progres=None):
+    """Hitung ulang peringkat MOORA seluruh user dengan process pool dan simpan sebagai run laporan baru.
+
+    Skor alternatif yang punya nilai mentah lebih dulu dikonversi ulang dengan tabel aturan saat ini (misalnya
+    setelah ambang kelas diubah) dan skor yang berubah disimpan. Data dibagi per username; tiap tugas berisi
+    beberapa user. Status tiap user dicatat di tabel job, sehingga job yang terputus dapat dilanjutkan dengan
+    job_id yang sama (user yang selesai dilewati). Mengembalikan jumlah user per status (selesai, dilewati
+    karena data belum lengkap, menunggu) dan jumlah skor alternatif yang diperbarui.
+    """
+    if job_id is None:
+        job_id = buat_job(db_file)
+
+    conn = get_connection(db_file)
+    total = conn.execute("SELECT COUNT(*) FROM job_hitung_ulang_user WHERE job_id = ?", (job_id,)).fetchone()[0]
+    menunggu = [r[0] for r in conn.execute(
+        "SELECT username FROM job_hitung_ulang_user WHERE job_id = ? AND status = 'menunggu' ORDER BY username",
+        (job_id,))]
+    diproses = total - len(menunggu)
+    skor_diperbarui = 0
+
+    kelompok = [menunggu[i:i + user_per_tugas] for i in range(0, len(menunggu), user_per_tugas)]
+    # "spawn": koneksi SQLite milik proses utama tidak boleh diwariskan lewat fork
+    konteks = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=proses or os.cpu_count(), mp_context=konteks) as pool:
+        tugas = [pool.submit(_hitung_kelompok, db_file, k) for k in kelompok]
+        for f in as_completed(tugas):
+            with transaksi(db_file) as conn_tulis:
+                for username, hasil, perubahan in f.result():
+                    if perubahan:
+                        # Baris yang nilai mentahnya diubah sejak dibaca pekerja tidak ditimpa
+                        awal = conn_tulis.total_changes
+                        conn_tulis.executemany(SQL_SKOR_BARU, perubahan)
+                        if conn_tulis.total_changes > awal:
+                            skor_diperbarui += conn_tulis.total_changes - awal
+                            naikkan_versi(conn_tulis, username)
+                    if hasil is None:
+                        status, run_id = "dilewati", None
+                    else:
+                        status = "selesai"
+                        run_id = save_laporan(username, hasil, keterangan=f"Hitung ulang job #{job_id}",
+                                              db_file=db_file)
+                    conn_tulis.execute(
+                        "UPDATE job_hitung_ulang_user SET status = ?, run_id = ? WHERE job_id = ? AND username = ?",
+                        (status, run_id, job_id, username))
+                    diproses += 1
+            if progres is not None:
+                progres(diproses, total)
+
+    with transaksi(db_file) as conn_tulis:
+        conn_tulis.execute("UPDATE job_hitung_ulang SET selesai = ? WHERE id = ?",
+                           (datetime.now().isoformat(sep=" ", timespec="seconds"), job_id))
+        ringkasan = dict(conn_tulis.execute(
+            "SELECT status, COUNT(*) FROM job_hitung_ulang_user WHERE job_id = ? GROUP BY status", (job_id,)))
+    return {"job_id": job_id, "total": total, **ringkasan, "skor_diperbarui": skor_diperbarui}
@@ -0,0 +1,117 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from db import DB_FILE, insert_alternatives_bulk
+from metrik import diukur
+from konversi import ATURAN, KODE_KRITERIA, kolom_mentah, konversi_data
+from spasial import lengkapi_jarak
+
+UKURAN_CHUNK = 50_000
+MAKS_CONTOH_DITOLAK = 1000
+
+KOLOM_WAJIB = ["Alternatif"] + [ATURAN[kode]["kolom"] for kode in KODE_KRITERIA]
+
+def _format_file(sumber, nama_file=None):
+    nama = nama_file or getattr(sumber, "name", None) or str(sumber)
+    ext = os.path.splitext(str(nama))[1].lower()
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    if ext in (".csv", ".txt"):
+        return "csv"
+    raise ValueError(f"Format file tidak didukung: {nama} (gunakan CSV atau Parquet)")
+
+
+def baca_chunk(sumber, nama_file=None, ukuran_chunk=UKURAN_CHUNK):
+    """Baca file CSV/Parquet secara bertahap, menghasilkan DataFrame per chunk."""
+    if _format_file(sumber, nama_file) == "csv":
+        yield from pd.read_csv(sumber, chunksize=ukuran_chunk)
+        return
+
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Impor Parquet membutuhkan paket 'pyarrow'.") from e
+
+    for batch in pq.ParquetFile(sumber).iter_batches(batch_size=ukuran_chunk):
+        yield batch.to_pandas()
+
+
+def siapkan_chunk(username, chunk, lapisan=None):
+    """Konversi satu chunk data mentah menjadi baris siap insert dan DataFrame baris yang ditolak.
+
+    Dengan lapisan (hasil spasial.muat_lapisan), kolom jarak yang kosong diisi dari kolom Latitude/Longitude.
+    """
+    chunk = chunk.rename(columns=lambda c: str(c).strip())
+    if "Alternatif" not in chunk.columns and "alternatif" in chunk.columns:
+        chunk = chunk.rename(columns={"alternatif": "Alternatif"})
+    if lapisan:
+        chunk = lengkapi_jarak(chunk, lapisan)
+
+    kurang = [k for k in KOLOM_WAJIB if k not in chunk.columns]
+    if kurang:
+        raise ValueError(f"Kolom tidak ditemukan di file: {', '.join(kurang)}")
+
+    nama = chunk["Alternatif"].astype("string").str.strip()
+    skor = konversi_data(chunk)
+
+    skor_valid = skor.notna().all(axis=1).to_numpy()
+    nama_valid = (nama.notna() & (nama != "")).to_numpy(dtype=bool)
+    valid = skor_valid & nama_valid
+
+    alasan = np.where(~nama_valid, "Nama alternatif kosong", "Nilai kriteria kosong atau tidak valid")
+    ditolak = chunk.loc[~valid, KOLOM_WAJIB].assign(alasan=alasan[~valid])
+
+    skor_ok = skor.to_numpy()[valid].astype(int).tolist()
+    # Nilai mentah ikut disimpan agar skor dapat dikonversi ulang bila tabel aturan berubah
+    mentah = kolom_mentah(chunk.loc[valid])
+    baris = [(username, n, *s, m) for n, s, m in zip(nama.to_numpy()[valid].tolist(), skor_ok, mentah)]
+    return baris, ditolak
+
+
+@diukur()
+def impor_alternatif(username, sumber, db_file=DB_FILE, nama_file=None,
+                     ukuran_chunk=UKURAN_CHUNK, progres=None, lapisan=None):
+    """Impor alternatif secara massal dari file CSV/Parquet tanpa Streamlit.
+
+    Setiap chunk dikonversi ke skor C1-C9 sekaligus lalu di-upsert dengan executemany dalam satu transaksi;
+    alternatif yang namanya sudah ada diperbarui, sehingga impor ulang file yang sama tidak menambah baris.
+    Bila lapisan diberikan, jarak C1/C3/C4/C8/C9 yang kosong dihitung dari koordinat alternatif.
+    Mengembalikan ringkasan berisi jumlah baris diimpor, baris yang benar-benar baru/berubah, ditolak,
+    durasi dan throughput.
+    """
+    mulai = time.perf_counter()
+    diimpor = 0
+    berubah = 0
+    jumlah_ditolak = 0
+    contoh_ditolak = []
+    nomor_awal = 0
+
+    for chunk in baca_chunk(sumber, nama_file, ukuran_chunk):
+        # Nomor baris mengikuti urutan data di file (mulai dari 1)
+        chunk.index = pd.RangeIndex(nomor_awal + 1, nomor_awal + 1 + len(chunk))
+        nomor_awal += len(chunk)
+
+        baris, ditolak = siapkan_chunk(username, chunk, lapisan)
+        berubah += insert_alternatives_bulk(baris, db_file)
+
+        diimpor += len(baris)
+        jumlah_ditolak += len(ditolak)
+        if len(ditolak) and sum(len(d) for d in contoh_ditolak) < MAKS_CONTOH_DITOLAK:
+            contoh_ditolak.append(ditolak)
+        if progres is not None:
+            progres(diimpor, jumlah_ditolak)
+
+    durasi = time.perf_counter() - mulai
+    ditolak_df = pd.concat(contoh_ditolak) if contoh_ditolak else pd.DataFrame(columns=KOLOM_WAJIB + ["alasan"])
+    ditolak_df.index.name = "baris"
+    return {
+        "diimpor": diimpor,
+        "berubah": berubah,
+        "ditolak": jumlah_ditolak,
+        "durasi": durasi,
+        "baris_per_detik": diimpor / durasi if durasi > 0 else float(diimpor),
+        "contoh_ditolak": ditolak_df.head(MAKS_CONTOH_DITOLAK),
+    }
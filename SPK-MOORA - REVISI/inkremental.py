@@ -0,0 +1,219 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from db import get_versi_data
+from moora import KOLOM_KRITERIA, arah_kriteria, front_pareto, urutan_teratas
+from snapshot import ambil_snapshot
+
+# Setelah sekian banyak pembaruan inkremental, skor dihitung ulang penuh untuk membuang galat pembulatan
+BATAS_PEMBARUAN = 10_000
+
+
+class SkorInkremental:
+    """Status skor MOORA per user yang diperbarui saat alternatif ditambah, diubah atau dihapus.
+
+    Menyimpan matriks skor kriteria, jumlah kuadrat tiap kolom (penyebut normalisasi) dan skor akhir.
+    Penambahan/perubahan/penghapusan satu alternatif memperbarui jumlah kuadrat dalam O(kriteria);
+    skor alternatif lain hanya diskalakan ulang pada kriteria yang penyebutnya berubah.
+    versi adalah versi_data yang tercermin di status ini (None bila tidak diketahui).
+    """
+
+    def __init__(self, ids, nama, matrix, bobot, jenis, versi=None):
+        self.kunci = threading.RLock()
+        self.versi = versi
+        n = len(ids)
+        kapasitas = max(16, n)
+        self.ids = np.zeros(kapasitas, dtype=np.int64)
+        self.nama = np.empty(kapasitas, dtype=object)
+        self.matrix = np.zeros((kapasitas, len(KOLOM_KRITERIA)))
+        self.ids[:n] = ids
+        self.nama[:n] = nama
+        self.matrix[:n] = matrix
+        self.n = n
+        self.posisi = {int(i): p for p, i in enumerate(ids)}
+        self.bobot = np.asarray(bobot, dtype=float)
+        self.jenis = list(jenis)
+        self.hitung_ulang()
+
+    @classmethod
+    def dari_db(cls, username, bobot, jenis, progres=None):
+        # Dimuat dari snapshot kompak (mmap) alih-alih membaca seluruh tabel alternatif lewat SQL
+        snap = ambil_snapshot(username, progres=progres)
+        return cls(np.asarray(snap.ids), snap.nama(), snap.matriks(), bobot, jenis, snap.versi)
+
+    def _koefisien(self):
+        # Bobot x arah (benefit/cost) dibagi akar jumlah kuadrat kolom
+        akar = np.sqrt(self.jumlah_kuadrat)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(akar > 0, self.bobot * arah_kriteria(self.jenis) / akar, 0.0)
+
+    def hitung_ulang(self):
+        with self.kunci:
+            data = self.matrix[:self.n]
+            self.jumlah_kuadrat = (data ** 2).sum(axis=0)
+            self.koef = self._koefisien()
+            self.skor = np.zeros(len(self.ids))
+            self.skor[:self.n] = data @ self.koef
+            self.pembaruan = 0
+            self._urutan = None
+            self._pareto = None
+
+    def atur_bobot(self, bobot, jenis):
+        bobot = np.asarray(bobot, dtype=float)
+        if np.array_equal(bobot, self.bobot) and list(jenis) == self.jenis:
+            return
+        with self.kunci:
+            self.bobot = bobot
+            self.jenis = list(jenis)
+            self.hitung_ulang()
+
+    def _ubah_penyebut(self, delta_kuadrat):
+        # Perbarui jumlah kuadrat, lalu skalakan ulang hanya kontribusi kriteria yang penyebutnya berubah
+        self.jumlah_kuadrat = self.jumlah_kuadrat + delta_kuadrat
+        koef_baru = self._koefisien()
+        berubah = np.nonzero(koef_baru != self.koef)[0]
+        if len(berubah):
+            self.skor[:self.n] += self.matrix[:self.n, berubah] @ (koef_baru[berubah] - self.koef[berubah])
+        self.koef = koef_baru
+        self.pembaruan += 1
+        self._urutan = None
+        self._pareto = None
+        if self.pembaruan >= BATAS_PEMBARUAN:
+            self.hitung_ulang()
+
+    def _perbesar(self):
+        kapasitas = len(self.ids) * 2
+        self.ids = np.resize(self.ids, kapasitas)
+        nama = np.empty(kapasitas, dtype=object)
+        nama[:self.n] = self.nama[:self.n]
+        self.nama = nama
+        self.matrix = np.vstack([self.matrix, np.zeros_like(self.matrix)])
+        self.skor = np.resize(self.skor, kapasitas)
+
+    def tambah(self, row_id, nama, nilai):
+        with self.kunci:
+            if self.n == len(self.ids):
+                self._perbesar()
+            p = self.n
+            x = np.asarray(nilai, dtype=float)
+            self.ids[p] = row_id
+            self.nama[p] = nama
+            self.matrix[p] = x
+            self.skor[p] = x @ self.koef
+            self.posisi[int(row_id)] = p
+            self.n += 1
+            self._ubah_penyebut(x ** 2)
+
+    def ubah(self, row_id, nama, nilai):
+        with self.kunci:
+            p = self.posisi.get(int(row_id))
+            if p is None:
+                return self.tambah(row_id, nama, nilai)
+            x_lama = self.matrix[p].copy()
+            x = np.asarray(nilai, dtype=float)
+            self.nama[p] = nama
+            self.matrix[p] = x
+            self.skor[p] += (x - x_lama) @ self.koef
+            self._ubah_penyebut(x ** 2 - x_lama ** 2)
+
+    def hapus(self, row_id):
+        with self.kunci:
+            p = self.posisi.pop(int(row_id), None)
+            if p is None:
+                return
+            x_lama = self.matrix[p].copy()
+            # Baris terakhir dipindah ke posisi yang dihapus agar array tetap rapat
+            akhir = self.n - 1
+            if p != akhir:
+                self.ids[p] = self.ids[akhir]
+                self.nama[p] = self.nama[akhir]
+                self.matrix[p] = self.matrix[akhir]
+                self.skor[p] = self.skor[akhir]
+                self.posisi[int(self.ids[p])] = p
+            self.matrix[akhir] = 0.0
+            self.n = akhir
+            self._ubah_penyebut(-(x_lama ** 2))
+
+    def urutan(self):
+        # Urutan peringkat disimpan dan hanya diurutkan ulang bila ada perubahan sejak pengurutan terakhir
+        with self.kunci:
+            if self._urutan is None:
+                self._urutan = urutan_teratas(self.skor[:self.n])
+            return self._urutan
+
+    def pareto(self):
+        # Mask alternatif non-dominasi; hanya bergantung pada data dan jenis kriteria, bukan bobot
+        with self.kunci:
+            if self._pareto is None:
+                self._pareto = front_pareto(self.matrix[:self.n], arah_kriteria(self.jenis))
+            return self._pareto
+
+    def hasil(self, top_k=None, hanya_pareto=False):
+        with self.kunci:
+            skor = self.skor[:self.n]
+            # Urutan penuh yang sudah tersimpan dipakai ulang; bila belum ada, top-k cukup dengan seleksi parsial
+            if hanya_pareto:
+                urut = self.urutan()
+                urut = urut[self.pareto()[urut]][:top_k]
+            elif self._urutan is not None or top_k is None:
+                urut = self.urutan()[:top_k]
+            else:
+                urut = urutan_teratas(skor, top_k)
+            return pd.DataFrame({
+                "Alternatif": self.nama[:self.n][urut],
+                "Skor Akhir": skor[urut],
+            })
+
+
+_status = {}
+_kunci_status = threading.Lock()
+
+
+def ambil_status(username, df_bobot, progres=None):
+    """Status skor inkremental milik user (dibangun dari database saat pertama kali dipakai).
+
+    Status dibangun ulang bila versi_data user sudah berbeda, misalnya setelah impor lewat CLI, hitung_ulang
+    di proses lain atau penulisan lain yang tidak lewat catat_*. progres(dibaca, total) diteruskan ke
+    pembangunan snapshot; exception dari progres membatalkannya.
+    """
+    bobot = df_bobot["Bobot"].to_numpy(dtype=float)
+    jenis = df_bobot["Jenis"].tolist()
+    versi = get_versi_data(username)
+    with _kunci_status:
+        status = _status.get(username)
+        if status is None or status.versi != versi:
+            status = _status[username] = SkorInkremental.dari_db(username, bobot, jenis, progres)
+    status.atur_bobot(bobot, jenis)
+    return status
+
+
+# catat_* dipanggil setelah penulisan ke database (yang menaikkan versi_data); status lalu ditandai sesuai
+# versi terbaru agar ambil_status tidak membangunnya ulang. Penulisan lain di antara keduanya ikut dianggap
+# tercermin, jadi penulisan massal di luar halaman tetap harus memakai buang_status.
+def catat_tambah(username, row_id, nama, nilai):
+    status = _status.get(username)
+    if status is not None:
+        status.tambah(row_id, nama, nilai)
+        status.versi = get_versi_data(username)
+
+
+def catat_ubah(username, row_id, nama, nilai):
+    status = _status.get(username)
+    if status is not None:
+        status.ubah(row_id, nama, nilai)
+        status.versi = get_versi_data(username)
+
+
+def catat_hapus(username, row_id):
+    status = _status.get(username)
+    if status is not None:
+        status.hapus(row_id)
+        status.versi = get_versi_data(username)
+
+
+def buang_status(username):
+    # Dipakai setelah perubahan massal (impor, hapus semua); status dibangun ulang saat dibutuhkan
+    with _kunci_status:
+        _status.pop(username, None)
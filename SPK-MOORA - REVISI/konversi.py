@@ -0,0 +1,233 @@
+import functools
+import json
+
+import numpy as np
+import pandas as pd
+
+from metrik import diukur
+
+# Tabel aturan konversi kriteria C1-C9.
+# Kriteria numerik memakai daftar "batas" berupa (ambang, termasuk):
+#   termasuk=True  -> nilai >= ambang naik ke kelas berikutnya
+#   termasuk=False -> nilai >  ambang naik ke kelas berikutnya
+# "skor" berisi bobot tiap kelas dari nilai terkecil ke terbesar, "keterangan" mengikuti urutan yang sama.
+# Kriteria kategori memakai "kategori" (nilai input -> skor) dan "label" untuk tampilan tabel.
+# "jenis" (Benefit/Cost) adalah arah kriteria bawaan pada perhitungan MOORA.
+ATURAN_KRITERIA = [
+    {
+        "kode": "C1",
+        "nama": "Jarak Dari Pemukiman",
+        "jenis": "Benefit",
+        "kolom": "Jarak Dari Pemukiman (m)",
+        "satuan": "m",
+        "batas": [(500, True), (1000, False)],
+        "skor": [1, 2, 3],
+        "keterangan": ["Tidak Sesuai", "Sesuai", "Sangat Sesuai"],
+    },
+    {
+        "kode": "C2",
+        "nama": "Luas Lahan",
+        "jenis": "Benefit",
+        "kolom": "Luas Lahan (m²)",
+        "satuan": "m²",
+        "batas": [(16250, True), (27500, True), (38750, False)],
+        "skor": [1, 2, 3, 4],
+        "keterangan": ["Sangat Sedikit", "Sedikit", "Banyak", "Sangat Banyak"],
+    },
+    {
+        "kode": "C3",
+        "nama": "Jarak Sumber Air",
+        "jenis": "Cost",
+        "kolom": "Jarak Sumber Air (m)",
+        "satuan": "m",
+        "batas": [(10, True), (20, False), (50, False)],
+        "skor": [4, 3, 2, 1],
+        "keterangan": ["Sangat Dekat", "Dekat", "Jauh", "Sangat Jauh"],
+    },
+    {
+        "kode": "C4",
+        "nama": "Jarak Sumber Listrik",
+        "jenis": "Cost",
+        "kolom": "Jarak Sumber Listrik (m)",
+        "satuan": "m",
+        "batas": [(10, True), (20, False), (30, False)],
+        "skor": [4, 3, 2, 1],
+        "keterangan": ["Sangat Dekat", "Dekat", "Jauh", "Sangat Jauh"],
+    },
+    {
+        "kode": "C5",
+        "nama": "Jenis Permukaan Akses Jalan",
+        "jenis": "Benefit",
+        "kolom": "Jenis Permukaan Akses Jalan",
+        "kategori": {"Aspal": 4, "Beton": 3, "Makadam": 2, "Lempung": 1},
+        "label": {
+            "Aspal": "Jalan Sudah Beraspal",
+            "Beton": "Jalan Menggunakan Beton",
+            "Makadam": "Jalan Makadam",
+            "Lempung": "Jalan Masih Berupa Tanah Lempung",
+        },
+        "keterangan": {"Aspal": "Sangat Baik", "Beton": "Baik", "Makadam": "Tidak Baik", "Lempung": "Sangat Tidak Baik"},
+    },
+    {
+        "kode": "C6",
+        "nama": "Lebar Jalan",
+        "jenis": "Benefit",
+        "kolom": "Lebar Jalan (m)",
+        "satuan": "m",
+        "batas": [(3, True), (6, False)],
+        "skor": [1, 2, 3],
+        "keterangan": ["Tidak Disarankan", "Disarankan", "Sangat Disarankan"],
+    },
+    {
+        "kode": "C7",
+        "nama": "Kepemilikan Lahan",
+        "jenis": "Cost",
+        "kolom": "Kepemilikan Lahan",
+        "kategori": {"Lahan Sendiri": 2, "Menyewa Lahan": 1},
+        "label": {"Lahan Sendiri": "Lahan Sendiri", "Menyewa Lahan": "Menyewa Lahan"},
+        "keterangan": {"Lahan Sendiri": "Lebih Baik", "Menyewa Lahan": "Kurang Baik"},
+    },
+    {
+        "kode": "C8",
+        "nama": "Jarak Lokasi Dengan Jalan Utama",
+        "jenis": "Benefit",
+        "kolom": "Jarak Dengan Jalan Utama (m)",
+        "satuan": "m",
+        "batas": [(25, True), (100, False)],
+        "skor": [1, 2, 3],
+        "keterangan": ["Tidak Sesuai", "Sesuai", "Sangat Sesuai"],
+    },
+    {
+        "kode": "C9",
+        "nama": "Jarak Lokasi Dengan Peternakan Lain",
+        "jenis": "Benefit",
+        "kolom": "Jarak Dengan Peternakan Lain (m)",
+        "satuan": "m",
+        "batas": [(500, True), (1000, False)],
+        "skor": [1, 2, 3],
+        "keterangan": ["Tidak Sesuai", "Sesuai", "Sangat Sesuai"],
+    },
+]
+
+ATURAN = {aturan["kode"]: aturan for aturan in ATURAN_KRITERIA}
+KODE_KRITERIA = [aturan["kode"] for aturan in ATURAN_KRITERIA]
+
+
+@functools.lru_cache(maxsize=None)
+def _ambang_bawah(kode):
+    # Semua batas diubah menjadi batas bawah inklusif agar cukup satu searchsorted(side="right").
+    # Batas eksklusif (> ambang) digeser ke angka float berikutnya.
+    ambang = [a if termasuk else np.nextafter(a, np.inf) for a, termasuk in ATURAN[kode]["batas"]]
+    return np.asarray(ambang, dtype=float), np.asarray(ATURAN[kode]["skor"], dtype=float)
+
+
+def konversi_kolom(kode, nilai):
+    """Konversi satu kolom nilai mentah menjadi skor kriteria sekaligus (vektor).
+
+    Nilai yang kosong, tidak numerik, atau kategori yang tidak dikenal menghasilkan NaN.
+    """
+    aturan = ATURAN[kode]
+    if "kategori" in aturan:
+        return pd.Series(nilai, dtype=object).map(aturan["kategori"]).to_numpy(dtype=float)
+
+    x = pd.to_numeric(pd.Series(nilai), errors="coerce").to_numpy(dtype=float)
+    ambang, skor = _ambang_bawah(kode)
+    hasil = skor[np.searchsorted(ambang, x, side="right")]
+    hasil[np.isnan(x)] = np.nan
+    return hasil
+
+
+def konversi_nilai(kode, nilai):
+    """Konversi satu nilai mentah (misalnya dari form input) menjadi skor kriteria."""
+    skor = konversi_kolom(kode, [nilai])[0]
+    return None if np.isnan(skor) else int(skor)
+
+
+@diukur()
+def konversi_data(df):
+    """Konversi DataFrame berisi kolom mentah C1-C9 menjadi DataFrame skor c1..c9 (float, NaN bila tidak valid)."""
+    return pd.DataFrame(
+        {kode.lower(): konversi_kolom(kode, df[ATURAN[kode]["kolom"]]) for kode in KODE_KRITERIA},
+        index=df.index,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def skor_kriteria(kode):
+    """Skor yang sah untuk kriteria (kelas pada tabel konversi), urut dari kecil ke besar."""
+    aturan = ATURAN[kode]
+    return tuple(sorted(set(aturan["kategori"].values() if "kategori" in aturan else aturan["skor"])))
+
+
+def _nilai_json(x):
+    if x is None or (not isinstance(x, str) and pd.isna(x)):
+        return None
+    return x.item() if isinstance(x, np.generic) else x
+
+
+def mentah_ke_json(nilai):
+    """Nilai ukur mentah satu alternatif (dict kode kriteria -> nilai) sebagai JSON; None bila semuanya kosong.
+
+    Disimpan bersama skornya agar skor dapat dihitung ulang bila tabel aturan konversi berubah.
+    """
+    isi = {kode: _nilai_json(nilai.get(kode)) for kode in KODE_KRITERIA}
+    if all(v is None for v in isi.values()):
+        return None
+    return json.dumps(isi, ensure_ascii=False)
+
+
+def kolom_mentah(df):
+    """JSON nilai mentah tiap baris df yang berisi kolom mentah tabel aturan (misalnya data impor)."""
+    kolom = [ATURAN[kode]["kolom"] for kode in KODE_KRITERIA]
+    return [mentah_ke_json(dict(zip(KODE_KRITERIA, r))) for r in df[kolom].itertuples(index=False, name=None)]
+
+
+def mentah_ke_df(daftar_json):
+    """DataFrame kolom mentah (nama kolom tabel aturan) dari daftar JSON mentah_ke_json(), siap untuk konversi_data.
+
+    JSON kosong (None/NaN) menjadi baris tanpa nilai.
+    """
+    df = pd.DataFrame.from_records([json.loads(t) if isinstance(t, str) else {} for t in daftar_json], columns=KODE_KRITERIA)
+    return df.rename(columns={kode: ATURAN[kode]["kolom"] for kode in KODE_KRITERIA})
+
+
+def _format_angka(x):
+    if float(x).is_integer():
+        return f"{int(x):,}".replace(",", ".")
+    return str(x).replace(".", ",")
+
+
+def _label_rentang(aturan):
+    # Label rentang tiap kelas, urut dari nilai terkecil ke terbesar
+    satuan = aturan["satuan"]
+    batas = aturan["batas"]
+    label = []
+    for i in range(len(batas) + 1):
+        if i == 0:
+            a, termasuk = batas[0]
+            label.append(f"{'<' if termasuk else '≤'} {_format_angka(a)} {satuan}")
+        elif i == len(batas):
+            a, termasuk = batas[-1]
+            label.append(f"{'≥' if termasuk else '>'} {_format_angka(a)} {satuan}")
+        else:
+            label.append(f"{_format_angka(batas[i - 1][0])} {satuan} – {_format_angka(batas[i][0])} {satuan}")
+    return label
+
+
+@diukur()
+@functools.lru_cache(maxsize=None)
+def tabel_konversi(kode):
+    """Tabel tampilan "Daftar Konversi Kriteria" yang dibentuk dari aturan yang sama dengan konversi."""
+    aturan = ATURAN[kode]
+    if "kategori" in aturan:
+        baris = [(aturan["label"][k], skor, aturan["keterangan"][k]) for k, skor in aturan["kategori"].items()]
+    else:
+        baris = list(zip(_label_rentang(aturan), aturan["skor"], aturan["keterangan"]))
+    baris.sort(key=lambda b: b[1], reverse=True)
+
+    return pd.DataFrame({
+        "No": list(range(1, len(baris) + 1)),
+        aturan["nama"]: [b[0] for b in baris],
+        "Bobot": [b[1] for b in baris],
+        "Keterangan": [b[2] for b in baris],
+    })
@@ -0,0 +1,96 @@
+"""Tugas latar belakang untuk perhitungan panjang (thread pekerja bersama untuk semua sesi).
+
+Fungsi tugas menerima argumen tugas dan melaporkan kemajuan lewat tugas.lapor(); pemanggilan tersebut
+sekaligus titik pembatalan (melempar Dibatalkan bila tugas.batalkan() sudah dipanggil). Thread pekerja
+tidak boleh menyentuh st.session_state: hasil disimpan di objek Tugas dan dipindahkan oleh script sesi.
+Tugas yang sudah selesai tetapi tidak pernah diambil (sesi ditutup) dibuang setelah TTL_TUGAS detik.
+"""
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MAKS_PEKERJA = 2
+# Lama tugas yang sudah selesai disimpan menunggu diambil sesinya (detik)
+TTL_TUGAS = 600
+
+_pool = ThreadPoolExecutor(max_workers=MAKS_PEKERJA, thread_name_prefix="spk-latar")
+_nomor = itertools.count(1)
+_tugas = {}
+_kunci = threading.Lock()
+
+
+class Dibatalkan(Exception):
+    pass
+
+
+class Tugas:
+    def __init__(self, nama):
+        self.id = next(_nomor)
+        self.nama = nama
+        self.status = "menunggu"  # menunggu, berjalan, selesai, gagal, dibatalkan
+        self.progres = 0.0
+        self.pesan = ""
+        self.hasil = None
+        self.galat = None
+        self.mulai = time.time()
+        self.selesai = None
+        self._batal = threading.Event()
+
+    @property
+    def aktif(self):
+        return self.status in ("menunggu", "berjalan")
+
+    def lapor(self, progres, pesan=None):
+        """Perbarui kemajuan (0..1); melempar Dibatalkan bila pembatalan diminta."""
+        if self._batal.is_set():
+            raise Dibatalkan()
+        self.progres = min(max(float(progres), 0.0), 1.0)
+        if pesan is not None:
+            self.pesan = pesan
+
+    def batalkan(self):
+        self._batal.set()
+
+    def _jalankan(self, fungsi, args, kwargs):
+        try:
+            if self._batal.is_set():
+                raise Dibatalkan()
+            self.status = "berjalan"
+            self.hasil = fungsi(*args, tugas=self, **kwargs)
+            self.progres = 1.0
+            self.status = "selesai"
+        except Dibatalkan:
+            self.status = "dibatalkan"
+        except Exception as e:
+            self.galat = e
+            self.status = "gagal"
+        finally:
+            self.selesai = time.time()
+
+
+def _bersihkan():
+    # Dipanggil dengan _kunci dipegang
+    batas = time.time() - TTL_TUGAS
+    for id_tugas in [i for i, t in _tugas.items() if not t.aktif and t.selesai is not None and t.selesai < batas]:
+        del _tugas[id_tugas]
+
+
+def jalankan(nama, fungsi, *args, **kwargs):
+    """Jadwalkan fungsi(*args, tugas=..., **kwargs) di thread pekerja. Mengembalikan objek Tugas."""
+    tugas = Tugas(nama)
+    with _kunci:
+        _bersihkan()
+        _tugas[tugas.id] = tugas
+    _pool.submit(tugas._jalankan, fungsi, args, kwargs)
+    return tugas
+
+
+def ambil(id_tugas):
+    return _tugas.get(id_tugas)
+
+
+def buang(id_tugas):
+    """Lepaskan tugas yang sudah selesai dari daftar (setelah hasilnya diambil sesi)."""
+    with _kunci:
+        _tugas.pop(id_tugas, None)
@@ -1,153 +1,26 @@
 import streamlit as st
-import numpy as np
 import pandas as pd
-import sqlite3
-import hashlib
 import os
+import tempfile
+from konversi import ATURAN, KODE_KRITERIA, konversi_nilai, tabel_konversi
+from impor import KOLOM_WAJIB, impor_alternatif
+from ekspor import FORMAT_EKSPOR, ekspor_alternatif, ekspor_peringkat
+from spasial import DIR_LAPISAN, muat_lapisan, poligon_lapisan, titik_lapisan
+from raster import MAKS_SEL_HALAMAN, UKURAN_SEL, buat_grid, gambar_heatmap, pindai_wilayah
+from db import (
+    DB_FILE, save_user_to_db, check_user_credentials, user_exists,
+    save_weights_to_db, insert_alternative, insert_alternatives_bulk, KOLOM_ALTERNATIF, hitung_perubahan, terapkan_perubahan, delete_user_alternatives,
+    save_laporan, sidik_laporan, get_daftar_laporan, get_laporan, bandingkan_laporan, get_versi_data,
+)
+from migrasi import migrasi_semua
+import cache
+from moora import KOLOM_KRITERIA, analisis_sensitivitas, moora_multimetode
+from snapshot import ambil_snapshot
+from streaming import moora_streaming
+from inkremental import ambil_status, catat_ubah, catat_hapus, buang_status
+import metrik
+import latar
 
-USER_DB_FILE = "user.db"
-DB_FILE = "alternatif.db"
-
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS alternatif (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username TEXT,
-                    alternatif TEXT,
-                    c1 INTEGER, c2 INTEGER, c3 INTEGER, c4 INTEGER, c5 INTEGER,
-                    c6 INTEGER, c7 INTEGER, c8 INTEGER, c9 INTEGER
-                )''')
-    conn.commit()
-    conn.close()
-
-def init_user_db():
-    conn = sqlite3.connect(USER_DB_FILE)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS users (
-                    username TEXT PRIMARY KEY,
-                    password TEXT
-                )''')
-    conn.commit()
-    conn.close()
-
-def save_user_to_db(username, password):
-    conn = sqlite3.connect(USER_DB_FILE)
-    c = conn.cursor()
-    c.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, hash_password(password)))
-    conn.commit()
-    conn.close()
-
-def check_user_credentials(username, password):
-    conn = sqlite3.connect(USER_DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT password FROM users WHERE username = ?", (username,))
-    row = c.fetchone()
-    conn.close()
-    return row and row[0] == hash_password(password)
-
-def user_exists(username):
-    conn = sqlite3.connect(USER_DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT 1 FROM users WHERE username = ?", (username,))
-    exists = c.fetchone() is not None
-    conn.close()
-    return exists
-
-def init_bobot_db():
-    conn = sqlite3.connect("alternatif.db")
-    c = conn.cursor()
-    #c.execute("DROP TABLE IF EXISTS bobot_kriteria")  # Optional: hapus dulu kalau mau buat ulang
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS bobot_kriteria (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT,
-            kriteria TEXT,
-            keterangan TEXT,
-            bobot REAL,
-            jenis TEXT,
-            UNIQUE(username, kriteria)
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-def insert_or_update_weights(username, bobot_data):
-    conn = sqlite3.connect("alternatif.db")
-    c = conn.cursor()
-    for row in bobot_data:
-        kriteria, keterangan, bobot, jenis = row
-        c.execute("""
-            INSERT INTO bobot_kriteria (username, kriteria, keterangan, bobot, jenis)
-            VALUES (?, ?, ?, ?, ?)
-            ON CONFLICT(username, kriteria) DO UPDATE SET bobot = excluded.bobot
-        """, (username, kriteria, keterangan, bobot, jenis))
-    conn.commit()
-    conn.close()
-
-def save_weights_to_db(username, bobot_data):
-    conn = sqlite3.connect("alternatif.db")
-    c = conn.cursor()
-    for kriteria, keterangan, bobot, jenis in bobot_data:
-        c.execute("""
-            INSERT INTO bobot_kriteria (username, kriteria, keterangan, bobot, jenis)
-            VALUES (?, ?, ?, ?, ?)
-            ON CONFLICT(username, kriteria) DO UPDATE SET 
-                bobot = excluded.bobot
-        """, (username, kriteria, keterangan, bobot, jenis))
-    conn.commit()
-    conn.close()
-
-
-def get_user_bobot(username):
-    conn = sqlite3.connect("alternatif.db")
-    c = conn.cursor()
-    c.execute("SELECT kriteria, keterangan, bobot, jenis FROM bobot_kriteria WHERE username = ?", (username,))
-    result = c.fetchall()
-    conn.close()
-    return pd.DataFrame(result, columns=["Kriteria", "Keterangan", "Bobot", "Jenis"])
-
-
-def insert_alternative(username, data):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('''INSERT INTO alternatif (username, alternatif, c1, c2, c3, c4, c5, c6, c7, c8, c9)
-                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', (
-                    username, data["Alternatif"],
-                    data["C1 (Bobot)"], data["C2 (Bobot)"], data["C3 (Bobot)"], data["C4 (Bobot)"],
-                    data["C5 (Bobot)"], data["C6 (Bobot)"], data["C7 (Bobot)"], data["C8 (Bobot)"], data["C9 (Bobot)"]
-                 ))
-    conn.commit()
-    conn.close()
-
-def get_user_alternatives(username):
-    conn = sqlite3.connect(DB_FILE)
-    df = pd.read_sql_query("SELECT * FROM alternatif WHERE username = ?", conn, params=(username,))
-    conn.close()
-    return df
-
-def update_alternative(row_id, values):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("""
-        UPDATE alternatif SET
-            alternatif = ?, c1 = ?, c2 = ?, c3 = ?, c4 = ?, c5 = ?,
-            c6 = ?, c7 = ?, c8 = ?, c9 = ?
-        WHERE id = ?
-    """, (*values, row_id))  # <-- harusnya values = 10 elemen, row_id ditambahkan di akhir
-    conn.commit()
-    conn.close()
-
-
-def delete_alternative(row_id):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("DELETE FROM alternatif WHERE id = ?", (row_id,))
-    conn.commit()
-    conn.close()
 
 def login_ui():
     st.header("Login")
@@ -177,192 +50,219 @@ def register_ui():
         else:
             st.warning("Harap isi semua kolom.")
 
-def get_alternatif_user(username):
-    conn = sqlite3.connect("alternatif.db")
-    c = conn.cursor()
-    c.execute("SELECT * FROM alternatif WHERE username = ?", (username,))
-    rows = c.fetchall()
-    colnames = [desc[0] for desc in c.description]  # INI PENTING!
-    conn.close()
-    
-    if rows:
-        return pd.DataFrame(rows, columns=colnames)
-    return pd.DataFrame()
-
-
-def moora_calculation(df_alt, df_bobot):
-    df = df_alt.copy()
-
-    # Ambil nama alternatif dan data kriteria
-    alt_names = df["Alternatif"]
-    data = df.loc[:, "c1":"c9"].astype(float)
-
-    # Normalisasi
-    normal = data / np.sqrt((data**2).sum())
-
-    # Bobot dari df_bobot
-    bobot = df_bobot["Bobot"].values
-    jenis = df_bobot["Jenis"].values
-
-    # Hitung nilai terbobot
-    terbobot = normal * bobot
-
-    # Pisahkan benefit dan cost
-    benefit_idx = [i for i, j in enumerate(jenis) if j.lower() == "benefit"]
-    cost_idx = [i for i, j in enumerate(jenis) if j.lower() == "cost"]
-
-    skor = terbobot.iloc[:, benefit_idx].sum(axis=1) - terbobot.iloc[:, cost_idx].sum(axis=1)
-
-    hasil = pd.DataFrame({
-        "Alternatif": alt_names,
-        "Skor Akhir": skor
-    })
-
-    hasil = hasil.sort_values(by="Skor Akhir", ascending=False).reset_index(drop=True)
-    return hasil
-
-def init_laporan_db():
-    conn = sqlite3.connect("alternatif.db")
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS laporan_moora (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT,
-            nama_alternatif TEXT,
-            skor REAL
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-def save_laporan(username, df_hasil):
-    conn = sqlite3.connect("alternatif.db")
-    c = conn.cursor()
-    c.execute("DELETE FROM laporan_moora WHERE username = ?", (username,))
-    for _, row in df_hasil.iterrows():
-        c.execute("INSERT INTO laporan_moora (username, nama_alternatif, skor) VALUES (?, ?, ?)",
-                  (username, row["nama_alternatif"], row["Skor MOORA"]))
-    conn.commit()
-    conn.close()
+UKURAN_HALAMAN = 100
+PILIHAN_TOP_K = {"10 teratas": 10, "100 teratas": 100, "1.000 teratas": 1000, "Semua": None}
+TOP_N_STREAMING = 10_000
+# Perkiraan batas Kabupaten Semarang (lintang selatan, bujur barat, lintang utara, bujur timur)
+BBOX_KABUPATEN_SEMARANG = (-7.45, 110.25, -7.05, 110.62)
+
+def tampilkan_per_halaman(df, key, ukuran_halaman=UKURAN_HALAMAN):
+    # Hanya baris pada halaman yang dipilih yang dikirim ke browser
+    jumlah_halaman = max(1, -(-len(df) // ukuran_halaman))
+    halaman = 1
+    if jumlah_halaman > 1:
+        halaman = st.number_input(f"Halaman (dari {jumlah_halaman})", min_value=1, max_value=jumlah_halaman,
+                                  value=1, step=1, key=f"{key}_halaman")
+    awal = (halaman - 1) * ukuran_halaman
+    st.dataframe(df.iloc[awal:awal + ukuran_halaman], use_container_width=True)
+    if jumlah_halaman > 1:
+        st.caption(f"Menampilkan baris {awal + 1}–{min(awal + ukuran_halaman, len(df))} dari {len(df)}")
+
+def tombol_ekspor(key, nama_file, tulis):
+    """Pilihan format dan tombol unduh. File ditulis per chunk ke file sementara saat tombol ditekan.
+
+    st.download_button selalu memegang seluruh isi file di memori server, jadi ekspor per chunk hanya
+    menghemat memori saat menulis. Isi file disimpan di session_state (hilang saat sesi berakhir) dan file
+    sementaranya langsung dihapus agar tidak menumpuk di disk.
+    """
+    kolom_format, kolom_tombol = st.columns([1, 2])
+    format = kolom_format.selectbox("Format", list(FORMAT_EKSPOR), key=f"format_{key}")
+    if kolom_tombol.button("Siapkan File", key=f"siapkan_{key}"):
+        st.session_state.pop(f"ekspor_{key}", None)
+        f = tempfile.NamedTemporaryFile(delete=False, suffix="." + format)
+        try:
+            with f:
+                n = tulis(f, format)
+            with open(f.name, "rb") as berkas:
+                st.session_state[f"ekspor_{key}"] = (berkas.read(), format, n)
+        except ImportError as e:
+            st.error(str(e))
+        finally:
+            os.remove(f.name)
+
+    siap = st.session_state.get(f"ekspor_{key}")
+    if siap:
+        isi, format, n = siap
+        st.download_button(f"Unduh {nama_file}.{format} ({n} baris)", isi, file_name=f"{nama_file}.{format}",
+                           mime=FORMAT_EKSPOR[format], key=f"unduh_{key}")
+
+def alternatif_analisis(username):
+    # Seluruh alternatif hanya dimuat saat analisis yang membutuhkannya dijalankan, dari snapshot int8
+    # (dibaca lewat mmap) alih-alih membaca ulang tabel alternatif lewat SQL
+    return ambil_snapshot(username).dataframe()
+
+def tampilkan_alternatif_per_halaman(username, key):
+    # Paginasi keyset dari database: hanya satu halaman yang dibaca, bukan seluruh tabel alternatif
+    kursor = st.session_state.setdefault(f"{key}_kursor", [0])
+    halaman = cache.halaman_alternatif(username, kursor[-1], UKURAN_HALAMAN + 1)
+    if halaman.empty and len(kursor) > 1:
+        kursor.pop()
+        st.rerun()
+    ada_berikutnya = len(halaman) > UKURAN_HALAMAN
+    halaman = halaman.iloc[:UKURAN_HALAMAN]
+    st.dataframe(halaman.drop(columns="id").rename(columns={"alternatif": "Alternatif"}), use_container_width=True,
+                 hide_index=True)
+    jumlah = cache.jumlah_alternatif(username)
+    awal = (len(kursor) - 1) * UKURAN_HALAMAN
+    st.caption(f"Halaman {len(kursor)}: baris {min(awal + 1, jumlah)}–{awal + len(halaman)} dari {jumlah}")
+    kolom_sebelum, kolom_berikut = st.columns(2)
+    if kolom_sebelum.button("« Sebelumnya", disabled=len(kursor) == 1, key=f"{key}_sebelum"):
+        kursor.pop()
+        st.rerun()
+    if kolom_berikut.button("Berikutnya »", disabled=not ada_berikutnya, key=f"{key}_berikut"):
+        kursor.append(int(halaman["id"].iloc[-1]))
+        st.rerun()
+
+# Username yang boleh melihat panel performa, dipisah koma (misalnya SPK_ADMIN="admin,andin")
+ADMIN = {u.strip() for u in os.environ.get("SPK_ADMIN", "").split(",") if u.strip()}
+
+def panel_performa():
+    with st.sidebar.expander("Performa (admin)"):
+        st.dataframe(metrik.ringkasan_waktu(), hide_index=True)
+        st.json(metrik.ringkasan_penghitung())
+        st.download_button("Unduh Prometheus", metrik.ke_prometheus(), file_name="metrik.prom", mime="text/plain")
+        st.download_button("Unduh JSON Lines", metrik.ke_json_lines(), file_name="metrik.jsonl",
+                           mime="application/x-ndjson")
+        if st.button("Reset Metrik"):
+            metrik.reset()
+
+def hitung_moora_latar(username, df_bobot, jumlah_tampil, hemat_memori, hanya_pareto, tugas):
+    # Dijalankan di thread pekerja (latar.jalankan): tidak boleh memakai st.* maupun st.session_state
+    top_k = PILIHAN_TOP_K[jumlah_tampil]
+    if hemat_memori:
+        # Dua tahap per chunk dari SQLite; hanya top-N yang disimpan di memori
+        return moora_streaming(username, df_bobot, top_n=top_k or TOP_N_STREAMING,
+                               progres=lambda n, total: tugas.lapor(n / max(total, 1), "Menghitung dari database"))["hasil"]
+
+    # Skor diambil dari status inkremental user; hanya dibangun penuh dari database saat pertama kali.
+    # Mode top-k hanya memilih k alternatif teratas tanpa mengurutkan semuanya.
+    # Setiap tugas.lapor (termasuk per chunk saat snapshot dibangun) adalah titik pembatalan.
+    def hitung():
+        status = ambil_status(username, df_bobot, progres=lambda n, total: tugas.lapor(
+            0.05 + 0.35 * n / max(total, 1), "Memuat data alternatif"))
+        if hanya_pareto:
+            tugas.lapor(0.4, "Mencari alternatif non-dominasi")
+            front = status.pareto()
+        tugas.lapor(0.45, "Mengurutkan peringkat")
+        hasil = status.hasil(top_k, hanya_pareto)
+        if hanya_pareto:
+            # (non-dominasi, jumlah alternatif) ikut tersimpan di cache bersama hasilnya
+            hasil.attrs["pareto"] = (int(front.sum()), len(front))
+        return hasil
+
+    tugas.lapor(0.05, "Menghitung skor")
+    versi = get_versi_data(username)
+    results = cache.hasil_moora(username, hitung, top_k, hanya_pareto)
+    if not results.empty:
+        # Disimpan sebagai run laporan baru, kecuali data, bobot dan opsi sama dengan run terakhir
+        tugas.lapor(0.5, "Menyimpan laporan")
+        total = cache.jumlah_alternatif(username)
+        save_laporan(username, results, keterangan=jumlah_tampil + (" (Pareto)" if hanya_pareto else ""),
+                     progres=lambda n, total: tugas.lapor(0.5 + 0.5 * n / total),
+                     top_k=len(results) if len(results) < total else None, total=total,
+                     sidik=sidik_laporan(versi, df_bobot, top_k, hanya_pareto))
+    return results
+
+def terima_hasil_moora():
+    # Hasil tugas latar yang sudah selesai dipindahkan ke session_state oleh script sesi
+    tugas = latar.ambil(st.session_state.get("tugas_moora"))
+    if tugas is None or tugas.aktif:
+        return
+    del st.session_state["tugas_moora"]
+    latar.buang(tugas.id)
+    if tugas.status == "selesai" and not tugas.hasil.empty:
+        st.session_state["moora_results"] = tugas.hasil
+        st.session_state["best_alternative"] = tugas.hasil.iloc[0]["Alternatif"]
+        st.session_state["best_score"] = tugas.hasil.iloc[0]["Skor Akhir"]
+    elif tugas.status == "gagal":
+        st.session_state["pesan_moora"] = f"Perhitungan MOORA gagal: {tugas.galat}"
+    elif tugas.status == "dibatalkan":
+        st.session_state["pesan_moora"] = "Perhitungan MOORA dibatalkan."
+
+def pindai_latar(bbox, ukuran_sel, df_bobot, titik, nilai_tetap, top_n, poligon, tugas):
+    # Dijalankan di thread pekerja. Raster skor penuh (8 byte per sel) tidak dikembalikan ke sesi;
+    # yang disimpan hanya gambar heatmap yang sudah diperkecil dan sel terbaik.
+    hasil = pindai_wilayah(bbox, ukuran_sel, df_bobot, titik, nilai_tetap, top_n=top_n, poligon=poligon,
+                           maks_sel=MAKS_SEL_HALAMAN,
+                           progres=lambda n, total: tugas.lapor(0.95 * n / total, f"Memindai wilayah ({n}/{total} pita)"))
+    tugas.lapor(0.95, "Menggambar peta")
+    return {"grid": hasil["grid"], "gambar": gambar_heatmap(hasil["skor"]), "teratas": hasil["teratas"],
+            "peringatan": hasil["peringatan"]}
+
+def terima_hasil_pindai():
+    tugas = latar.ambil(st.session_state.get("tugas_pindai"))
+    if tugas is None or tugas.aktif:
+        return
+    del st.session_state["tugas_pindai"]
+    latar.buang(tugas.id)
+    if tugas.status == "selesai":
+        st.session_state["hasil_pindai"] = tugas.hasil
+    elif tugas.status == "gagal":
+        st.session_state["pesan_pindai"] = f"Pemindaian gagal: {tugas.galat}"
+    elif tugas.status == "dibatalkan":
+        st.session_state["pesan_pindai"] = "Pemindaian dibatalkan."
+
+@st.fragment(run_every=1)
+def status_tugas(kunci, judul):
+    # Diperbarui tiap detik tanpa menjalankan ulang seluruh halaman; menu lain tetap dapat dibuka
+    tugas = latar.ambil(st.session_state.get(kunci))
+    if tugas is None:
+        return
+    if not tugas.aktif:
+        st.rerun()
+    st.progress(tugas.progres, text=f"{judul}: {tugas.pesan or 'menunggu'}")
+    if st.button("Batalkan", key=f"batal_{kunci}"):
+        tugas.batalkan()
 
 def halaman_menu():
-    menu = st.sidebar.selectbox("Pilih Menu", ["Home", "Daftar Konversi Kriteria", "Daftar Kriteria", "Daftar Alternatif", "Perhitungan MOORA", "Laporan", "Tentang"])
+    menu = st.sidebar.selectbox("Pilih Menu", ["Home", "Daftar Konversi Kriteria", "Daftar Kriteria", "Daftar Alternatif", "Perhitungan MOORA", "Pemindaian Wilayah", "Laporan", "Tentang"])
+    terima_hasil_moora()
+    terima_hasil_pindai()
+    with st.sidebar:
+        for kunci, judul in (("tugas_moora", "Perhitungan MOORA"), ("tugas_pindai", "Pemindaian wilayah")):
+            if kunci in st.session_state:
+                status_tugas(kunci, judul)
+    with metrik.ukur(f"halaman.{menu}"):
+        tampilkan_halaman(menu)
+    if st.session_state["username"] in ADMIN:
+        panel_performa()
+
+def tampilkan_halaman(menu):
   
     if menu == "Home":
         st.header("Selamat Datang di Sistem Pendukung Keputusan Pemilihan Lokasi Peternakan Ayam di Kabupaten Semarang Menggunakan Metode MOORA")
 
     elif menu == "Daftar Konversi Kriteria":
         st.subheader("Daftar Konversi Kriteria")
-        data = {
-            "No": [1, 2, 3],
-            "Jarak Dari Pemukiman": ["> 1.000 m", "500 m – 1.000 m", "< 500 m"],
-            "Bobot": [3, 2, 1],
-            "Keterangan": ["Sangat Sesuai", "Sesuai", "Tidak Sesuai"]
-        }
-
-        data1 = {
-            "No": [1, 2, 3, 4],
-            "Luas Lahan": ["> 38750 m²", "27500 m² – 38750 m²", "16250 m² – 27500 m²", "5000 - 16250 m²"], 
-            "Bobot": [4, 3, 2, 1],
-            "Keterangan": ["Sangat Banyak", "Banyak", "Sedikit", "Sangat Sedikit"]
-        }
-
-        data2 = {
-            "No": [1, 2, 3, 4],
-            "Jarak Sumber Air": ["<10 m", "10 m - 20 m", "20 m - 50 m", ">50 m"], 
-            "Bobot": [4, 3, 2, 1],
-            "Keterangan": ["Sangat Dekat", "Dekat", "Jauh", "Sangat Jauh"]
-        }
-
-        data3 = {
-            "No": [1, 2, 3, 4],
-            "Jarak Sumber Listrik": ["<10 m", "10 m - 20 m", "20 m - 30 m", ">30 m"], 
-            "Bobot": [4, 3, 2, 1],
-            "Keterangan": ["Sangat Dekat", "Dekat", "Jauh", "Sangat Jauh"]
-        }
-
-        data4 = {
-            "No": [1, 2, 3, 4],
-            "Jneis Permukaan Akses Jalan": ["Jalan Sudah Bersapal", "Jalan Menggunakan Beton", "Jalan Makadam", "Jalan Masih Berupa Tanah Lempung"], 
-            "Bobot": [4, 3, 2, 1],
-            "Keterangan": ["Sangat Baik", "Baik", "Tidak Baik", "Sangat Tidak Baik"]
-        }
-
-        data5 = {
-            "No": [1, 2, 3],
-            "Lebar Jalan": [">6 m", "3 m - 6 m", "<3 m"], 
-            "Bobot": [3, 2, 1],
-            "Keterangan": ["Sangat Disarankan", "Disarankan", "Tidak Disarankan"]
-        }
-
-        data6 = {
-            "No": [1, 2],
-            "Kepemilikan Lahan": ["Lahan Sendiri", "Menyewa Lahan"], 
-            "Bobot": [2, 1],
-            "Keterangan": ["Lebih Baik", "Kurang Baik"]
-        }
-
-        data7 = {
-            "No": [1, 2, 3],
-            "Jarak Lokasi Dengan Jalan Utama": [">100 m", "25 m - 100 m", "<25 m"], 
-            "Bobot": [3, 2, 1],
-            "Keterangan": ["Sangat Sesuai", "Sesuai", "Tidak Sesuai"]
-        }
-
-        data8 = {
-            "No": [1, 2, 3],
-            "Jarak Lokasi Dengan Peternakan Lain": [">1.000 m", "500 m - 1.000 m", "<500 m"], 
-            "Bobot": [3, 2, 1],
-            "Keterangan": ["Sangat Sesuai", "Sesuai", "Tidak Sesuai"]
-        }
-
-        #Konversi kedalam DataFrame
-        df = pd.DataFrame(data)
-        df1 = pd.DataFrame(data1)
-        df2 = pd.DataFrame(data2)
-        df3 = pd.DataFrame(data3)
-        df4 = pd.DataFrame(data4)
-        df5 = pd.DataFrame(data5)
-        df6 = pd.DataFrame(data6)
-        df7 = pd.DataFrame(data7)
-        df8 = pd.DataFrame(data8)
-
-        #Tampilan Tabel
-        st.subheader("Tabel Jarak dari Pemukiman")
-        st.table(df)
-        st.subheader("Tabel Luas Lahan")
-        st.table(df1)
-        st.subheader("Tabel Jarak Sumber Air")
-        st.table(df2)
-        st.subheader("Tabel Jarak Sumber Listrik")
-        st.table(df3)
-        st.subheader("Tabel Jenis Permukaan Akses Jalan")
-        st.table(df4)
-        st.subheader("Tabel Lebar Jalan")
-        st.table(df5)
-        st.subheader("Tabel Kepemilikan Lahan")
-        st.table(df6)
-        st.subheader("Tabel Jarak Lokasi Dengan Jalan Utama")
-        st.table(df7)
-        st.subheader("Tabel Jarak Lokasi Dengan Peternakan Lain")
-        st.table(df8)
+        #Tampilan Tabel (dibentuk dari tabel aturan konversi yang sama dengan perhitungan)
+        for kode in KODE_KRITERIA:
+            st.subheader(f"Tabel {ATURAN[kode]['nama']}")
+            st.table(tabel_konversi(kode))
 
 
     elif menu == "Daftar Kriteria":
         st.subheader("Daftar Kriteria")
 
-        init_bobot_db()
-
         kriteria_list = ['C1', 'C2', 'C3', 'C4', 'C5', 'C6', 'C7', 'C8', 'C9']
         keterangan_list = ['Jarak Dari Pemukiman', 'Luas Lahan', 'Jarak Sumber Air', 'Jarak Sumber Listrik', 
                         'Jenis Permukaan Akses Jalan', 'Lebar Jalan', 'Kepemilikan Lahan', 
                         'Jarak dengan Jalan Utama', 'Jarak dengan Peterakan Lain']
-        jenis_list = ['Benefit', 'Benefit', 'Cost', 'Cost', 'Benefit', 'Benefit', 'Cost', 'Benefit', 'Benefit']
+        jenis_list = [ATURAN[kode]["jenis"] for kode in KODE_KRITERIA]
 
         username = st.session_state["username"]
         
         # Ambil data lama dari database
-        df_existing = get_user_bobot(st.session_state["username"])
+        df_existing = cache.user_bobot(st.session_state["username"])
 
         bobot_input = []
 
@@ -403,7 +303,7 @@ def halaman_menu():
                 st.success("Bobot berhasil disimpan.")
 
         # Tampilkan hasil data setelah disimpan
-        df_show = get_user_bobot(st.session_state["username"])
+        df_show = cache.user_bobot(st.session_state["username"])
         if not df_show.empty:
             st.write("### Tabel Bobot yang Telah Disimpan:")
             st.dataframe(df_show, use_container_width=True)
@@ -416,86 +316,21 @@ def halaman_menu():
         if "data" not in st.session_state:
             st.session_state.data=[]
 
-        def konversi_C1(nilai):
-            if nilai > 1000:
-                return 3
-            elif 500 <= nilai <= 1000:
-                return 2
-            else:
-                return 1
-        
-        def konversi_C2(nilai):
-            if nilai > 38750:
-                return 4
-            elif 27500 <= nilai <= 38750:
-                return 3
-            elif 16250 <= nilai < 27500:
-                return 2
-            else:
-                return 1
-        
-        def konversi_C3(nilai):
-            if nilai < 10:
-                return 4
-            elif 10 <= nilai <= 20:
-                return 3
-            elif 20 <= nilai <= 50:
-                return 2
-            else:
-                return 1
-            
-        def konversi_C4(nilai):
-            if nilai < 10:
-                return 4
-            elif 10 <= nilai <= 20:
-                return 3
-            elif 20 <= nilai <= 30:
-                return 2
-            else:
-                return 1
-            
-        def konversi_C5(nilai):
-            if nilai == "Aspal":
-                return 4
-            elif nilai == "Beton":
-                return 3
-            elif nilai == "Makadam":
-                return 2
-            elif nilai == "Lempung":
-                return 1
-            
-        def konversi_C6(nilai):
-            if nilai > 6:
-                return 3
-            elif 3 <= nilai <= 6:
-                return 2
-            else:
-                return 1
-        
-        def konversi_C7(nilai):
-            if nilai == "Lahan Sendiri":
-                return 2
-            elif nilai == "Menyewa Lahan":
-                return 1
-            
-        def konversi_C8(nilai):
-            if nilai > 100:
-                return 3
-            elif 25 <= nilai <= 100:
-                return 2
-            else:
-                return 1
-            
-        def konversi_C9(nilai):
-            if nilai > 1000:
-                return 3
-            elif 500 <= nilai <= 1000:
-                return 2
-            else:
-                return 1
+        # Lapisan peta (pemukiman, sumber air, dst.) untuk menghitung jarak dari koordinat, bila tersedia
+        try:
+            lapisan = muat_lapisan()
+        except (ValueError, OSError) as e:
+            st.warning(f"Lapisan peta di folder '{DIR_LAPISAN}' tidak dapat dibaca: {e}")
+            lapisan = {}
 
         with st.form("form_input"):
             alt = st.text_input("Alternatif (Masukkan Nama Daerah Lokasi Berada)")
+            lat = lon = None
+            if lapisan:
+                kolom_lat, kolom_lon = st.columns(2)
+                lat = kolom_lat.number_input("Latitude (opsional)", min_value=-90.0, max_value=90.0, value=None, format="%.6f")
+                lon = kolom_lon.number_input("Longitude (opsional)", min_value=-180.0, max_value=180.0, value=None, format="%.6f")
+                st.caption("Bila koordinat diisi, jarak " + ", ".join(lapisan) + " dihitung otomatis dari lapisan peta.")
             c1 = st.number_input("Jarak Dari Pemukiman (m)", min_value=0)
             c2 = st.number_input("Luas Lahan (m2)", min_value=0)
             c3 = st.number_input("Jarak Sumber Air (m)", min_value=0)
@@ -513,53 +348,151 @@ def halaman_menu():
                 st.warning("Harap isi nama lokasi.")
             else:
                 try:
+                    if lat is not None and lon is not None:
+                        jarak = {kode: round(float(indeks.jarak([lat], [lon])[0]), 1) for kode, indeks in lapisan.items()}
+                        c1, c3, c4, c8, c9 = (jarak.get(kode, nilai) for kode, nilai in
+                                              zip(["C1", "C3", "C4", "C8", "C9"], [c1, c3, c4, c8, c9]))
                     new_entry = {              
                         "Alternatif": alt,
-                        "Jarak Dari Pemukiman (m)": c1, "C1 (Bobot)": konversi_C1(c1),
-                        "Luas Lahan (m²)": c2, "C2 (Bobot)": konversi_C2(c2),
-                        "Jarak Sumber Air (m)": c3, "C3 (Bobot)": konversi_C3(c3),
-                        "Jarak Sumber Listrik (m)": c4, "C4 (Bobot)": konversi_C4(c4), 
-                        "Jenis Permukaan Akses Jalan": c5, "C5 (Bobot)": konversi_C5(c5),
-                        "Lebar Jalan (m)": c6, "C6 (Bobot)": konversi_C6(c6),
-                        "Kepemilikan Lahan": c7, "C7 (Bobot)": konversi_C7(c7),
-                        "Jarak Dengan Jalan Utama (m)": c8, "C8 (Bobot)": konversi_C8(c8),
-                        "Jarak Dengan Peternakan Lain (m)": c9, "C9 (Bobot)": konversi_C9(c9), 
+                        "Jarak Dari Pemukiman (m)": c1, "C1 (Bobot)": konversi_nilai("C1", c1),
+                        "Luas Lahan (m²)": c2, "C2 (Bobot)": konversi_nilai("C2", c2),
+                        "Jarak Sumber Air (m)": c3, "C3 (Bobot)": konversi_nilai("C3", c3),
+                        "Jarak Sumber Listrik (m)": c4, "C4 (Bobot)": konversi_nilai("C4", c4), 
+                        "Jenis Permukaan Akses Jalan": c5, "C5 (Bobot)": konversi_nilai("C5", c5),
+                        "Lebar Jalan (m)": c6, "C6 (Bobot)": konversi_nilai("C6", c6),
+                        "Kepemilikan Lahan": c7, "C7 (Bobot)": konversi_nilai("C7", c7),
+                        "Jarak Dengan Jalan Utama (m)": c8, "C8 (Bobot)": konversi_nilai("C8", c8),
+                        "Jarak Dengan Peternakan Lain (m)": c9, "C9 (Bobot)": konversi_nilai("C9", c9), 
                     }
             
-                    insert_alternative(st.session_state["username"], new_entry)
+                    # Nama yang sudah ada diperbarui (upsert), jadi status skor dicatat sebagai perubahan
+                    row_id = insert_alternative(st.session_state["username"], new_entry)
+                    catat_ubah(st.session_state["username"], row_id, alt,
+                               [new_entry[f"C{i} (Bobot)"] for i in range(1, 10)])
                     st.session_state["berhasil_tambah"] = True
                     st.rerun()
         
                 except Exception as e:
                     st.warning(f"Harap isi semua nilai dengan benar. Error: {e}")
 
-        df_edit = get_user_alternatives(st.session_state["username"])
-        if not df_edit.empty:
+        with st.expander("Impor Data Alternatif dari File (CSV/Parquet)"):
+            st.caption("Kolom yang dibutuhkan: " + ", ".join(KOLOM_WAJIB))
+            if lapisan:
+                st.caption("Opsional: kolom Latitude dan Longitude; jarak " + ", ".join(lapisan)
+                           + " yang kosong dihitung dari koordinat.")
+            file_impor = st.file_uploader("Pilih file", type=["csv", "parquet"])
+            if file_impor is not None and st.button("Impor Data"):
+                status = st.empty()
+                try:
+                    hasil = impor_alternatif(
+                        st.session_state["username"], file_impor, DB_FILE, nama_file=file_impor.name,
+                        progres=lambda n, t: status.write(f"{n} baris diimpor, {t} baris ditolak..."),
+                        lapisan=lapisan,
+                    )
+                    st.success(f"{hasil['diimpor']} baris berhasil diimpor ({hasil['berubah']} baru atau berubah) "
+                               f"dalam {hasil['durasi']:.2f} detik ({hasil['baris_per_detik']:.0f} baris/detik).")
+                    if hasil["ditolak"]:
+                        st.warning(f"{hasil['ditolak']} baris ditolak.")
+                        st.dataframe(hasil["contoh_ditolak"], use_container_width=True)
+                except (ValueError, ImportError) as e:
+                    st.error(f"Impor gagal: {e}")
+                # Chunk yang sudah tersimpan tetap masuk, jadi status skor dibangun ulang
+                buang_status(st.session_state["username"])
+
+        with st.expander("Ekspor Data Alternatif (CSV/Parquet/Excel)"):
+            st.caption("Berisi nama alternatif serta nilai ukur mentah, kelas dan skor tiap kriteria (C1–C9).")
+            tombol_ekspor("alternatif", "alternatif",
+                          lambda f, format: ekspor_alternatif(st.session_state["username"], f, format))
+
+        username = st.session_state["username"]
+        if cache.jumlah_alternatif(username) > 0:
             st.write("### Data yang telah dimasukkan:")
-            st.session_state["edited_ids"] = df_edit["id"].tolist()
-            df_display = df_edit[["alternatif", "c1", "c2", "c3", "c4", "c5", "c6", "c7", "c8", "c9"]]
-            edited_df = st.data_editor(df_display, num_rows="dynamic", use_container_width=True)
+            # Pencarian dan filter dijalankan di database; hanya satu halaman yang dimuat dan dikirim ke browser
+            kolom_cari, kolom_kriteria, kolom_skor = st.columns([2, 1, 1])
+            cari = kolom_cari.text_input("Cari nama alternatif").strip()
+            kode = kolom_kriteria.selectbox("Filter kriteria", ["Semua"] + KODE_KRITERIA)
+            kriteria = {}
+            if kode != "Semua":
+                tabel = tabel_konversi(kode)
+                label = dict(zip(tabel["Bobot"], tabel[ATURAN[kode]["nama"]]))
+                skor = kolom_skor.selectbox("Skor", list(label), format_func=lambda s: f"{s} ({label[s]})")
+                kriteria = {kode.lower(): int(skor)}
+
+            # Paginasi keyset: kursor berisi id terakhir tiap halaman sebelumnya, diulang dari awal bila filter berubah
+            filter_aktif = (cari, tuple(kriteria.items()))
+            if st.session_state.get("filter_alternatif") != filter_aktif:
+                st.session_state["filter_alternatif"] = filter_aktif
+                st.session_state["kursor_alternatif"] = [0]
+            kursor = st.session_state["kursor_alternatif"]
+            # Satu baris lebih untuk mengetahui apakah masih ada halaman berikutnya
+            halaman = cache.halaman_alternatif(username, kursor[-1], UKURAN_HALAMAN + 1, cari, kriteria)
+            if halaman.empty and len(kursor) > 1:
+                # Halaman terakhir kosong setelah barisnya dihapus
+                kursor.pop()
+                st.rerun()
+            ada_berikutnya = len(halaman) > UKURAN_HALAMAN
+            halaman = halaman.iloc[:UKURAN_HALAMAN]
+
+            jumlah = cache.jumlah_alternatif(username, cari, kriteria)
+            awal = (len(kursor) - 1) * UKURAN_HALAMAN
+            st.caption(f"Halaman {len(kursor)}: baris {min(awal + 1, jumlah)}–{awal + len(halaman)} "
+                       f"dari {jumlah} alternatif yang cocok")
+
+            # Kunci editor ikut halaman dan filter agar suntingan tidak terbawa ke halaman lain, serta jumlah
+            # penyimpanan agar editor kosong lagi setelah disimpan. Suntingan yang belum disimpan ada di state
+            # editor, jadi pindah halaman dinonaktifkan selama masih ada suntingan.
+            key_editor = (f"editor_alternatif_{st.session_state.get('jumlah_simpan_editor', 0)}_{kursor[-1]}_"
+                          f"{hash(filter_aktif)}")
+            suntingan = st.session_state.get(key_editor, {})
+            belum_disimpan = any(suntingan.get(k) for k in ("edited_rows", "added_rows", "deleted_rows"))
+            if belum_disimpan:
+                st.warning("Ada perubahan yang belum disimpan. Simpan perubahan sebelum pindah halaman atau "
+                           "mengubah pencarian/filter, karena perubahan tersebut akan hilang.")
+            kolom_sebelum, kolom_berikut = st.columns(2)
+            if kolom_sebelum.button("« Sebelumnya", disabled=len(kursor) == 1 or belum_disimpan):
+                kursor.pop()
+                st.rerun()
+            if kolom_berikut.button("Berikutnya »", disabled=not ada_berikutnya or belum_disimpan):
+                kursor.append(int(halaman["id"].iloc[-1]))
+                st.rerun()
+
+            # id dijadikan index (disembunyikan) agar perubahan dipetakan per id, bukan per posisi baris
+            df_display = halaman.set_index("id")[KOLOM_ALTERNATIF]
+            edited_df = st.data_editor(df_display, num_rows="dynamic", use_container_width=True, hide_index=True,
+                                       key=key_editor)
 
             if st.session_state.get("berhasil_simpan"):
-                st.success("Perubahan berhasil disimpan.")
+                st.success(st.session_state["berhasil_simpan"])
                 # Hapus flag supaya tidak muncul terus
                 del st.session_state["berhasil_simpan"]
 
             if st.button("Simpan Perubahan"):
-                for i, (_, row) in enumerate(edited_df.iterrows()):
-                    row_id = st.session_state["edited_ids"][i]
-                    values = [
-                        row["alternatif"], row["c1"], row["c2"], row["c3"], row["c4"],
-                        row["c5"], row["c6"], row["c7"], row["c8"], row["c9"]
-                    ]
-                    update_alternative(row_id, values)
-
-                st.session_state["berhasil_simpan"] = True
+                try:
+                    perubahan = hitung_perubahan(df_display, edited_df)
+                    ids_baru = terapkan_perubahan(st.session_state["username"], perubahan)
+                except ValueError as e:
+                    st.error(f"Perubahan tidak disimpan: {e}")
+                    st.stop()
+                for row_id in perubahan["dihapus"]:
+                    catat_hapus(st.session_state["username"], row_id)
+                for row_id, nilai in perubahan["diubah"]:
+                    catat_ubah(st.session_state["username"], row_id, nilai[0], nilai[1:])
+                # Baris baru bisa jatuh ke nama yang sudah ada (upsert), sehingga dicatat sebagai perubahan
+                for row_id, nilai in zip(ids_baru, perubahan["baru"]):
+                    catat_ubah(st.session_state["username"], row_id, nilai[0], nilai[1:])
+
+                pesan = (f"Perubahan berhasil disimpan: {len(perubahan['baru'])} ditambah, "
+                         f"{len(perubahan['diubah'])} diubah, {len(perubahan['dihapus'])} dihapus.")
+                if perubahan["dilewati"]:
+                    pesan += f" {perubahan['dilewati']} baris belum lengkap sehingga tidak disimpan."
+                st.session_state["berhasil_simpan"] = pesan
+                st.session_state["jumlah_simpan_editor"] = st.session_state.get("jumlah_simpan_editor", 0) + 1
                 st.rerun()
 
             if st.button("Hapus Semua Data"):
-                for row_id in st.session_state["edited_ids"]:
-                    delete_alternative(row_id)
+                delete_user_alternatives(st.session_state["username"])
+                buang_status(st.session_state["username"])
+                st.session_state["jumlah_simpan_editor"] = st.session_state.get("jumlah_simpan_editor", 0) + 1
                 st.success("Semua data alternatif telah dihapus.")
                 st.rerun()
 
@@ -567,58 +500,188 @@ def halaman_menu():
         st.header ("Perhitungan MOORA")
 
         username = st.session_state["username"]
-        df_alt = get_alternatif_user(username)
-        df_bobot = get_user_bobot(username)
+        df_bobot = cache.user_bobot(username)
 
-        if df_alt.empty or df_bobot.empty:
+        if cache.jumlah_alternatif(username) == 0 or df_bobot.empty:
             st.warning("Data alternatif atau bobot kriteria belum lengkap.")
         else:
-            # Rename kolom untuk kemudahan
-            if "alternatif" in df_alt.columns:
-                df_alt.rename(columns={"alternatif": "Alternatif"}, inplace=True)
+            # Seluruh tabel alternatif tidak dimuat di halaman ini: perhitungan membaca database/snapshot di
+            # thread pekerja, dan tabel yang ditampilkan hanya satu halaman
+            st.write("### Data Alternatif")
+            tampilkan_alternatif_per_halaman(username, "data_alternatif")
 
-            # Buat salinan dataframe tanpa kolom id dan username
-            df_alt_clean = df_alt.drop(columns=["id", "username"])
+            jumlah_tampil = st.selectbox("Hasil yang dihitung", list(PILIHAN_TOP_K), index=len(PILIHAN_TOP_K) - 1)
 
-            st.write("### Data Alternatif")
-            st.dataframe(df_alt_clean)
+            hemat_memori = st.checkbox("Hitung langsung dari database (hemat memori, seluruh skor disimpan ke laporan)")
 
-            # Ambil bobot & jenis dari bobot kriteria
-            weights = df_bobot["Bobot"].values
-            types = np.where(df_bobot["Jenis"] == "Benefit", 1, -1)
+            # Alternatif yang didominasi tidak pernah menjadi terbaik untuk bobot positif mana pun
+            hanya_pareto = st.checkbox("Hanya alternatif non-dominasi (front Pareto)", disabled=hemat_memori,
+                                       help="Alternatif yang kalah atau sama di semua kriteria dari alternatif lain "
+                                            "tidak ikut diperingkat maupun dianalisis sensitivitasnya.")
+            hanya_pareto = hanya_pareto and not hemat_memori
 
-            # Ambil matrix dari kolom C1-C9
-            matrix = df_alt_clean.iloc[:, 1:].values.tolist()  # kolom ke-1 dst adalah C1–C9
-            alternatives = df_alt_clean["Alternatif"].tolist()
+            # Perhitungan berjalan di thread pekerja; kemajuan dan tombol batal tampil di sidebar
+            if st.button("Hitung MOORA", disabled="tugas_moora" in st.session_state):
+                tugas = latar.jalankan("MOORA", hitung_moora_latar, username, df_bobot, jumlah_tampil, hemat_memori,
+                                       hanya_pareto)
+                st.session_state["tugas_moora"] = tugas.id
+                st.rerun()
 
-            if st.button("Hitung MOORA"):
-                results = moora_calculation(df_alt, df_bobot)
-                if results is not None:
-                    st.write("### Hasil Perhitungan MOORA:")
-                    st.dataframe(results)
+            if "pesan_moora" in st.session_state:
+                st.warning(st.session_state.pop("pesan_moora"))
+
+            if "moora_results" in st.session_state:
+                st.write("### Hasil Perhitungan MOORA:")
+                tampilkan_per_halaman(st.session_state["moora_results"], "hasil_moora")
+                if "pareto" in st.session_state["moora_results"].attrs:
+                    non_dominasi, jumlah = st.session_state["moora_results"].attrs["pareto"]
+                    st.caption(f"{jumlah - non_dominasi} dari {jumlah} alternatif didominasi; "
+                               f"{non_dominasi} alternatif non-dominasi diperingkat.")
+
+                best_alternative = st.session_state["best_alternative"]
+                best_score = st.session_state["best_score"]
+                st.success(f"Alternatif terbaik adalah **{best_alternative}** dengan skor tertinggi yaitu **{best_score}**")
+
+            with st.expander("Perbandingan Metode MOORA (Ratio System, Reference Point, Full Multiplicative)"):
+                st.caption("Ketiga metode dihitung dari normalisasi yang sama; peringkat konsensus diurutkan dari "
+                           "rata-rata ketiga peringkat. Membutuhkan seluruh matriks di memori, jadi tidak tersedia "
+                           "pada mode hemat memori.")
+                if st.button("Hitung Semua Metode", disabled=hemat_memori):
+                    top_k = PILIHAN_TOP_K[jumlah_tampil]
+                    st.session_state["moora_multimetode"] = cache.ambil(
+                        "multimetode", username, lambda: moora_multimetode(alternatif_analisis(username), df_bobot, top_k),
+                        ekstra=f"top{top_k}")
+                if "moora_multimetode" in st.session_state:
+                    tampilkan_per_halaman(st.session_state["moora_multimetode"], "hasil_multimetode")
+
+            with st.expander("Analisis Sensitivitas Bobot"):
+                n_simulasi = st.number_input("Jumlah simulasi Monte Carlo", min_value=100, max_value=100000, value=1000, step=100)
+                sebaran = st.slider("Sebaran perubahan bobot (%)", min_value=1, max_value=50, value=10)
+                if st.button("Jalankan Analisis Sensitivitas", disabled=hemat_memori,
+                             help="Tidak tersedia pada mode hemat memori (membutuhkan seluruh matriks di memori)."):
+                    sensitivitas = analisis_sensitivitas(alternatif_analisis(username), df_bobot, n_simulasi=int(n_simulasi), sebaran=sebaran / 100,
+                                                         hanya_pareto=hanya_pareto)
+                    terbaik = sensitivitas["ringkasan"].iloc[0]
+                    st.info(f"Dari {sensitivitas['jumlah_skenario']} skenario bobot, **{sensitivitas['terbaik']}** "
+                            f"tetap menjadi alternatif terbaik pada {terbaik['Peluang Terbaik']:.1%} skenario.")
+                    st.write("#### Stabilitas Peringkat")
+                    st.dataframe(sensitivitas["ringkasan"], use_container_width=True)
+                    st.write("#### Distribusi Peringkat")
+                    st.dataframe(sensitivitas["distribusi"], use_container_width=True)
+                    st.write("#### Rentang Bobot Alternatif Terbaik Tetap Teratas")
+                    st.dataframe(sensitivitas["rentang_bobot"], use_container_width=True)
 
-                    best_alternative = results.iloc[0]["Alternatif"]
-                    best_score = results.iloc[0]["Skor Akhir"]
+       
+    elif menu == "Pemindaian Wilayah":
+        st.header("Pemindaian Kesesuaian Wilayah")
 
-                    st.success(f"Alternatif terbaik adalah **{best_alternative}** dengan skor tertinggi yaitu **{best_score}**")
+        username = st.session_state["username"]
+        df_bobot = cache.user_bobot(username)
+        try:
+            titik = titik_lapisan()
+        except (ValueError, OSError) as e:
+            st.warning(f"Lapisan peta di folder '{DIR_LAPISAN}' tidak dapat dibaca: {e}")
+            titik = {}
+
+        if df_bobot.empty:
+            st.warning("Bobot kriteria belum diisi.")
+        elif not titik:
+            st.warning(f"Belum ada lapisan peta di folder '{DIR_LAPISAN}' (pemukiman, sumber_air, listrik, "
+                       "jalan_utama, peternakan dalam format CSV atau GeoJSON).")
+        else:
+            st.caption("Wilayah dibagi menjadi sel grid. Jarak " + ", ".join(titik) + " dihitung dari lapisan peta; "
+                       "kriteria lain bernilai sama untuk semua sel.")
+            with st.form("form_pindai"):
+                kolom_kiri, kolom_kanan = st.columns(2)
+                lat_min = kolom_kiri.number_input("Lintang selatan", value=BBOX_KABUPATEN_SEMARANG[0], format="%.5f")
+                lon_min = kolom_kanan.number_input("Bujur barat", value=BBOX_KABUPATEN_SEMARANG[1], format="%.5f")
+                lat_maks = kolom_kiri.number_input("Lintang utara", value=BBOX_KABUPATEN_SEMARANG[2], format="%.5f")
+                lon_maks = kolom_kanan.number_input("Bujur timur", value=BBOX_KABUPATEN_SEMARANG[3], format="%.5f")
+                ukuran_sel = kolom_kiri.number_input("Ukuran sel (m)", min_value=5.0, value=UKURAN_SEL, step=5.0)
+                top_n = kolom_kanan.number_input("Jumlah sel terbaik", min_value=1, max_value=10_000, value=100)
+                nilai_tetap = {}
+                for kode in KODE_KRITERIA:
+                    if kode in titik:
+                        continue
+                    aturan = ATURAN[kode]
+                    if "kategori" in aturan:
+                        nilai_tetap[kode] = st.selectbox(aturan["nama"], list(aturan["kategori"]), key=f"pindai_{kode}")
+                    else:
+                        nilai_tetap[kode] = st.number_input(f"{aturan['nama']} ({aturan['satuan']})", min_value=0.0,
+                                                            key=f"pindai_{kode}")
+                pindai = st.form_submit_button("Pindai Wilayah")
+
+            # Ukuran grid dicek sebelum tugas dijadwalkan; pemindaian berjalan di thread pekerja (kemajuan di sidebar)
+            if pindai and "tugas_pindai" in st.session_state:
+                st.warning("Pemindaian sebelumnya masih berjalan.")
+            elif pindai:
+                bbox = (lat_min, lon_min, lat_maks, lon_maks)
+                try:
+                    buat_grid(*bbox, ukuran_sel, MAKS_SEL_HALAMAN)
+                except ValueError as e:
+                    st.error(f"Pemindaian ditolak: {e}")
+                else:
+                    tugas = latar.jalankan("Pindai", pindai_latar, bbox, ukuran_sel, df_bobot, titik, nilai_tetap,
+                                           int(top_n), poligon_lapisan())
+                    st.session_state["tugas_pindai"] = tugas.id
+                    st.rerun()
 
-                    # Simpan hasil ke session_state
-                    st.session_state["moora_results"] = results
-                    st.session_state["best_alternative"] = best_alternative
-                    st.session_state["best_score"] = best_score
+            if "pesan_pindai" in st.session_state:
+                st.warning(st.session_state.pop("pesan_pindai"))
+
+            hasil_pindai = st.session_state.get("hasil_pindai")
+            if hasil_pindai:
+                grid = hasil_pindai["grid"]
+                if hasil_pindai.get("peringatan"):
+                    st.warning(hasil_pindai["peringatan"])
+                st.write(f"### Peta Kesesuaian ({grid['baris'] * grid['kolom']:,} sel)")
+                st.image(hasil_pindai["gambar"], caption="Merah: kurang sesuai, hijau: paling sesuai (utara di atas)")
+                st.write("### Sel Terbaik")
+                tampilkan_per_halaman(hasil_pindai["teratas"], "hasil_pindai")
+                if st.button("Simpan Sel Terbaik sebagai Alternatif"):
+                    teratas = hasil_pindai["teratas"][["Alternatif"] + KOLOM_KRITERIA]
+                    berubah = insert_alternatives_bulk([(username, *r) for r in teratas.itertuples(index=False)])
+                    buang_status(username)
+                    st.success(f"{len(teratas)} sel disimpan sebagai alternatif ({berubah} baru atau berubah).")
 
-       
     elif menu == "Laporan":
         st.header("Hasil Laporan Perhitungan Alternatif Terbaik Menggunakan MOORA")
-        
-        if "moora_results" in st.session_state:
-            st.dataframe(st.session_state["moora_results"])
-            
-            # Ambil data terbaik dari session_state
-            best_alternative = st.session_state["best_alternative"]
-            best_score = st.session_state["best_score"]
-            
+
+        username = st.session_state["username"]
+        daftar_laporan = get_daftar_laporan(username)
+        df_laporan = pd.DataFrame()
+
+        if not daftar_laporan.empty:
+            def _isi_laporan(row):
+                # Run top-k hanya berisi sebagian peringkat
+                if pd.notna(row.top_k):
+                    return f"{row.jumlah} teratas dari {int(row.total)} alternatif"
+                return f"{row.jumlah} alternatif"
+
+            label_laporan = {
+                row.id: f"#{row.id} – {row.dibuat} ({_isi_laporan(row)}{', ' + row.keterangan if pd.notna(row.keterangan) else ''})"
+                for row in daftar_laporan.itertuples()
+            }
+            # Run terbaru ada di urutan pertama
+            run_id = st.selectbox("Pilih laporan", list(label_laporan), format_func=label_laporan.get)
+            df_laporan = cache.ambil("laporan", username, lambda: get_laporan(run_id), ekstra=run_id)
+
+        if not df_laporan.empty:
+            tampilkan_per_halaman(df_laporan, "laporan")
+
+            best_alternative = df_laporan.iloc[0]["Alternatif"]
+            best_score = df_laporan.iloc[0]["Skor Akhir"]
+
             st.success(f"Berdasarkan analisis yang dilakukan, alternatif terbaik yang diperoleh adalah **{best_alternative}** dengan skor tertinggi yaitu **{best_score}**. Hasil ini menunjukkan bahwa **{best_alternative}** memenuhi beberapa kriteria penting untuk pembangunan peternakan ayam. Dengan analisis berbasis skor ini, keputusan yang diambil lebih objektif dan terukur. Langkah selanjutnya adalah melakukan survei lapangan serta memastikan aspek regulasi dan perizinan agar pembangunan peternakan dapat berjalan lancar sesuai aturan yang berlaku.")
+
+            with st.expander("Ekspor Laporan (CSV/Parquet/Excel)"):
+                tombol_ekspor(f"laporan_{run_id}", f"laporan_{run_id}", lambda f, format: ekspor_peringkat(run_id, f, format))
+
+            if len(label_laporan) > 1:
+                with st.expander("Bandingkan dengan laporan lain"):
+                    pembanding = st.selectbox("Laporan pembanding", [i for i in label_laporan if i != run_id],
+                                              format_func=label_laporan.get)
+                    tampilkan_per_halaman(bandingkan_laporan(pembanding, run_id), "banding_laporan")
         else:
             st.warning("Belum ada perhitungan yang dilakukan. Silakan hitung MOORA terlebih dahulu.")
 
@@ -636,8 +699,7 @@ def halaman_menu():
 
 def main():
     st.set_page_config(page_title="SPK MOORA", layout="wide")
-    init_db()
-    init_user_db()
+    migrasi_semua()
 
     if "logged_in" not in st.session_state:
         st.session_state.logged_in = False
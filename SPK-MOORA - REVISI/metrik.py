@@ -0,0 +1,125 @@
+"""Pencatatan waktu dan penghitung ringan untuk jalur panas aplikasi (per proses).
+
+Setiap blok yang diukur dicatat jumlah panggilan, total dan waktu maksimumnya. Penghitung dipakai untuk
+jumlah kueri, baris dibaca dan baris ditulis. Hasilnya dapat dibaca sebagai DataFrame, teks format
+Prometheus, atau JSON lines. Bila logger "spk_moora.metrik" diaktifkan pada level DEBUG, setiap
+pengukuran juga ditulis sebagai log terstruktur (JSON); operasi yang lebih lama dari AMBANG_LAMBAT
+selalu dicatat sebagai WARNING.
+"""
+import contextlib
+import functools
+import json
+import logging
+import threading
+import time
+
+import pandas as pd
+
+AMBANG_LAMBAT = 1.0
+
+log = logging.getLogger("spk_moora.metrik")
+
+_kunci = threading.Lock()
+_waktu = {}  # nama -> [jumlah panggilan, total detik, maks detik]
+_penghitung = {}
+
+
+def catat_waktu(nama, durasi):
+    with _kunci:
+        data = _waktu.get(nama)
+        if data is None:
+            data = _waktu[nama] = [0, 0.0, 0.0]
+        data[0] += 1
+        data[1] += durasi
+        data[2] = max(data[2], durasi)
+    if durasi >= AMBANG_LAMBAT:
+        log.warning(json.dumps({"nama": nama, "detik": round(durasi, 6), "lambat": True}))
+    elif log.isEnabledFor(logging.DEBUG):
+        log.debug(json.dumps({"nama": nama, "detik": round(durasi, 6)}))
+
+
+def tambah(nama, jumlah=1):
+    with _kunci:
+        _penghitung[nama] = _penghitung.get(nama, 0) + jumlah
+
+
+@contextlib.contextmanager
+def ukur(nama):
+    """Catat lama eksekusi blok with dengan nama tertentu (tetap dicatat bila blok melempar exception)."""
+    mulai = time.perf_counter()
+    try:
+        yield
+    finally:
+        catat_waktu(nama, time.perf_counter() - mulai)
+
+
+def diukur(nama=None, baca=False):
+    """Dekorator pencatat waktu fungsi. baca=True: panjang DataFrame hasil ditambahkan ke "baris_dibaca"."""
+    def dekorator(fungsi):
+        label = nama or f"{fungsi.__module__}.{fungsi.__name__}"
+
+        @functools.wraps(fungsi)
+        def pembungkus(*args, **kwargs):
+            with ukur(label):
+                hasil = fungsi(*args, **kwargs)
+            if baca and isinstance(hasil, pd.DataFrame):
+                tambah("baris_dibaca", len(hasil))
+            return hasil
+        return pembungkus
+    return dekorator
+
+
+def reset():
+    with _kunci:
+        _waktu.clear()
+        _penghitung.clear()
+
+
+def ringkasan_waktu():
+    """DataFrame waktu per nama, urut total waktu terbesar."""
+    with _kunci:
+        baris = [(nama, n, total, total / n, maks) for nama, (n, total, maks) in _waktu.items()]
+    df = pd.DataFrame(baris, columns=["Nama", "Panggilan", "Total (s)", "Rata-rata (ms)", "Maks (ms)"])
+    df["Rata-rata (ms)"] *= 1000
+    df["Maks (ms)"] *= 1000
+    return df.sort_values("Total (s)", ascending=False, ignore_index=True)
+
+
+def ringkasan_penghitung():
+    with _kunci:
+        return dict(_penghitung)
+
+
+def _label(nama):
+    return nama.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def ke_prometheus(awalan="spk_moora"):
+    """Teks format eksposisi Prometheus untuk semua waktu dan penghitung."""
+    with _kunci:
+        waktu = {nama: list(data) for nama, data in _waktu.items()}
+        penghitung = dict(_penghitung)
+    baris = [
+        f"# TYPE {awalan}_durasi_detik summary",
+        *(f'{awalan}_durasi_detik_count{{nama="{_label(nama)}"}} {n}' for nama, (n, _, _) in waktu.items()),
+        *(f'{awalan}_durasi_detik_sum{{nama="{_label(nama)}"}} {total:.6f}' for nama, (_, total, _) in waktu.items()),
+        f"# TYPE {awalan}_durasi_maks_detik gauge",
+        *(f'{awalan}_durasi_maks_detik{{nama="{_label(nama)}"}} {maks:.6f}' for nama, (_, _, maks) in waktu.items()),
+    ]
+    for nama, nilai in penghitung.items():
+        baris.append(f"# TYPE {awalan}_{nama}_total counter")
+        baris.append(f"{awalan}_{nama}_total {nilai}")
+    return "\n".join(baris) + "\n"
+
+
+def ke_json_lines():
+    """Satu objek JSON per baris untuk tiap waktu dan penghitung (untuk dikirim ke pengumpul log)."""
+    waktu = ringkasan_waktu()
+    baris = [
+        json.dumps({"jenis": "waktu", "nama": r["Nama"], "panggilan": int(r["Panggilan"]),
+                    "total_detik": r["Total (s)"], "maks_ms": r["Maks (ms)"]})
+        for r in waktu.to_dict("records")
+    ]
+    baris += [json.dumps({"jenis": "penghitung", "nama": nama, "nilai": nilai})
+              for nama, nilai in ringkasan_penghitung().items()]
+    return "\n".join(baris) + "\n"
@@ -0,0 +1,173 @@
+import threading
+
+from db import DB_FILE, USER_DB_FILE, get_connection, transaksi
+from metrik import diukur
+
+
+def _pindahkan_laporan_lama(conn):
+    # Laporan dari versi sebelumnya (tanpa run) dijadikan satu run per user
+    users = [r[0] for r in conn.execute("SELECT DISTINCT username FROM laporan_moora WHERE run_id IS NULL")]
+    for username in users:
+        run_id = conn.execute(
+            "INSERT INTO laporan_run (username, dibuat, jumlah, keterangan) "
+            "SELECT ?, datetime('now', 'localtime'), COUNT(*), 'Laporan lama' FROM laporan_moora "
+            "WHERE username = ? AND run_id IS NULL", (username, username)).lastrowid
+        conn.execute("UPDATE laporan_moora SET run_id = ? WHERE username = ? AND run_id IS NULL", (run_id, username))
+    conn.execute("""
+        UPDATE laporan_moora SET peringkat = r.peringkat
+        FROM (SELECT id, ROW_NUMBER() OVER (PARTITION BY run_id ORDER BY skor DESC, id) AS peringkat
+              FROM laporan_moora WHERE peringkat IS NULL) AS r
+        WHERE laporan_moora.id = r.id
+    """)
+
+
+def _hapus_duplikat_alternatif(conn):
+    # Sebelum kunci unik dipasang: per (username, nama) hanya baris terbaru (id terbesar) yang disimpan
+    conn.execute("""
+        INSERT INTO versi_data (username, versi)
+        SELECT DISTINCT username, 1 FROM alternatif a
+        WHERE EXISTS (SELECT 1 FROM alternatif b
+                      WHERE b.username = a.username AND b.alternatif = a.alternatif AND b.id > a.id)
+        ON CONFLICT(username) DO UPDATE SET versi = versi + 1
+    """)
+    conn.execute("""
+        DELETE FROM alternatif
+        WHERE alternatif IS NOT NULL
+          AND id NOT IN (SELECT MAX(id) FROM alternatif GROUP BY username, alternatif)
+    """)
+
+
+# Daftar migrasi per file database: (versi, keterangan, langkah).
+# Langkah berupa perintah SQL atau fungsi yang menerima koneksi (untuk perubahan yang butuh logika).
+# Versi skema disimpan di PRAGMA user_version; migrasi baru cukup ditambahkan di akhir daftar.
+MIGRASI_ALTERNATIF = [
+    (1, "tabel dasar", [
+        """CREATE TABLE IF NOT EXISTS alternatif (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT,
+            alternatif TEXT,
+            c1 INTEGER, c2 INTEGER, c3 INTEGER, c4 INTEGER, c5 INTEGER,
+            c6 INTEGER, c7 INTEGER, c8 INTEGER, c9 INTEGER
+        )""",
+        """CREATE TABLE IF NOT EXISTS bobot_kriteria (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT,
+            kriteria TEXT,
+            keterangan TEXT,
+            bobot REAL,
+            jenis TEXT,
+            UNIQUE(username, kriteria)
+        )""",
+        """CREATE TABLE IF NOT EXISTS laporan_moora (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT,
+            nama_alternatif TEXT,
+            skor REAL
+        )""",
+    ]),
+    (2, "indeks tabel per username", [
+        "CREATE INDEX IF NOT EXISTS idx_alternatif_username_id ON alternatif (username, id)",
+        "CREATE INDEX IF NOT EXISTS idx_alternatif_username_nama ON alternatif (username, alternatif)",
+        "CREATE INDEX IF NOT EXISTS idx_laporan_username_id ON laporan_moora (username, id)",
+    ]),
+    (3, "versi data per user untuk cache", [
+        """CREATE TABLE IF NOT EXISTS versi_data (
+            username TEXT PRIMARY KEY,
+            versi INTEGER NOT NULL DEFAULT 0
+        )""",
+    ]),
+    (4, "riwayat laporan per run", [
+        """CREATE TABLE IF NOT EXISTS laporan_run (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT,
+            dibuat TEXT,
+            jumlah INTEGER,
+            keterangan TEXT
+        )""",
+        "ALTER TABLE laporan_moora ADD COLUMN run_id INTEGER",
+        "ALTER TABLE laporan_moora ADD COLUMN peringkat INTEGER",
+        _pindahkan_laporan_lama,
+        "CREATE INDEX IF NOT EXISTS idx_laporan_run_username_id ON laporan_run (username, id)",
+        "CREATE INDEX IF NOT EXISTS idx_laporan_run_peringkat ON laporan_moora (run_id, peringkat)",
+        "CREATE INDEX IF NOT EXISTS idx_laporan_run_nama ON laporan_moora (run_id, nama_alternatif)",
+    ]),
+    (5, "job hitung ulang massal", [
+        """CREATE TABLE IF NOT EXISTS job_hitung_ulang (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dibuat TEXT,
+            selesai TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS job_hitung_ulang_user (
+            job_id INTEGER,
+            username TEXT,
+            status TEXT,
+            run_id INTEGER,
+            PRIMARY KEY (job_id, username)
+        )""",
+    ]),
+    (6, "nama alternatif unik per user", [
+        _hapus_duplikat_alternatif,
+        "DROP INDEX IF EXISTS idx_alternatif_username_nama",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_alternatif_username_nama ON alternatif (username, alternatif)",
+    ]),
+    (7, "top-k dan sidik data/bobot per run laporan", [
+        "ALTER TABLE laporan_run ADD COLUMN top_k INTEGER",
+        "ALTER TABLE laporan_run ADD COLUMN total INTEGER",
+        "ALTER TABLE laporan_run ADD COLUMN sidik TEXT",
+    ]),
+    (8, "nilai ukur mentah alternatif untuk konversi ulang", [
+        "ALTER TABLE alternatif ADD COLUMN mentah TEXT",
+    ]),
+]
+
+MIGRASI_USER = [
+    (1, "tabel users", [
+        """CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            password TEXT
+        )""",
+    ]),
+]
+
+DAFTAR_MIGRASI = {
+    DB_FILE: MIGRASI_ALTERNATIF,
+    USER_DB_FILE: MIGRASI_USER,
+}
+
+_kunci = threading.Lock()
+_sudah_migrasi = set()
+
+
+def versi_skema(db_file):
+    return get_connection(db_file).execute("PRAGMA user_version").fetchone()[0]
+
+
+def jalankan_migrasi(db_file, daftar):
+    """Terapkan migrasi yang belum dijalankan pada db_file, masing-masing dalam satu transaksi.
+
+    Mengembalikan versi skema setelah migrasi.
+    """
+    for versi, _, langkah in daftar:
+        with transaksi(db_file) as conn:
+            # Versi dibaca ulang di dalam transaksi: proses lain mungkin sudah menjalankan migrasi ini
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= versi:
+                continue
+            for perintah in langkah:
+                if callable(perintah):
+                    perintah(conn)
+                else:
+                    conn.execute(perintah)
+            conn.execute(f"PRAGMA user_version = {int(versi)}")
+    return versi_skema(db_file)
+
+
+@diukur()
+def migrasi_semua():
+    """Jalankan migrasi seluruh database sekali per proses (panggilan berikutnya langsung kembali)."""
+    if len(_sudah_migrasi) == len(DAFTAR_MIGRASI):
+        return
+    with _kunci:
+        for db_file, daftar in DAFTAR_MIGRASI.items():
+            if db_file not in _sudah_migrasi:
+                jalankan_migrasi(db_file, daftar)
+                _sudah_migrasi.add(db_file)
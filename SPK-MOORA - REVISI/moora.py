@@ -0,0 +1,338 @@
+import numpy as np
+import pandas as pd
+
+from metrik import diukur
+
+KOLOM_KRITERIA = ["c1", "c2", "c3", "c4", "c5", "c6", "c7", "c8", "c9"]
+
+# Batas jumlah elemen matriks peringkat (alternatif x skenario) yang diproses sekaligus
+MAKS_ELEMEN_BLOK = 5_000_000
+
+# Jumlah alternatif per blok saat menghitung skor dari matriks kompak
+UKURAN_BLOK_KOMPAK = 65_536
+
+# Batas ukuran kisi nilai (hasil kali banyaknya nilai berbeda tiap kriteria) untuk front Pareto berbasis kisi
+MAKS_SEL_PARETO = 20_000_000
+
+
+def arah_kriteria(jenis):
+    # +1 untuk Benefit, -1 untuk Cost, 0 untuk jenis lain (tidak ikut dihitung)
+    jenis = pd.Series(jenis, dtype="string").str.lower()
+    return np.select([jenis == "benefit", jenis == "cost"], [1.0, -1.0], 0.0)
+
+
+def normalisasi(matrix):
+    return matrix / np.sqrt((matrix ** 2).sum(axis=0))
+
+
+def urutan_teratas(skor, top_k=None):
+    """Indeks alternatif urut skor tertinggi. Dengan top_k hanya k teratas yang dipilih (argpartition)
+    dan diurutkan, sehingga tidak perlu mengurutkan seluruh alternatif."""
+    n = len(skor)
+    if top_k is None or top_k >= n:
+        return np.argsort(-skor, kind="stable")
+    if top_k <= 0:
+        return np.array([], dtype=np.intp)
+    pilih = np.argpartition(-skor, top_k - 1)[:top_k]
+    return pilih[np.argsort(-skor[pilih], kind="stable")]
+
+
+def _front_kisi(peringkat, ukuran):
+    # Sel kisi berisi alternatif ditandai, lalu OR diakumulasi dari nilai terbaik ke terburuk di tiap sumbu:
+    # ada[s] = ada alternatif yang sama atau lebih baik dari sel s di semua kriteria.
+    ada = np.zeros(ukuran, dtype=bool)
+    ada[tuple(peringkat)] = True
+    for sumbu in range(len(ukuran)):
+        ada = np.flip(np.logical_or.accumulate(np.flip(ada, sumbu), axis=sumbu), sumbu)
+    # Didominasi = ada alternatif >= di semua kriteria dan > di minimal satu kriteria d (sel bergeser +1 di d)
+    didominasi = np.zeros(peringkat.shape[1], dtype=bool)
+    for d in range(len(ukuran)):
+        geser = peringkat.copy()
+        geser[d] += 1
+        ok = geser[d] < ukuran[d]
+        didominasi[ok] |= ada[tuple(geser[:, ok])]
+    return ~didominasi
+
+
+def _front_blok(x):
+    # Block-nested-loop terurut jumlah: alternatif hanya dapat didominasi oleh yang jumlah nilainya lebih besar,
+    # dan cukup dibandingkan dengan front yang sudah terbentuk (dominasi bersifat transitif)
+    unik, inv = np.unique(x, axis=0, return_inverse=True)
+    jumlah = unik.sum(axis=1)
+    urut = np.argsort(-jumlah, kind="stable")
+    unik, jumlah = unik[urut], jumlah[urut]
+    tidak_didominasi = np.zeros(len(unik), dtype=bool)
+    front = np.empty((0, x.shape[1]))
+    batas = np.flatnonzero(np.diff(jumlah)) + 1
+    for awal, akhir in zip([0, *batas], [*batas, len(unik)]):
+        kelompok = unik[awal:akhir]
+        didominasi = np.zeros(len(kelompok), dtype=bool)
+        blok = max(1, MAKS_ELEMEN_BLOK // max(front.size, 1))
+        for a in range(0, len(kelompok), blok):
+            didominasi[a:a + blok] = (front[None] >= kelompok[a:a + blok, None]).all(axis=2).any(axis=1)
+        tidak_didominasi[awal:akhir] = ~didominasi
+        front = np.vstack([front, kelompok[~didominasi]])
+    hasil = np.empty(len(unik), dtype=bool)
+    hasil[urut] = tidak_didominasi
+    return hasil[inv.reshape(-1)]
+
+
+@diukur()
+def front_pareto(data, arah):
+    """Mask alternatif yang tidak didominasi (front Pareto) pada matriks alternatif x kriteria.
+
+    Alternatif didominasi bila ada alternatif lain yang sama atau lebih baik di semua kriteria dan lebih
+    baik di minimal satu (Benefit: lebih besar, Cost: lebih kecil; kriteria berarah 0 diabaikan). Untuk bobot
+    positif berapa pun skor MOORA-nya tidak melebihi skor alternatif yang mendominasinya, jadi tidak pernah
+    menjadi yang terbaik. Skor kriteria berupa bilangan bulat kecil, sehingga dominasi dicari pada kisi
+    nilai (ukuran kisi = hasil kali banyaknya nilai berbeda tiap kriteria); bila kisi melebihi
+    MAKS_SEL_PARETO dipakai block-nested-loop.
+    """
+    arah = np.asarray(arah, dtype=float)
+    x = np.asarray(data, dtype=float)[:, arah != 0] * arah[arah != 0]
+    if len(x) == 0 or x.shape[1] == 0:
+        return np.ones(len(x), dtype=bool)
+    peringkat, ukuran = [], []
+    for kolom in x.T:
+        nilai, inv = np.unique(kolom, return_inverse=True)
+        peringkat.append(inv.reshape(-1))
+        ukuran.append(len(nilai))
+    if np.prod(ukuran, dtype=float) <= MAKS_SEL_PARETO:
+        return _front_kisi(np.array(peringkat), ukuran)
+    return _front_blok(x)
+
+
+@diukur()
+def moora_calculation(df_alt, df_bobot, top_k=None, hanya_pareto=False):
+    """Peringkat MOORA (ratio system). hanya_pareto=True: alternatif yang didominasi tidak ikut diperingkat;
+    normalisasi tetap memakai seluruh alternatif sehingga skor sama dengan perhitungan penuh."""
+    # Ambil nama alternatif dan data kriteria
+    alt_names = df_alt["Alternatif"].to_numpy()
+    data = df_alt.loc[:, "c1":"c9"].to_numpy(dtype=float)
+
+    # Normalisasi
+    normal = normalisasi(data)
+
+    # Bobot dari df_bobot, cost dikurangkan dan benefit dijumlahkan
+    bobot = df_bobot["Bobot"].to_numpy(dtype=float)
+    arah = arah_kriteria(df_bobot["Jenis"])
+    if hanya_pareto:
+        front = front_pareto(data, arah)
+        alt_names, normal = alt_names[front], normal[front]
+    skor = normal @ (bobot * arah)
+
+    urut = urutan_teratas(skor, top_k)
+    hasil = pd.DataFrame({
+        "Alternatif": alt_names[urut],
+        "Skor Akhir": skor[urut]
+    })
+    return hasil
+
+
+def moora_multimetode(df_alt, df_bobot, top_k=None):
+    """Tiga varian MOORA sekaligus: ratio system, reference point dan full multiplicative form.
+
+    Lintasan pertama mengumpulkan jumlah kuadrat, maksimum dan minimum tiap kriteria; lintasan kedua
+    menormalisasi matriks per blok dan menghitung ketiga skor dari blok ternormalisasi yang sama.
+      - Ratio system: jumlah bobot x nilai benefit dikurangi cost (sama dengan moora_calculation).
+      - Reference point: jarak Tchebycheff berbobot ke titik ideal (maks benefit, min cost); kecil = baik.
+      - Full multiplicative: log(prod benefit^bobot / prod cost^bobot); besar = baik.
+    Peringkat konsensus diurutkan dari rata-rata ketiga peringkat (seri dipecah oleh ratio system).
+    """
+    nama = df_alt["Alternatif"].to_numpy()
+    data = df_alt[KOLOM_KRITERIA].to_numpy(dtype=float)
+    bobot = df_bobot["Bobot"].to_numpy(dtype=float)
+    arah = arah_kriteria(df_bobot["Jenis"])
+    dipakai = arah != 0
+
+    akar = np.sqrt((data ** 2).sum(axis=0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        skala = np.where(akar > 0, 1 / akar, 0.0)
+    n = len(nama)
+    if n:
+        ideal = np.where(arah > 0, data.max(axis=0), data.min(axis=0)) * skala
+    else:
+        ideal = np.zeros(len(bobot))
+
+    rasio, jarak, multiplikatif = np.empty(n), np.empty(n), np.empty(n)
+    blok = max(1, MAKS_ELEMEN_BLOK // data.shape[1])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for awal in range(0, n, blok):
+            normal = data[awal:awal + blok] * skala
+            rasio[awal:awal + blok] = normal @ (bobot * arah)
+            jarak[awal:awal + blok] = (bobot * np.abs(ideal - normal))[:, dipakai].max(axis=1, initial=0)
+            multiplikatif[awal:awal + blok] = np.log(normal[:, dipakai]) @ (bobot * arah)[dipakai]
+
+    peringkat = _peringkat(np.column_stack([rasio, -jarak, np.nan_to_num(multiplikatif, nan=-np.inf)]))
+    rata_rata = peringkat.mean(axis=1)
+    # Kunci bulat (jumlah peringkat, lalu peringkat rasio) agar top-k konsensus cukup dengan seleksi parsial
+    kunci = peringkat.sum(axis=1, dtype=np.int64) * (n + 1) + peringkat[:, 0]
+    urut = urutan_teratas(-kunci, top_k)
+    return pd.DataFrame({
+        "Alternatif": nama[urut],
+        "Peringkat Konsensus": np.arange(1, len(urut) + 1),
+        "Rata-rata Peringkat": rata_rata[urut],
+        "Skor Rasio": rasio[urut],
+        "Peringkat Rasio": peringkat[urut, 0],
+        "Jarak Titik Referensi": jarak[urut],
+        "Peringkat Titik Referensi": peringkat[urut, 1],
+        "Skor Multiplikatif (log)": multiplikatif[urut],
+        "Peringkat Multiplikatif": peringkat[urut, 2],
+    })
+
+
+def skor_kompak(kolom, jumlah_kuadrat, df_bobot, ukuran_blok=UKURAN_BLOK_KOMPAK):
+    """Skor MOORA langsung dari matriks kolom bilangan bulat kecil (kriteria x alternatif, misalnya int8 mmap).
+
+    jumlah_kuadrat (per kriteria) sudah dihitung saat matriks dibuat, sehingga cukup satu lintasan.
+    Kontribusi tiap kriteria diambil dari tabel nilai -> bobot x arah x nilai / akar jumlah kuadrat,
+    per blok alternatif; matriks tidak pernah diubah seluruhnya menjadi float.
+    """
+    akar = np.sqrt(np.asarray(jumlah_kuadrat, dtype=float))
+    bobot = df_bobot["Bobot"].to_numpy(dtype=float) * arah_kriteria(df_bobot["Jenis"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        koef = np.where(akar > 0, bobot / akar, 0.0)
+    tabel = koef[:, None] * np.arange(np.iinfo(kolom.dtype).max + 1)
+    baris = np.arange(len(koef))[:, None]
+
+    n = kolom.shape[1]
+    skor = np.empty(n)
+    for awal in range(0, n, ukuran_blok):
+        skor[awal:awal + ukuran_blok] = tabel[baris, kolom[:, awal:awal + ukuran_blok]].sum(axis=0)
+    return skor
+
+
+def skor_skenario(normal, bobot_skenario, arah):
+    """Skor MOORA semua alternatif untuk banyak vektor bobot sekaligus.
+
+    normal: matriks ternormalisasi (alternatif x kriteria), bobot_skenario: (skenario x kriteria).
+    Mengembalikan matriks skor (alternatif x skenario) dari satu perkalian matriks.
+    """
+    return normal @ (np.atleast_2d(bobot_skenario) * arah).T
+
+
+def bobot_monte_carlo(bobot, n_simulasi=1000, sebaran=0.1, seed=None):
+    """Bangkitkan vektor bobot acak di sekitar bobot tersimpan (±sebaran relatif), dinormalisasi ke jumlah 1."""
+    rng = np.random.default_rng(seed)
+    bobot = np.asarray(bobot, dtype=float)
+    acak = bobot * (1 + rng.uniform(-sebaran, sebaran, size=(n_simulasi, len(bobot))))
+    acak = np.clip(acak, 0, None)
+    return acak / acak.sum(axis=1, keepdims=True)
+
+
+def bobot_satu_per_satu(bobot, langkah=101):
+    """Skenario one-at-a-time: bobot satu kriteria digeser 0..1, kriteria lain diskalakan proporsional.
+
+    Mengembalikan (matriks bobot, indeks kriteria yang digeser, nilai bobot kriteria tersebut).
+    """
+    bobot = np.asarray(bobot, dtype=float)
+    bobot = bobot / bobot.sum()
+    k = len(bobot)
+    nilai = np.linspace(0, 1, langkah)
+
+    skenario = np.empty((k, langkah, k))
+    for j in range(k):
+        sisa = 1 - bobot[j]
+        lain = bobot / sisa if sisa > 0 else np.full(k, 1 / (k - 1))
+        lain[j] = 0
+        skenario[j] = (1 - nilai)[:, None] * lain[None, :]
+        skenario[j][:, j] = nilai
+    return skenario.reshape(k * langkah, k), np.repeat(np.arange(k), langkah), np.tile(nilai, k)
+
+
+def _peringkat(skor):
+    # Peringkat 1 = skor tertinggi, per kolom skenario
+    urutan = np.argsort(-skor, axis=0, kind="stable")
+    peringkat = np.empty_like(urutan)
+    np.put_along_axis(peringkat, urutan, np.arange(1, skor.shape[0] + 1)[:, None], axis=0)
+    return peringkat
+
+
+@diukur()
+def analisis_sensitivitas(df_alt, df_bobot, bobot_skenario=None, n_simulasi=1000, sebaran=0.1,
+                          peringkat_maks=10, langkah=101, seed=None, hanya_pareto=False):
+    """Analisis sensitivitas bobot MOORA.
+
+    hanya_pareto=True: hanya alternatif yang tidak didominasi yang dianalisis (peringkat dihitung di antara
+    mereka; normalisasi tetap dari seluruh alternatif). Alternatif terbaik tiap skenario tidak berubah.
+
+    Jika bobot_skenario (skenario x kriteria) tidak diberikan, dibangkitkan n_simulasi skenario Monte Carlo
+    di sekitar bobot tersimpan. Mengembalikan dict berisi:
+      - "ringkasan": per alternatif (urut peringkat dasar) berisi peringkat dasar, rata-rata/min/maks peringkat,
+        peluang menjadi terbaik dan peluang peringkatnya tetap sama;
+      - "distribusi": peluang tiap alternatif menempati peringkat 1..peringkat_maks;
+      - "rentang_bobot": per kriteria, rentang bobot (kriteria lain diskalakan proporsional)
+        di mana alternatif terbaik dasar tetap di posisi teratas.
+    """
+    nama = df_alt["Alternatif"].to_numpy()
+    data = df_alt[KOLOM_KRITERIA].to_numpy(dtype=float)
+    normal = normalisasi(data)
+    bobot = df_bobot["Bobot"].to_numpy(dtype=float)
+    arah = arah_kriteria(df_bobot["Jenis"])
+    if hanya_pareto:
+        front = front_pareto(data, arah)
+        nama, normal = nama[front], normal[front]
+    n = len(nama)
+
+    if bobot_skenario is None:
+        bobot_skenario = bobot_monte_carlo(bobot, n_simulasi, sebaran, seed)
+    bobot_skenario = np.atleast_2d(np.asarray(bobot_skenario, dtype=float))
+    m = len(bobot_skenario)
+
+    peringkat_dasar = _peringkat(skor_skenario(normal, bobot, arah))[:, 0]
+    terbaik = int(np.argmin(peringkat_dasar))
+    peringkat_maks = min(peringkat_maks, n)
+
+    jumlah = np.zeros(n)
+    minimum = np.full(n, n)
+    maksimum = np.zeros(n, dtype=int)
+    sama = np.zeros(n)
+    distribusi = np.zeros((n, peringkat_maks))
+
+    # Skenario diproses per blok agar matriks peringkat tidak melebihi MAKS_ELEMEN_BLOK
+    blok = max(1, MAKS_ELEMEN_BLOK // max(n, 1))
+    for awal in range(0, m, blok):
+        peringkat = _peringkat(skor_skenario(normal, bobot_skenario[awal:awal + blok], arah))
+        jumlah += peringkat.sum(axis=1)
+        minimum = np.minimum(minimum, peringkat.min(axis=1))
+        maksimum = np.maximum(maksimum, peringkat.max(axis=1))
+        sama += (peringkat == peringkat_dasar[:, None]).sum(axis=1)
+        baris, kolom = np.nonzero(peringkat <= peringkat_maks)
+        np.add.at(distribusi, (baris, peringkat[baris, kolom] - 1), 1)
+
+    urut = np.argsort(peringkat_dasar)
+    ringkasan = pd.DataFrame({
+        "Alternatif": nama,
+        "Peringkat Dasar": peringkat_dasar,
+        "Rata-rata Peringkat": jumlah / m,
+        "Peringkat Terbaik": minimum,
+        "Peringkat Terburuk": maksimum,
+        "Peluang Terbaik": distribusi[:, 0] / m,
+        "Peluang Peringkat Tetap": sama / m,
+    }).iloc[urut].reset_index(drop=True)
+
+    distribusi_df = pd.DataFrame(distribusi / m, columns=[f"Peringkat {i}" for i in range(1, peringkat_maks + 1)])
+    distribusi_df.insert(0, "Alternatif", nama)
+    distribusi_df = distribusi_df.iloc[urut].reset_index(drop=True)
+
+    # Rentang bobot tiap kriteria di mana alternatif terbaik tetap teratas (dihitung dalam satu perkalian matriks)
+    skenario_oat, indeks, nilai = bobot_satu_per_satu(bobot, langkah)
+    skor_oat = skor_skenario(normal, skenario_oat, arah)
+    tetap = skor_oat[terbaik] >= skor_oat.max(axis=0)
+    rentang = []
+    for j, kode in enumerate(df_bobot["Kriteria"]):
+        nilai_tetap = nilai[(indeks == j) & tetap]
+        rentang.append({
+            "Kriteria": kode,
+            "Bobot Saat Ini": bobot[j] / bobot.sum(),
+            "Bobot Minimum": nilai_tetap.min() if len(nilai_tetap) else np.nan,
+            "Bobot Maksimum": nilai_tetap.max() if len(nilai_tetap) else np.nan,
+        })
+
+    return {
+        "terbaik": nama[terbaik],
+        "jumlah_skenario": m,
+        "ringkasan": ringkasan,
+        "distribusi": distribusi_df,
+        "rentang_bobot": pd.DataFrame(rentang),
+    }
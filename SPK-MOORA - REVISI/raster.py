@@ -0,0 +1,273 @@
+"""Pemindaian kesesuaian lahan per sel grid untuk satu wilayah (misalnya seluruh Kabupaten Semarang).
+
+Bounding box dibagi menjadi sel persegi berukuran tetap (meter). Jarak tiap sel ke lapisan fitur dihitung
+dengan distance transform pada raster (scipy.ndimage bila terpasang, atau versi NumPy), lalu dikonversi
+dengan aturan kriteria yang sama dan diberi skor MOORA dengan bobot user. Jarak di atas batas kelas
+terakhir tidak mengubah skor, sehingga jarak dibatasi sampai batas itu dan tiap pita baris cukup diberi
+tepi selebar batas tersebut. Pita baris dihitung paralel di beberapa proses; skor disusun di proses
+utama dari matriks int8 kriteria x sel.
+
+Kriteria tanpa lapisan (misalnya luas lahan, permukaan dan lebar jalan, kepemilikan) bernilai sama untuk
+semua sel dan diisi lewat nilai_tetap. Sel yang pusatnya berada di dalam poligon lapisan (misalnya kawasan
+pemukiman) ditandai seperti sel berisi titik lapisan, jadi jaraknya 0. Jarak diukur antar pusat sel, jadi ketelitiannya sekitar satu sel;
+sel yang lebih lebar dari pita kelas tersempit (10 m untuk C3 dan C4) bisa melompati satu kelas, sehingga
+pindai_wilayah memberi peringatan untuk ukuran sel seperti itu.
+"""
+import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from konversi import ATURAN, KODE_KRITERIA, konversi_kolom, konversi_nilai
+from metrik import diukur
+from moora import KOLOM_KRITERIA, skor_kompak, urutan_teratas
+from spasial import JARI_JARI_BUMI, LAPISAN, di_dalam_poligon
+
+try:
+    from scipy import ndimage
+except ImportError:  # scipy opsional; tanpa scipy dipakai distance transform NumPy yang dibatasi radius
+    ndimage = None
+
+log = logging.getLogger("spk_moora.raster")
+
+METER_PER_DERAJAT = JARI_JARI_BUMI * math.pi / 180
+BARIS_PER_TUGAS = 256
+MAKS_SEL = 50_000_000
+# Batas untuk pemindaian dari halaman web: sekitar 0,4 GB memori puncak per pemindaian (matriks int8 9 kriteria
+# dan raster skor float64); wilayah yang lebih besar dipindai lewat CLI
+MAKS_SEL_HALAMAN = 20_000_000
+TOP_N = 100
+UKURAN_SEL = 10.0
+
+
+def buat_grid(lat_min, lon_min, lat_maks, lon_maks, ukuran_sel, maks_sel=MAKS_SEL):
+    """Geometri grid: baris 0 di tepi utara, kolom 0 di tepi barat; sel berukuran ukuran_sel x ukuran_sel meter.
+
+    Grid dengan lebih dari maks_sel sel ditolak (ValueError) sebelum memori apa pun dialokasikan.
+    """
+    if ukuran_sel <= 0 or lat_maks <= lat_min or lon_maks <= lon_min:
+        raise ValueError("Bounding box atau ukuran sel tidak valid")
+    dlat = ukuran_sel / METER_PER_DERAJAT
+    dlon = ukuran_sel / (METER_PER_DERAJAT * math.cos(math.radians((lat_min + lat_maks) / 2)))
+    baris = math.ceil((lat_maks - lat_min) / dlat)
+    kolom = math.ceil((lon_maks - lon_min) / dlon)
+    if baris * kolom > maks_sel:
+        raise ValueError(f"Grid berisi {baris * kolom:,} sel (maksimum {maks_sel:,}); perbesar ukuran sel "
+                         "atau perkecil wilayah")
+    return {"lat_maks": lat_maks, "lon_min": lon_min, "dlat": dlat, "dlon": dlon,
+            "baris": baris, "kolom": kolom, "ukuran_sel": ukuran_sel}
+
+
+def pusat_sel(grid, indeks):
+    """Koordinat (lat, lon) pusat sel dari indeks datar (baris * kolom + kolom)."""
+    i, j = np.divmod(np.asarray(indeks), grid["kolom"])
+    return grid["lat_maks"] - (i + 0.5) * grid["dlat"], grid["lon_min"] + (j + 0.5) * grid["dlon"]
+
+
+def _jarak_maks(kode, ukuran_sel):
+    # Jarak yang sudah melewati batas kelas terakhir semuanya masuk kelas terakhir
+    return ATURAN[kode]["batas"][-1][0] + ukuran_sel
+
+
+def lebar_kelas_terkecil(kode):
+    """Lebar pita kelas jarak tersempit (meter), termasuk pita 0 sampai batas pertama."""
+    batas = [0] + [a for a, _ in ATURAN[kode]["batas"]]
+    return min(b - a for a, b in zip(batas, batas[1:]))
+
+
+def peringatan_ukuran_sel(ukuran_sel, kode_lapisan):
+    """Pesan peringatan bila sel lebih lebar dari pita kelas tersempit kriteria lapisan, atau None."""
+    sempit = {kode: lebar_kelas_terkecil(kode) for kode in kode_lapisan if kode in LAPISAN}
+    terlalu_lebar = [f"{kode} ({lebar:g} m)" for kode, lebar in sempit.items() if ukuran_sel > lebar]
+    if not terlalu_lebar:
+        return None
+    return (f"Ukuran sel {ukuran_sel:g} m lebih lebar dari pita kelas {', '.join(terlalu_lebar)}; "
+            f"skor kriteria tersebut bisa meleset satu kelas. Gunakan sel <= {min(sempit.values()):g} m.")
+
+
+def _jarak_kolom(mask, r):
+    # Jarak (dalam sel, maksimum r + 1) ke sel bertanda terdekat pada kolom yang sama, dua arah
+    n = mask.shape[0]
+    idx = np.arange(n, dtype=np.int32)[:, None]
+    atas = np.maximum.accumulate(np.where(mask, idx, -(r + 1) - n), axis=0)
+    bawah = np.minimum.accumulate(np.where(mask, idx, 2 * n + r + 1)[::-1], axis=0)[::-1]
+    return np.minimum(np.minimum(idx - atas, bawah - idx), r + 1)
+
+
+def jarak_raster(mask, ukuran_sel, maks):
+    """Jarak Euclid (meter) tiap sel ke sel bertanda terdekat, dibatasi maks.
+
+    Tanpa scipy: jarak per kolom dihitung dulu, lalu tiap baris mengambil minimum o^2 + g(j + o)^2
+    untuk pergeseran o dalam radius maks (hasilnya tetap eksak di dalam radius).
+    """
+    if not mask.any():
+        return np.full(mask.shape, float(maks))
+    if ndimage is not None:
+        return np.minimum(ndimage.distance_transform_edt(~mask, sampling=ukuran_sel), maks)
+
+    r = math.ceil(maks / ukuran_sel)
+    g2 = _jarak_kolom(mask, r) ** 2
+    d2 = g2.copy()
+    for o in range(1, min(r, mask.shape[1] - 1) + 1):
+        np.minimum(d2[:, :-o], g2[:, o:] + o * o, out=d2[:, :-o])
+        np.minimum(d2[:, o:], g2[:, :-o] + o * o, out=d2[:, o:])
+    return np.minimum(np.sqrt(d2) * ukuran_sel, maks)
+
+
+def _sel_poligon(grid, poligon, h):
+    # Sel (termasuk tepi selebar h di luar grid) yang pusatnya berada di dalam poligon
+    ii, jj = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+    for p in poligon:
+        semua = np.vstack(p)
+        i0 = max(math.floor((grid["lat_maks"] - semua[:, 0].max()) / grid["dlat"]), -h)
+        i1 = min(math.ceil((grid["lat_maks"] - semua[:, 0].min()) / grid["dlat"]), grid["baris"] + h)
+        j0 = max(math.floor((semua[:, 1].min() - grid["lon_min"]) / grid["dlon"]), -h)
+        j1 = min(math.ceil((semua[:, 1].max() - grid["lon_min"]) / grid["dlon"]), grid["kolom"] + h)
+        if i0 >= i1 or j0 >= j1:
+            continue
+        i, j = (a.ravel() for a in np.meshgrid(np.arange(i0, i1), np.arange(j0, j1), indexing="ij"))
+        lat, lon = grid["lat_maks"] - (i + 0.5) * grid["dlat"], grid["lon_min"] + (j + 0.5) * grid["dlon"]
+        dalam = di_dalam_poligon(lat, lon, [p])
+        ii.append(i[dalam])
+        jj.append(j[dalam])
+    return np.concatenate(ii), np.concatenate(jj)
+
+
+def _sel_lapisan(grid, titik, kode, poligon=None):
+    # Titik lapisan (dan sel di dalam poligonnya) -> indeks sel unik (i, j), termasuk sel di luar grid yang
+    # masih dalam radius; urut per baris
+    h = math.ceil(_jarak_maks(kode, grid["ukuran_sel"]) / grid["ukuran_sel"])
+    i = np.floor((grid["lat_maks"] - titik[:, 0]) / grid["dlat"]).astype(np.int64)
+    j = np.floor((titik[:, 1] - grid["lon_min"]) / grid["dlon"]).astype(np.int64)
+    if poligon:
+        ip, jp = _sel_poligon(grid, poligon, h)
+        i, j = np.concatenate([i, ip]), np.concatenate([j, jp])
+    lebar = grid["kolom"] + 2 * h
+    ok = (i >= -h) & (i < grid["baris"] + h) & (j >= -h) & (j < grid["kolom"] + h)
+    ip, jp = np.divmod(np.unique((i[ok] + h) * lebar + (j[ok] + h)), lebar)
+    return (ip - h).astype(np.int32), (jp - h).astype(np.int32)
+
+
+def _pindai_pita(awal, akhir, kolom, ukuran_sel, sel_pita):
+    # Dijalankan di proses pekerja: skor kriteria jarak (int8) untuk baris awal..akhir
+    hasil = {}
+    for kode, (ii, jj) in sel_pita.items():
+        maks = _jarak_maks(kode, ukuran_sel)
+        h = math.ceil(maks / ukuran_sel)
+        mask = np.zeros((akhir - awal + 2 * h, kolom + 2 * h), dtype=bool)
+        mask[ii - awal + h, jj + h] = True
+        jarak = jarak_raster(mask, ukuran_sel, maks)[h:h + akhir - awal, h:h + kolom]
+        hasil[kode] = konversi_kolom(kode, jarak.ravel()).astype(np.int8)
+    return awal, akhir, hasil
+
+
+@diukur()
+def pindai_wilayah(bbox, ukuran_sel, df_bobot, titik, nilai_tetap=None, top_n=TOP_N, proses=None,
+                   baris_per_tugas=BARIS_PER_TUGAS, progres=None, poligon=None, maks_sel=MAKS_SEL):
+    """Skor MOORA setiap sel grid di bbox (lat_min, lon_min, lat_maks, lon_maks).
+
+    titik: hasil spasial.titik_lapisan(); poligon: hasil spasial.poligon_lapisan() (sel di dalamnya berjarak 0);
+    nilai_tetap: nilai mentah kriteria yang tidak berasal dari lapisan.
+    proses=1 menghitung di proses ini tanpa process pool. Mengembalikan dict berisi grid, raster skor
+    (baris x kolom), DataFrame top_n sel terbaik dengan kolom yang sama seperti alternatif, dan
+    peringatan (None bila ukuran sel cukup kecil untuk semua pita kelas).
+    """
+    nilai_tetap = nilai_tetap or {}
+    titik = {kode: t for kode, t in titik.items() if kode in LAPISAN}
+    if not titik:
+        raise ValueError("Tidak ada lapisan fitur; pemindaian membutuhkan minimal satu lapisan jarak")
+    tetap = {kode: konversi_nilai(kode, nilai_tetap.get(kode)) for kode in KODE_KRITERIA if kode not in titik}
+    kurang = [kode for kode, skor in tetap.items() if skor is None]
+    if kurang:
+        raise ValueError(f"Nilai untuk kriteria {', '.join(kurang)} belum diisi atau tidak valid")
+
+    peringatan = peringatan_ukuran_sel(ukuran_sel, titik)
+    if peringatan:
+        log.warning(peringatan)
+    grid = buat_grid(*bbox, ukuran_sel, maks_sel)
+    baris, kolom = grid["baris"], grid["kolom"]
+    matriks = np.empty((len(KODE_KRITERIA), baris * kolom), dtype=np.int8)
+    for kode, skor in tetap.items():
+        matriks[KODE_KRITERIA.index(kode)] = skor
+
+    poligon = poligon or {}
+    sel = {kode: _sel_lapisan(grid, t, kode, poligon.get(kode)) for kode, t in titik.items()}
+    pita = [(awal, min(awal + baris_per_tugas, baris)) for awal in range(0, baris, baris_per_tugas)]
+
+    def argumen(awal, akhir):
+        # Hanya sel lapisan yang jatuh di pita beserta tepinya yang dikirim ke pekerja
+        sel_pita = {}
+        for kode, (ii, jj) in sel.items():
+            h = math.ceil(_jarak_maks(kode, ukuran_sel) / ukuran_sel)
+            a, b = np.searchsorted(ii, [awal - h, akhir + h])
+            sel_pita[kode] = (ii[a:b], jj[a:b])
+        return awal, akhir, kolom, ukuran_sel, sel_pita
+
+    def simpan(awal, akhir, hasil):
+        for kode, skor in hasil.items():
+            matriks[KODE_KRITERIA.index(kode), awal * kolom:akhir * kolom] = skor
+
+    if proses == 1:
+        for n, (awal, akhir) in enumerate(pita, 1):
+            simpan(*_pindai_pita(*argumen(awal, akhir)))
+            if progres is not None:
+                progres(n, len(pita))
+    else:
+        # "spawn" seperti hitung_ulang: proses pekerja tidak mewarisi koneksi SQLite proses utama
+        konteks = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=proses or os.cpu_count(), mp_context=konteks) as pool:
+            tugas = [pool.submit(_pindai_pita, *argumen(awal, akhir)) for awal, akhir in pita]
+            try:
+                for n, f in enumerate(as_completed(tugas), 1):
+                    simpan(*f.result())
+                    if progres is not None:
+                        progres(n, len(pita))
+            except BaseException:
+                # Exception dari progres (misalnya pembatalan): pita yang belum mulai tidak perlu ditunggu
+                for f in tugas:
+                    f.cancel()
+                raise
+
+    jumlah_kuadrat = np.einsum("ij,ij->i", matriks, matriks, dtype=np.int64)
+    skor = skor_kompak(matriks, jumlah_kuadrat, df_bobot)
+
+    urut = urutan_teratas(skor, top_n)
+    lat, lon = pusat_sel(grid, urut)
+    teratas = pd.DataFrame(matriks[:, urut].T.astype(int), columns=KOLOM_KRITERIA)
+    teratas.insert(0, "Alternatif", [f"Sel {a:.5f}, {b:.5f}" for a, b in zip(lat, lon)])
+    teratas.insert(1, "Latitude", lat)
+    teratas.insert(2, "Longitude", lon)
+    teratas["Skor Akhir"] = skor[urut]
+    return {"grid": grid, "skor": skor.reshape(baris, kolom), "teratas": teratas, "peringatan": peringatan}
+
+
+def simpan_raster(hasil, path):
+    """Simpan raster skor sebagai .npy atau ESRI ASCII grid (.asc, dapat dibuka di QGIS)."""
+    grid, skor = hasil["grid"], hasil["skor"]
+    if path.lower().endswith(".npy"):
+        np.save(path, skor)
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"ncols {grid['kolom']}\nnrows {grid['baris']}\n"
+                f"xllcorner {grid['lon_min']:.8f}\nyllcorner {grid['lat_maks'] - grid['baris'] * grid['dlat']:.8f}\n"
+                f"dx {grid['dlon']:.10f}\ndy {grid['dlat']:.10f}\n")
+        np.savetxt(f, skor, fmt="%.6g")
+
+
+def gambar_heatmap(skor, maks_piksel=1000):
+    """Gambar RGB (uint8) dari raster skor: merah = kurang sesuai, kuning, hijau = paling sesuai.
+
+    Raster besar diperkecil dengan mengambil setiap sel ke-n agar sisi terpanjang <= maks_piksel.
+    """
+    langkah = max(1, math.ceil(max(skor.shape) / maks_piksel))
+    kecil = skor[::langkah, ::langkah]
+    rentang = kecil.max() - kecil.min()
+    t = (kecil - kecil.min()) / rentang if rentang > 0 else np.ones_like(kecil)
+    merah = np.interp(t, [0, 0.5, 1], [215, 254, 26])
+    hijau = np.interp(t, [0, 0.5, 1], [48, 224, 150])
+    biru = np.interp(t, [0, 0.5, 1], [39, 139, 65])
+    return np.stack([merah, hijau, biru], axis=-1).astype(np.uint8)
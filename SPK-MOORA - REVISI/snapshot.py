@@ -0,0 +1,177 @@
+"""Snapshot kolom kompak matriks keputusan per user (int8, dimuat dengan memory map).
+
+Skor C1-C9 selalu bilangan bulat kecil, sehingga matriks disimpan sebagai int8 berukuran
+kriteria x alternatif (satu kriteria = satu blok memori berurutan), ditambah id, nama alternatif dan
+jumlah kuadrat tiap kriteria. Snapshot diberi versi dari tabel versi_data: setiap penulisan ke alternatif
+menaikkan versi, dan snapshot dibangun ulang dari SQLite saat pertama kali dipakai pada versi baru.
+
+Baris dengan skor yang tidak dapat disimpan sebagai int8 (kosong, negatif, pecahan atau lebih dari 127, misalnya
+data lama dari skema awal) tidak dimasukkan ke snapshot dan dicatat sebagai peringatan; jumlahnya tersedia di
+Snapshot.dilewati. Baris tersebut juga tidak dapat dihitung dengan benar oleh moora_calculation (skornya NaN).
+"""
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from db import DB_FILE, get_connection
+from metrik import diukur
+from moora import KOLOM_KRITERIA, arah_kriteria, front_pareto, skor_kompak, urutan_teratas
+
+DIR_SNAPSHOT = os.environ.get("SPK_SNAPSHOT_DIR", "snapshot")
+UKURAN_CHUNK = 100_000
+
+SQL_BACA = f"SELECT id, alternatif, {', '.join(KOLOM_KRITERIA)} FROM alternatif WHERE username = ? ORDER BY id"
+
+log = logging.getLogger("spk_moora.snapshot")
+
+
+class Snapshot:
+    """Matriks kompak satu user. Atribut array berupa memmap read-only: jangan diubah."""
+
+    def __init__(self, folder, versi):
+        self.versi = versi
+        self.kolom = np.load(os.path.join(folder, "kolom.npy"), mmap_mode="r")
+        self.ids = np.load(os.path.join(folder, "id.npy"), mmap_mode="r")
+        self.nama_bytes = np.load(os.path.join(folder, "nama.npy"), mmap_mode="r")
+        self.jumlah_kuadrat = np.load(os.path.join(folder, "jumlah_kuadrat.npy"))
+        path_dilewati = os.path.join(folder, "dilewati.npy")
+        self.dilewati = int(np.load(path_dilewati)) if os.path.exists(path_dilewati) else 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nama(self, indeks=None):
+        """Nama alternatif (str) untuk indeks tertentu; tanpa indeks semua nama didekode."""
+        pilih = self.nama_bytes if indeks is None else self.nama_bytes[indeks]
+        return np.char.decode(pilih, "utf-8").astype(object)
+
+    def matriks(self):
+        """Matriks alternatif x kriteria sebagai float (salinan baru)."""
+        return self.kolom.T.astype(float)
+
+    def dataframe(self):
+        """DataFrame "Alternatif" + kolom skor kriteria (int8, 1 byte per sel) untuk fungsi moora yang butuh df_alt."""
+        df = pd.DataFrame(np.ascontiguousarray(self.kolom.T), columns=KOLOM_KRITERIA)
+        df.insert(0, "Alternatif", self.nama())
+        return df
+
+
+_terbuka = {}
+_kunci = threading.Lock()
+
+
+def _folder_user(username, db_file):
+    # Nama folder dari hash (file database, username) agar aman untuk nama file dan tidak bentrok antar database
+    kunci = f"{os.path.abspath(db_file)}|{username}".encode()
+    return os.path.join(DIR_SNAPSHOT, hashlib.sha1(kunci).hexdigest()[:16])
+
+
+def _versi(conn, username):
+    row = conn.execute("SELECT versi FROM versi_data WHERE username = ?", (username,)).fetchone()
+    return row[0] if row else 0
+
+
+def _tulis(folder, conn, username, ukuran_chunk, progres=None):
+    """Baca alternatif user dari SQLite per chunk dan tulis file snapshot ke folder. Mengembalikan jumlah baris
+    yang dilewati karena skornya tidak valid."""
+    ids, nama, blok = [], [], []
+    dilewati = 0
+    total = 0
+    if progres is not None:
+        total = conn.execute("SELECT COUNT(*) FROM alternatif WHERE username = ?", (username,)).fetchone()[0]
+    c = conn.execute(SQL_BACA, (username,))
+    while True:
+        rows = c.fetchmany(ukuran_chunk)
+        if not rows:
+            break
+        x = np.array([r[2:] for r in rows], dtype=float)
+        with np.errstate(invalid="ignore"):
+            valid = ((x >= 0) & (x <= np.iinfo(np.int8).max) & (x == np.round(x))).all(axis=1)
+        if not valid.all():
+            dilewati += int((~valid).sum())
+            rows = [r for r, ok in zip(rows, valid) if ok]
+            x = x[valid]
+        ids.append(np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows)))
+        nama.extend(r[1] for r in rows)
+        blok.append(x.astype(np.int8).T)
+        if progres is not None:
+            progres(len(nama) + dilewati, total)
+    if dilewati:
+        log.warning("%d alternatif milik '%s' dilewati dari snapshot karena skor kriterianya kosong atau tidak valid",
+                    dilewati, username)
+
+    kolom = np.concatenate(blok, axis=1) if blok else np.zeros((len(KOLOM_KRITERIA), 0), dtype=np.int8)
+    jumlah_kuadrat = np.einsum("ij,ij->i", kolom, kolom, dtype=np.int64)
+    np.save(os.path.join(folder, "kolom.npy"), np.ascontiguousarray(kolom))
+    np.save(os.path.join(folder, "id.npy"), np.concatenate(ids) if ids else np.zeros(0, dtype=np.int64))
+    np.save(os.path.join(folder, "nama.npy"), np.array([str(n).encode("utf-8") for n in nama], dtype=bytes))
+    np.save(os.path.join(folder, "jumlah_kuadrat.npy"), jumlah_kuadrat.astype(float))
+    np.save(os.path.join(folder, "dilewati.npy"), np.array(dilewati))
+    return dilewati
+
+
+@diukur()
+def ambil_snapshot(username, db_file=DB_FILE, ukuran_chunk=UKURAN_CHUNK, progres=None):
+    """Snapshot versi terbaru milik user; dibangun dari tabel alternatif bila belum ada untuk versi ini.
+
+    progres(dibaca, total) dipanggil setiap chunk saat snapshot dibangun; exception dari progres membatalkannya.
+    """
+    conn = get_connection(db_file)
+    versi = _versi(conn, username)
+    kunci = (os.path.abspath(db_file), username)
+    snap = _terbuka.get(kunci)
+    if snap is not None and snap.versi == versi:
+        return snap
+
+    folder_user = _folder_user(username, db_file)
+    folder = os.path.join(folder_user, f"v{versi}")
+    if not os.path.isdir(folder):
+        os.makedirs(folder_user, exist_ok=True)
+        sementara = tempfile.mkdtemp(dir=folder_user, prefix=".tmp-")
+        try:
+            # Versi dan isi dibaca dalam satu transaksi baca agar konsisten satu sama lain
+            mulai_baca = not conn.in_transaction
+            if mulai_baca:
+                conn.execute("BEGIN")
+            try:
+                versi = _versi(conn, username)
+                folder = os.path.join(folder_user, f"v{versi}")
+                _tulis(sementara, conn, username, ukuran_chunk, progres)
+            finally:
+                if mulai_baca:
+                    conn.execute("COMMIT")
+            if not os.path.isdir(folder):
+                os.rename(sementara, folder)
+        finally:
+            shutil.rmtree(sementara, ignore_errors=True)
+        # Versi lama sudah tidak berlaku (versi yang lebih baru mungkin sedang dipakai proses lain)
+        for lama in os.listdir(folder_user):
+            if lama.startswith("v") and lama[1:].isdigit() and int(lama[1:]) < versi:
+                shutil.rmtree(os.path.join(folder_user, lama), ignore_errors=True)
+
+    snap = Snapshot(folder, versi)
+    with _kunci:
+        _terbuka[kunci] = snap
+    return snap
+
+
+@diukur()
+def moora_snapshot(username, df_bobot, top_k=None, db_file=DB_FILE, hanya_pareto=False):
+    """MOORA dari snapshot kompak milik user; hasil sama dengan moora_calculation()."""
+    snap = ambil_snapshot(username, db_file)
+    skor = skor_kompak(snap.kolom, snap.jumlah_kuadrat, df_bobot)
+    if hanya_pareto:
+        front = np.flatnonzero(front_pareto(snap.kolom.T, arah_kriteria(df_bobot["Jenis"])))
+        urut = front[urutan_teratas(skor[front], top_k)]
+    else:
+        urut = urutan_teratas(skor, top_k)
+    return pd.DataFrame({
+        "Alternatif": snap.nama(urut),
+        "Skor Akhir": skor[urut],
+    })
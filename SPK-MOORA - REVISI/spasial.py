@@ -0,0 +1,314 @@
+"""Jarak kriteria (C1, C3, C4, C8, C9) dihitung otomatis dari koordinat alternatif.
+
+Lapisan fitur dibaca dari folder DIR_LAPISAN (bawaan "lapisan/"): satu file per lapisan bernama
+pemukiman, sumber_air, listrik, jalan_utama dan peternakan, berformat CSV (kolom lintang/bujur) atau
+GeoJSON (Point, LineString, Polygon beserta Multi*-nya). Garis dan tepi poligon disisipi titik setiap
+JARAK_SISIP meter sehingga jarak ke titik terdekat mendekati jarak ke garis. Titik di dalam poligon
+(misalnya di tengah kawasan pemukiman) berjarak 0; lubang poligon tidak termasuk bagian dalam.
+
+Titik diproyeksikan ke koordinat kartesius di permukaan bumi; tetangga terdekat dicari dengan KD-tree
+(scipy, bila terpasang) atau pencarian brute-force per blok dengan NumPy. Jarak dikembalikan dalam meter
+(jarak lingkaran besar).
+"""
+import functools
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from konversi import ATURAN
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # scipy opsional; tanpa scipy dipakai pencarian brute-force per blok
+    cKDTree = None
+
+DIR_LAPISAN = os.environ.get("SPK_LAPISAN_DIR", "lapisan")
+JARI_JARI_BUMI = 6_371_008.8
+JARAK_SISIP = 2.0
+MAKS_ELEMEN_BLOK = 5_000_000
+
+# Kriteria jarak -> nama file lapisan
+LAPISAN = {
+    "C1": "pemukiman",
+    "C3": "sumber_air",
+    "C4": "listrik",
+    "C8": "jalan_utama",
+    "C9": "peternakan",
+}
+EKSTENSI_LAPISAN = (".geojson", ".json", ".csv")
+
+log = logging.getLogger("spk_moora.spasial")
+_fallback_diperingatkan = False
+
+KOLOM_LINTANG = "Latitude"
+KOLOM_BUJUR = "Longitude"
+_ALIAS_LINTANG = {"latitude", "lat", "lintang"}
+_ALIAS_BUJUR = {"longitude", "lon", "lng", "long", "bujur"}
+
+
+def _ke_kartesius(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    cos_lat = np.cos(lat)
+    return JARI_JARI_BUMI * np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def _tali_ke_meter(tali):
+    # Panjang tali busur (garis lurus antar titik di bola) -> jarak lingkaran besar
+    return 2 * JARI_JARI_BUMI * np.arcsin(np.clip(tali / (2 * JARI_JARI_BUMI), 0, 1))
+
+
+def jarak_meter(lat1, lon1, lat2, lon2):
+    """Jarak lingkaran besar (haversine) dalam meter, per elemen."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * JARI_JARI_BUMI * np.arcsin(np.sqrt(a))
+
+
+def di_dalam_poligon(lat, lon, poligon):
+    """Mask titik (lat, lon) yang berada di dalam salah satu poligon (daftar cincin lat, lon per poligon).
+
+    Ray casting dengan aturan genap-ganjil atas semua cincin poligon, jadi titik di lubang tidak termasuk.
+    Koordinat diperlakukan datar, cukup teliti untuk poligon seukuran kawasan.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    hasil = np.zeros(len(lat), dtype=bool)
+    for cincin in poligon:
+        semua = np.vstack(cincin)
+        (lat_min, lon_min), (lat_maks, lon_maks) = semua.min(axis=0), semua.max(axis=0)
+        calon = np.nonzero(~hasil & (lat >= lat_min) & (lat <= lat_maks) & (lon >= lon_min) & (lon <= lon_maks))[0]
+        if not len(calon):
+            continue
+        # Tepi tiap cincin, termasuk tepi penutup dari titik terakhir ke titik pertama
+        a = semua
+        b = np.vstack([np.roll(c, -1, axis=0) for c in cincin])
+        blok = max(1, MAKS_ELEMEN_BLOK // len(a))
+        for awal in range(0, len(calon), blok):
+            idx = calon[awal:awal + blok]
+            py, px = lat[idx, None], lon[idx, None]
+            lintas = (a[:, 0] > py) != (b[:, 0] > py)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                x_potong = a[:, 1] + (py - a[:, 0]) * (b[:, 1] - a[:, 1]) / (b[:, 0] - a[:, 0])
+            hasil[idx] = (lintas & (px < x_potong)).sum(axis=1) % 2 == 1
+    return hasil
+
+
+class IndeksTitik:
+    """Indeks tetangga terdekat untuk satu lapisan titik (lat, lon); titik di dalam poligon berjarak 0."""
+
+    def __init__(self, lat, lon, poligon=None):
+        self.poligon = poligon or []
+        self.titik = _ke_kartesius(np.asarray(lat, dtype=float), np.asarray(lon, dtype=float))
+        if not len(self.titik):
+            raise ValueError("Lapisan tidak berisi titik")
+        self.pohon = cKDTree(self.titik) if cKDTree is not None else None
+        if self.pohon is None:
+            _peringatan_fallback()
+
+    def __len__(self):
+        return len(self.titik)
+
+    def _tali_brute(self, q):
+        # |q - p|^2 = |q|^2 + |p|^2 - 2 q.p, diproses per blok agar matriks jarak tidak terlalu besar
+        kuadrat_p = (self.titik ** 2).sum(axis=1)
+        hasil = np.empty(len(q))
+        blok = max(1, MAKS_ELEMEN_BLOK // len(self.titik))
+        for awal in range(0, len(q), blok):
+            qb = q[awal:awal + blok]
+            d2 = (qb ** 2).sum(axis=1)[:, None] + kuadrat_p[None, :] - 2 * qb @ self.titik.T
+            hasil[awal:awal + blok] = np.sqrt(np.clip(d2.min(axis=1), 0, None))
+        return hasil
+
+    def jarak(self, lat, lon):
+        """Jarak (meter) dari tiap titik (lat, lon) ke titik lapisan terdekat, sekaligus untuk semua titik."""
+        q = _ke_kartesius(np.asarray(lat, dtype=float), np.asarray(lon, dtype=float))
+        if not len(q):
+            return np.zeros(0)
+        if self.pohon is not None:
+            tali, _ = self.pohon.query(q, workers=-1)
+        else:
+            tali = self._tali_brute(q)
+        jarak = _tali_ke_meter(tali)
+        if self.poligon:
+            jarak[di_dalam_poligon(lat, lon, self.poligon)] = 0.0
+        return jarak
+
+
+def _peringatan_fallback():
+    # Sekali per proses: tanpa scipy setiap pencarian membandingkan semua titik lapisan (O(N x M))
+    global _fallback_diperingatkan
+    if not _fallback_diperingatkan:
+        _fallback_diperingatkan = True
+        log.warning("scipy tidak terpasang; jarak ke lapisan dicari brute-force (lambat untuk lapisan besar). "
+                    "Pasang scipy untuk memakai KD-tree.")
+
+
+def _sisipkan(garis, jarak_sisip=JARAK_SISIP):
+    """Garis (k x 2, lat/lon) dengan titik tambahan sehingga jarak antar titik berurutan <= jarak_sisip."""
+    if len(garis) < 2:
+        return garis
+    a, b = garis[:-1], garis[1:]
+    n = np.maximum(np.ceil(jarak_meter(a[:, 0], a[:, 1], b[:, 0], b[:, 1]) / jarak_sisip).astype(np.int64), 1)
+    segmen = np.repeat(np.arange(len(a)), n)
+    t = (np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)) / np.repeat(n, n)
+    return np.vstack([a[segmen] + (b - a)[segmen] * t[:, None], garis[-1:]])
+
+
+def _titik_geometri(geom):
+    # Koordinat GeoJSON berurutan (bujur, lintang); dikembalikan sebagai array (lat, lon)
+    jenis = geom.get("type")
+    koordinat = geom.get("coordinates")
+    if jenis == "GeometryCollection":
+        for g in geom.get("geometries", []):
+            yield from _titik_geometri(g)
+    elif jenis == "Point":
+        yield np.array([koordinat[:2]], dtype=float)[:, ::-1]
+    elif jenis == "MultiPoint":
+        yield np.array([k[:2] for k in koordinat], dtype=float).reshape(-1, 2)[:, ::-1]
+    elif jenis == "LineString":
+        yield _sisipkan(np.array([k[:2] for k in koordinat], dtype=float)[:, ::-1])
+    elif jenis in ("MultiLineString", "Polygon"):
+        for garis in koordinat:
+            yield _sisipkan(np.array([k[:2] for k in garis], dtype=float)[:, ::-1])
+    elif jenis == "MultiPolygon":
+        for poligon in koordinat:
+            for garis in poligon:
+                yield _sisipkan(np.array([k[:2] for k in garis], dtype=float)[:, ::-1])
+
+
+def _poligon_geometri(geom):
+    # Poligon GeoJSON sebagai daftar cincin (lat, lon): cincin luar lalu lubang-lubangnya
+    jenis = geom.get("type")
+    koordinat = geom.get("coordinates")
+    if jenis == "GeometryCollection":
+        for g in geom.get("geometries", []):
+            yield from _poligon_geometri(g)
+    elif jenis in ("Polygon", "MultiPolygon"):
+        for poligon in ([koordinat] if jenis == "Polygon" else koordinat):
+            cincin = [np.array([k[:2] for k in garis], dtype=float).reshape(-1, 2)[:, ::-1] for garis in poligon]
+            if cincin and len(cincin[0]) >= 3:
+                yield cincin
+
+
+def kolom_koordinat(df):
+    """Nama kolom (lintang, bujur) pada df, atau (None, None) bila tidak ada."""
+    kolom = {str(c).strip().lower(): c for c in df.columns}
+    lintang = next((kolom[a] for a in _ALIAS_LINTANG if a in kolom), None)
+    bujur = next((kolom[a] for a in _ALIAS_BUJUR if a in kolom), None)
+    if lintang is None or bujur is None:
+        return None, None
+    return lintang, bujur
+
+
+def baca_lapisan(path):
+    """Baca file lapisan (CSV atau GeoJSON) menjadi array titik (n x 2) berisi lat, lon."""
+    if path.lower().endswith(".csv"):
+        df = pd.read_csv(path)
+        lintang, bujur = kolom_koordinat(df)
+        if lintang is None:
+            raise ValueError(f"{path}: kolom lintang/bujur tidak ditemukan")
+        titik = df[[lintang, bujur]].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        return titik[~np.isnan(titik).any(axis=1)]
+
+    bagian = [t for fit in _fitur_geojson(path) for t in _titik_geometri(fit.get("geometry") or fit) if len(t)]
+    return np.vstack(bagian) if bagian else np.zeros((0, 2))
+
+
+def baca_poligon(path):
+    """Poligon pada file lapisan GeoJSON (daftar cincin lat, lon per poligon); file CSV tidak berisi poligon."""
+    if path.lower().endswith(".csv"):
+        return []
+    return [p for fit in _fitur_geojson(path) for p in _poligon_geometri(fit.get("geometry") or fit)]
+
+
+def _fitur_geojson(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data.get("features") if data.get("type") == "FeatureCollection" else [data]
+
+
+def _daftar_file(folder):
+    # (kode, path, waktu modifikasi) tiap lapisan yang ada; waktu modifikasi ikut menjadi kunci cache
+    daftar = []
+    for kode, nama in LAPISAN.items():
+        for ext in EKSTENSI_LAPISAN:
+            path = os.path.join(folder, nama + ext)
+            if os.path.isfile(path):
+                daftar.append((kode, path, os.path.getmtime(path)))
+                break
+    return tuple(daftar)
+
+
+@functools.lru_cache(maxsize=8)
+def _baca_semua(daftar_file):
+    lapisan = {}
+    for kode, path, _ in daftar_file:
+        titik = baca_lapisan(path)
+        if len(titik):
+            lapisan[kode] = titik
+    return lapisan
+
+
+@functools.lru_cache(maxsize=8)
+def _baca_poligon_semua(daftar_file):
+    lapisan = {}
+    for kode, path, _ in daftar_file:
+        poligon = baca_poligon(path)
+        if poligon:
+            lapisan[kode] = poligon
+    return lapisan
+
+
+@functools.lru_cache(maxsize=8)
+def _muat(daftar_file):
+    poligon = _baca_poligon_semua(daftar_file)
+    return {kode: IndeksTitik(titik[:, 0], titik[:, 1], poligon.get(kode))
+            for kode, titik in _baca_semua(daftar_file).items()}
+
+
+def titik_lapisan(folder=DIR_LAPISAN):
+    """Titik semua lapisan yang tersedia di folder: dict kode kriteria -> array (n x 2) berisi lat, lon."""
+    return _baca_semua(_daftar_file(folder))
+
+
+def poligon_lapisan(folder=DIR_LAPISAN):
+    """Poligon lapisan GeoJSON di folder: dict kode kriteria -> daftar poligon (hanya lapisan yang berpoligon)."""
+    return _baca_poligon_semua(_daftar_file(folder))
+
+
+def muat_lapisan(folder=DIR_LAPISAN):
+    """Indeks semua lapisan yang tersedia di folder: dict kode kriteria -> IndeksTitik.
+
+    Indeks disimpan di memori dan dibangun ulang hanya bila file lapisan berubah (waktu modifikasi).
+    """
+    return _muat(_daftar_file(folder))
+
+
+def lengkapi_jarak(df, lapisan):
+    """Isi kolom jarak mentah kriteria dari koordinat, untuk baris yang punya koordinat.
+
+    Nilai jarak yang sudah diisi (misalnya hasil ukur lapangan) tetap dipakai; hanya yang kosong dihitung.
+    Mengembalikan DataFrame baru; df tanpa kolom koordinat dikembalikan apa adanya.
+    """
+    lintang, bujur = kolom_koordinat(df)
+    if lintang is None or not lapisan:
+        return df
+    lat = pd.to_numeric(df[lintang], errors="coerce").to_numpy(dtype=float)
+    lon = pd.to_numeric(df[bujur], errors="coerce").to_numpy(dtype=float)
+    ada = (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+
+    df = df.copy()
+    for kode, indeks in lapisan.items():
+        kolom = ATURAN[kode]["kolom"]
+        if kolom in df.columns:
+            nilai = pd.to_numeric(df[kolom], errors="coerce").to_numpy(dtype=float, copy=True)
+        else:
+            nilai = np.full(len(df), np.nan)
+        isi = ada & np.isnan(nilai)
+        if isi.any():
+            nilai[isi] = indeks.jarak(lat[isi], lon[isi])
+        df[kolom] = nilai
+    return df
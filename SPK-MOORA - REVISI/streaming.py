@@ -0,0 +1,137 @@
+import heapq
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from db import DB_FILE, buat_run_laporan, get_connection, lewat_penulis, transaksi
+from metrik import diukur
+from moora import KOLOM_KRITERIA, arah_kriteria
+
+UKURAN_CHUNK = 50_000
+
+SQL_BACA = f"SELECT alternatif, {', '.join(KOLOM_KRITERIA)} FROM alternatif WHERE username = ? ORDER BY id"
+SQL_INSERT_SKOR = "INSERT INTO laporan_moora (run_id, username, nama_alternatif, skor) VALUES (?, ?, ?, ?)"
+KETERANGAN = "Streaming"
+KETERANGAN_BERJALAN = "Streaming (belum selesai)"
+
+
+def baca_chunk(conn, username, ukuran_chunk=UKURAN_CHUNK):
+    """Baca alternatif milik user per chunk lewat cursor; menghasilkan (nama, matriks skor kriteria)."""
+    c = conn.execute(SQL_BACA, (username,))
+    while True:
+        rows = c.fetchmany(ukuran_chunk)
+        if not rows:
+            return
+        nama = [r[0] for r in rows]
+        yield nama, np.array([r[1:] for r in rows], dtype=float)
+
+
+# Penulisan laporan lewat thread penulis, satu chunk per penulisan: kunci tulis hanya dipegang selama satu
+# batch, jadi penulisan sesi lain tetap bisa berjalan di sela-sela perhitungan yang panjang.
+@lewat_penulis
+def _buat_run(username, jumlah, db_file=DB_FILE):
+    with transaksi(db_file) as conn:
+        return buat_run_laporan(conn, username, jumlah, KETERANGAN_BERJALAN)
+
+
+@lewat_penulis
+def _tulis_skor(run_id, username, nama, skor, db_file=DB_FILE):
+    with transaksi(db_file) as conn:
+        conn.executemany(SQL_INSERT_SKOR, zip(itertools.repeat(run_id), itertools.repeat(username), nama, skor))
+
+
+@lewat_penulis
+def _selesaikan_run(run_id, db_file=DB_FILE):
+    with transaksi(db_file) as conn:
+        # Peringkat diisi oleh SQLite (pengurutan di sisi database, bukan di memori Python)
+        conn.execute("""
+            UPDATE laporan_moora SET peringkat = r.peringkat
+            FROM (SELECT id, ROW_NUMBER() OVER (ORDER BY skor DESC, id) AS peringkat
+                  FROM laporan_moora WHERE run_id = ?) AS r
+            WHERE laporan_moora.id = r.id
+        """, (run_id,))
+        conn.execute("UPDATE laporan_run SET keterangan = ? WHERE id = ?", (KETERANGAN, run_id))
+
+
+@lewat_penulis
+def _hapus_run(run_id, db_file=DB_FILE):
+    with transaksi(db_file) as conn:
+        conn.execute("DELETE FROM laporan_moora WHERE run_id = ?", (run_id,))
+        conn.execute("DELETE FROM laporan_run WHERE id = ?", (run_id,))
+
+
+@diukur()
+def moora_streaming(username, df_bobot, top_n=100, ukuran_chunk=UKURAN_CHUNK, db_file=DB_FILE, simpan=True,
+                    progres=None):
+    """MOORA dua tahap langsung dari tabel alternatif tanpa memuat seluruh data ke memori.
+
+    Tahap 1 menjumlahkan kuadrat tiap kriteria. Tahap 2 menghitung skor benefit dikurangi cost per chunk,
+    menulisnya ke laporan_moora sebagai run baru (bila simpan=True) dan hanya menyimpan top_n skor tertinggi di heap.
+    Memori yang dipakai sebanding dengan ukuran_chunk + top_n, bukan jumlah alternatif.
+    Tiap chunk dikirim ke thread penulis sementara chunk berikutnya dihitung; selama berjalan run berketerangan
+    KETERANGAN_BERJALAN. progres(diproses, total) dipanggil setiap chunk (total = 2 x jumlah alternatif, untuk
+    kedua tahap); exception dari progres menghentikan perhitungan dan menghapus run yang sudah ditulis.
+    """
+    conn = get_connection(db_file)
+    total = 2 * conn.execute("SELECT COUNT(*) FROM alternatif WHERE username = ?", (username,)).fetchone()[0]
+
+    jumlah_kuadrat = np.zeros(len(KOLOM_KRITERIA))
+    jumlah = 0
+    for _, x in baca_chunk(conn, username, ukuran_chunk):
+        jumlah_kuadrat += (x ** 2).sum(axis=0)
+        jumlah += len(x)
+        if progres is not None:
+            progres(jumlah, total)
+
+    akar = np.sqrt(jumlah_kuadrat)
+    bobot = df_bobot["Bobot"].to_numpy(dtype=float) * arah_kriteria(df_bobot["Jenis"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        koef = np.where(akar > 0, bobot / akar, 0.0)
+
+    heap = []
+    urutan = itertools.count()  # pemecah seri agar heap tidak membandingkan nama
+    run_id = _buat_run(username, jumlah, db_file=db_file) if simpan else None
+    tulis = None
+    try:
+        diproses = jumlah
+        for nama, x in baca_chunk(conn, username, ukuran_chunk):
+            skor = x @ koef
+            if simpan:
+                # Paling banyak satu chunk menunggu di antrean penulis agar memori tetap sebanding ukuran_chunk
+                if tulis is not None:
+                    tulis.result()
+                tulis = _tulis_skor.kirim(run_id, username, nama, skor.tolist(), db_file=db_file)
+
+            # Hanya kandidat top_n dari chunk ini yang perlu dicoba masuk heap
+            kandidat = np.argpartition(-skor, top_n - 1)[:top_n] if len(skor) > top_n else range(len(skor))
+            for i in kandidat:
+                item = (skor[i], -next(urutan), nama[i])
+                if len(heap) < top_n:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+            diproses += len(nama)
+            if progres is not None:
+                progres(diproses, total)
+
+        if simpan:
+            if tulis is not None:
+                tulis.result()
+            _selesaikan_run(run_id, db_file=db_file)
+    except BaseException:
+        if simpan:
+            if tulis is not None:
+                tulis.exception()  # tunggu chunk terakhir selesai sebelum run dihapus
+            _hapus_run(run_id, db_file=db_file)
+        raise
+
+    teratas = sorted(heap, reverse=True)
+    return {
+        "jumlah_alternatif": jumlah,
+        "run_id": run_id,
+        "hasil": pd.DataFrame({
+            "Alternatif": [t[2] for t in teratas],
+            "Skor Akhir": [float(t[0]) for t in teratas],
+        }),
+    }